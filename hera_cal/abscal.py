@@ -2001,7 +2001,7 @@ def mirror_data_to_red_bls(data, antpos, tol=2.0, weights=False):
     return DataContainer(red_data)
 
 
-def match_times(datafile, modelfiles, filetype='uvh5', atol=1e-5):
+def match_times(datafile, modelfiles, filetype='uvh5', atol=1e-5, use_time_index=False):
     """
     Match start and end LST of datafile to modelfiles. Each file in modelfiles needs
     to have the same integration time.
@@ -2010,13 +2010,15 @@ def match_times(datafile, modelfiles, filetype='uvh5', atol=1e-5):
         datafile : type=str, path to data file
         modelfiles : type=list of str, list of filepaths to model files ordered according to file start time
         filetype : str, options=['uvh5', 'miriad']
+        use_time_index : bool, if True, get file times from (and update) the sidecar file time index
+            in each file's directory. See io.get_file_times for details.
 
     Returns:
         matched_modelfiles : type=list, list of modelfiles that overlap w/ datafile in LST
     """
     # get lst arrays
-    data_dlst, data_dtime, data_lsts, data_times = io.get_file_times(datafile, filetype=filetype)
-    model_dlsts, model_dtimes, model_lsts, model_times = io.get_file_times(modelfiles, filetype=filetype)
+    data_dlst, data_dtime, data_lsts, data_times = io.get_file_times(datafile, filetype=filetype, use_time_index=use_time_index)
+    model_dlsts, model_dtimes, model_lsts, model_times = io.get_file_times(modelfiles, filetype=filetype, use_time_index=use_time_index)
 
     # shift model files relative to first file & first index if needed
     for ml in model_lsts:
@@ -3491,7 +3493,8 @@ def post_redcal_abscal(model, data, data_wgts, rc_flags, edge_cut=0, tol=1.0, ke
 
 def post_redcal_abscal_run(data_file, redcal_file, model_files, raw_auto_file=None, data_is_redsol=False, model_is_redundant=False, output_file=None,
                            nInt_to_load=None, data_solar_horizon=90, model_solar_horizon=90, extrap_limit=.5, min_bl_cut=1.0, max_bl_cut=None,
-                           edge_cut=0, tol=1.0, phs_max_iter=100, phs_conv_crit=1e-6, refant=None, clobber=True, add_to_history='', verbose=True):
+                           edge_cut=0, tol=1.0, phs_max_iter=100, phs_conv_crit=1e-6, refant=None, clobber=True, add_to_history='',
+                           use_time_index=False, verbose=True):
     '''Perform abscal on entire data files, picking relevant model_files from a list and doing partial data loading.
     Does not work on data (or models) with baseline-dependant averaging.
 
@@ -3526,6 +3529,8 @@ def post_redcal_abscal_run(data_file, redcal_file, model_files, raw_auto_file=No
         refant: tuple of the form (0, 'Jnn') indicating the antenna defined to have 0 phase. If None, refant will be automatically chosen.
         clobber: if True, overwrites existing abscal calfits file at the output path
         add_to_history: string to add to history of output abscal file
+        use_time_index: if True, match data and model times using (and updating) the sidecar file time index
+            in each file's directory, instead of opening every model file. See io.get_file_times for details.
 
     Returns:
         hc: HERACal object which was written to disk. Matches the input redcal_file with an updated history.
@@ -3561,7 +3566,7 @@ def post_redcal_abscal_run(data_file, redcal_file, model_files, raw_auto_file=No
     abscal_chisq = {pol: np.zeros_like(rtq) for pol, rtq in rc_tot_qual.items()}
 
     # match times to narrow down model_files
-    matched_model_files = sorted(set(match_times(data_file, model_files, filetype='uvh5')))
+    matched_model_files = sorted(set(match_times(data_file, model_files, filetype='uvh5', use_time_index=use_time_index)))
     if len(matched_model_files) == 0:
         echo("No model files overlap with data files in LST. Result will be fully flagged.", verbose=verbose)
     else:
@@ -3716,6 +3721,7 @@ def post_redcal_abscal_argparser():
     a.add_argument("--phs_max_iter", default=100, type=int, help="integer maximum number of iterations of phase_slope_cal or TT_phs_cal allowed")
     a.add_argument("--phs_conv_crit", default=1e-6, type=float, help="convergence criterion for updates to iterative phase calibration that compares them to all 1.0s.")
     a.add_argument("--clobber", default=False, action="store_true", help="overwrites existing abscal calfits file at the output path")
+    a.add_argument("--use_time_index", default=False, action="store_true", help="match data and model times using a sidecar file time index in each file's directory")
     a.add_argument("--verbose", default=False, action="store_true", help="print calibration progress updates")
     args = a.parse_args()
     return args
@@ -9,13 +9,15 @@ import os
 import copy
 import warnings
 from functools import reduce
-from collections.abc import Iterable
+from collections.abc import Iterable, MutableMapping
 from pyuvdata import UVCal, UVData
 from pyuvdata import utils as uvutils
 from astropy import units
 import h5py
 import pickle
 import random
+import queue
+import threading
 import glob
 from pyuvdata.utils import POL_STR2NUM_DICT
 from . import redcal
@@ -30,7 +32,7 @@ except ImportError:
 
 from .datacontainer import DataContainer
 from .utils import polnum2str, polstr2num, jnum2str, jstr2num, filter_bls, chunk_baselines_by_redundant_groups
-from .utils import split_pol, conj_pol, LST2JD, HERA_TELESCOPE_LOCATION
+from .utils import split_pol, conj_pol, comply_bl, LST2JD, HERA_TELESCOPE_LOCATION
 
 
 class HERACal(UVCal):
@@ -201,23 +203,52 @@ def get_blt_slices(uvo, tried_to_reorder=False):
     Returns:
         blt_slices: dictionary mapping anntenna pair tuples to baseline-time slice objects
     '''
-    blt_slices = {}
-    for ant1, ant2 in uvo.get_antpairs():
-        indices = uvo.antpair2ind(ant1, ant2)
-        if len(indices) == 1:  # only one blt matches
-            blt_slices[(ant1, ant2)] = slice(indices[0], indices[0] + 1, uvo.Nblts)
-        elif not (len(set(np.ediff1d(indices))) == 1):  # checks if the consecutive differences are all the same
-            if not tried_to_reorder:
-                uvo.reorder_blts(order='time')
-                return get_blt_slices(uvo, tried_to_reorder=True)
-            else:
-                raise NotImplementedError('UVData objects with non-regular spacing of '
-                                          'baselines in its baseline-times are not supported.')
+    # group blts by antenna pair in a single stable sort, which keeps the blts of each pair in increasing
+    # order and orders the pairs like uvo.get_antpairs()
+    ant_1_array, ant_2_array = np.asarray(uvo.ant_1_array), np.asarray(uvo.ant_2_array)
+    order = np.lexsort((ant_2_array, ant_1_array))
+    ant1s, ant2s = ant_1_array[order], ant_2_array[order]
+    new_pair = np.ones(len(order), dtype=bool)
+    new_pair[1:] = (ant1s[1:] != ant1s[:-1]) | (ant2s[1:] != ant2s[:-1])
+    starts = np.flatnonzero(new_pair)
+    stops = np.append(starts[1:], len(order))
+
+    # check that consecutive blts of each antenna pair are evenly spaced
+    steps = np.diff(order)
+    same_pair = ~new_pair[1:]
+    pair_steps = np.full(len(starts), uvo.Nblts)
+    repeated = stops - starts > 1
+    pair_steps[repeated] = steps[starts[repeated]]
+    if np.any(steps[same_pair] != np.repeat(pair_steps, stops - starts)[:-1][same_pair]):
+        if not tried_to_reorder:
+            uvo.reorder_blts(order='time')
+            return get_blt_slices(uvo, tried_to_reorder=True)
         else:
-            blt_slices[(ant1, ant2)] = slice(indices[0], indices[-1] + 1, indices[1] - indices[0])
+            raise NotImplementedError('UVData objects with non-regular spacing of '
+                                      'baselines in its baseline-times are not supported.')
+
+    blt_slices = {}
+    for start, stop, step in zip(starts, stops, pair_steps):
+        blt_slices[(int(ant1s[start]), int(ant2s[start]))] = slice(int(order[start]), int(order[stop - 1]) + 1, int(step))
     return blt_slices
 
 
+def _match_indices(file_values, values):
+    '''Return the indices of values (e.g. times or frequencies) in file_values, which must contain them exactly.'''
+    order = np.argsort(file_values, kind='stable')
+    indices = order[np.minimum(np.searchsorted(file_values[order], values), len(order) - 1)]
+    if len(values) > 0 and (len(file_values) == 0 or np.any(file_values[indices] != values)):
+        raise ValueError('Data to write are not in the output file.')
+    return indices
+
+
+def _is_view_of(value, view):
+    '''Return True if value is an ndarray covering exactly the same memory as the ndarray view.'''
+    return (isinstance(value, np.ndarray) and value.dtype == view.dtype and value.shape == view.shape
+            and value.strides == view.strides
+            and value.__array_interface__['data'][0] == view.__array_interface__['data'][0])
+
+
 class HERAData(UVData):
     '''HERAData is a subclass of pyuvdata.UVData meant to serve as an interface between
     pyuvdata-compatible data formats on disk (especially uvh5) and DataContainers,
@@ -303,6 +334,7 @@ class HERAData(UVData):
                         getattr(self, meta)[f] = meta_dict[meta]
             else:  # save HERAData_metas as attributes
                 self._writers = {}
+                self._lazy_data = None
                 for key, value in self.get_metadata_dict().items():
                     setattr(self, key, value)
 
@@ -357,7 +389,7 @@ class HERAData(UVData):
         for i, polnum in enumerate(self.polarization_array):
             self._polnum_indices[polnum] = i
 
-    def _get_slice(self, data_array, key):
+    def _get_slice(self, data_array, key, copy_data=True):
         '''Return a copy of the Nint by Nfreq waterfall or waterfalls for a given key. Abstracts
         away both baseline ordering (by applying complex conjugation) and polarization capitalization.
 
@@ -367,16 +399,19 @@ class HERAData(UVData):
             key: if of the form (0,1,'nn'), return anumpy array.
                  if of the form (0,1), return a dict mapping pol strings to waterfalls.
                  if of of the form 'nn', return a dict mapping ant-pair tuples to waterfalls.
+            copy_data: if False, return strided views into data_array instead of copies, except for
+                 waterfalls of antenna-reversed baselines, which are conjugated copies.
         '''
         if isinstance(key, str):  # asking for a pol
-            return {antpair: self._get_slice(data_array, antpair + (key,)) for antpair in self.get_antpairs()}
+            return {antpair: self._get_slice(data_array, antpair + (key,), copy_data=copy_data) for antpair in self.get_antpairs()}
         elif len(key) == 2:  # asking for antpair
             pols = np.array([polnum2str(polnum, x_orientation=self.x_orientation) for polnum in self.polarization_array])
-            return {pol: self._get_slice(data_array, key + (pol,)) for pol in pols}
+            return {pol: self._get_slice(data_array, key + (pol,), copy_data=copy_data) for pol in pols}
         elif len(key) == 3:  # asking for bl-pol
             try:
-                return np.array(data_array[self._blt_slices[tuple(key[0:2])], 0, :,
-                                           self._polnum_indices[polstr2num(key[2], x_orientation=self.x_orientation)]])
+                waterfall = data_array[self._blt_slices[tuple(key[0:2])], 0, :,
+                                       self._polnum_indices[polstr2num(key[2], x_orientation=self.x_orientation)]]
+                return np.array(waterfall) if copy_data else waterfall
             except KeyError:
                 return np.conj(data_array[self._blt_slices[tuple(key[1::-1])], 0, :,
                                           self._polnum_indices[polstr2num(conj_pol(key[2]), x_orientation=self.x_orientation)]])
@@ -403,20 +438,28 @@ class HERAData(UVData):
                 self._set_slice(data_array, (key + (pol,)), value[pol])
         elif len(key) == 3:  # providing bl-pol
             try:
-                data_array[self._blt_slices[tuple(key[0:2])], 0, :,
-                           self._polnum_indices[polstr2num(key[2], x_orientation=self.x_orientation)]] = value
+                blt_slice = self._blt_slices[tuple(key[0:2])]
+                pol_index = self._polnum_indices[polstr2num(key[2], x_orientation=self.x_orientation)]
+                if _is_view_of(value, data_array[blt_slice, 0, :, pol_index]):
+                    return  # value is a view (e.g. from build_datacontainers(copy_data=False)), so it is already in data_array
+                data_array[blt_slice, 0, :, pol_index] = value
             except(KeyError):
                 data_array[self._blt_slices[tuple(key[1::-1])], 0, :,
                            self._polnum_indices[polstr2num(conj_pol(key[2]), x_orientation=self.x_orientation)]] = np.conj(value)
         else:
             raise KeyError('Unrecognized key type for slicing data.')
 
-    def build_datacontainers(self):
+    def build_datacontainers(self, copy_data=True):
         '''Turns the data currently loaded into the HERAData object into DataContainers.
         Returned DataContainers include useful metadata specific to the data actually
         in the DataContainers (which may be a subset of the total data). This includes
         antenna positions, frequencies, all times, all lsts, and times and lsts by baseline.
 
+        Arguments:
+            copy_data: if False, the waterfalls in the DataContainers are strided views into
+                data_array, flag_array and nsample_array instead of copies, which halves peak memory.
+                Modifying them in place modifies this object, and update() skips them.
+
         Returns:
             data: DataContainer mapping baseline keys to complex visibility waterfalls
             flags: DataContainer mapping baseline keys to boolean flag waterfalls
@@ -426,9 +469,9 @@ class HERAData(UVData):
         data, flags, nsamples = odict(), odict(), odict()
         meta = self.get_metadata_dict()
         for bl in meta['bls']:
-            data[bl] = self._get_slice(self.data_array, bl)
-            flags[bl] = self._get_slice(self.flag_array, bl)
-            nsamples[bl] = self._get_slice(self.nsample_array, bl)
+            data[bl] = self._get_slice(self.data_array, bl, copy_data=copy_data)
+            flags[bl] = self._get_slice(self.flag_array, bl, copy_data=copy_data)
+            nsamples[bl] = self._get_slice(self.nsample_array, bl, copy_data=copy_data)
         data = DataContainer(data)
         flags = DataContainer(flags)
         nsamples = DataContainer(nsamples)
@@ -442,7 +485,7 @@ class HERAData(UVData):
 
     def read(self, bls=None, polarizations=None, times=None, frequencies=None,
              freq_chans=None, axis=None, read_data=True, return_data=True,
-             run_check=True, check_extra=True, run_check_acceptability=True, **kwargs):
+             run_check=True, check_extra=True, run_check_acceptability=True, copy_data=True, **kwargs):
         '''Reads data from file. Supports partial data loading. Default: read all data in file.
 
         Arguments:
@@ -472,6 +515,8 @@ class HERAData(UVData):
                 ones. Default is True.
             run_check_acceptability: Option to check acceptable range of the values of
                 parameters after reading in the file. Default is True.
+            copy_data: bool, if False, the returned DataContainers hold views into this object's
+                data_array, flag_array and nsample_array instead of copies. See build_datacontainers().
             kwargs: extra keyword arguments to pass to UVData.read()
 
         Returns:
@@ -520,7 +565,7 @@ class HERAData(UVData):
             self._determine_blt_slicing()
             self._determine_pol_indexing()
         if read_data and return_data:
-            return self.build_datacontainers()
+            return self.build_datacontainers(copy_data=copy_data)
 
     def select(self, inplace=True, **kwargs):
         """
@@ -574,13 +619,42 @@ class HERAData(UVData):
         Shortcut for reading a single visibility waterfall given a
         baseline tuple. If key exists it will return it using its
         blt_slice, if it does not it will attempt to read it
-        from disk.
+        from disk. For a single uvh5 file, this reads only the requested
+        waterfall (see LazyDataContainer), leaving loaded data untouched.
         """
         try:
+            if self.data_array is None:  # no data loaded yet
+                raise KeyError(key)
             return self._get_slice(self.data_array, key)
         except KeyError:
+            if hasattr(self, '_lazy_data'):  # initialized from a single uvh5 file
+                if self._lazy_data is None:
+                    try:
+                        self._lazy_data = LazyDataContainer(self.filepaths[0])
+                    except NotImplementedError:  # e.g. baseline-times need reordering, so read instead
+                        del self._lazy_data
+                        return self.read(bls=key)[0][key]
+                return copy.deepcopy(self._lazy_data[key])
             return self.read(bls=key)[0][key]
 
+    def build_lazy_datacontainers(self, cache_bytes=None):
+        '''Make LazyDataContainers that read data, flags and nsamples waterfalls of this object's
+        uvh5 file on demand, instead of loading them all with read().
+
+        Arguments:
+            cache_bytes: maximum total size in bytes of the waterfalls each LazyDataContainer
+                keeps in memory. Default is LAZY_CACHE_BYTES.
+
+        Returns:
+            data: LazyDataContainer mapping baseline keys to complex visibility waterfalls
+            flags: LazyDataContainer mapping baseline keys to boolean flag waterfalls
+            nsamples: LazyDataContainer mapping baseline keys to Nsamples waterfalls
+        '''
+        if self.filetype != 'uvh5' or len(self.filepaths) > 1:
+            raise NotImplementedError('Lazy loading is only implemented for a single uvh5 file.')
+        return tuple(LazyDataContainer(self.filepaths[0], dataset=dataset, cache_bytes=cache_bytes)
+                     for dataset in ['visdata', 'flags', 'nsamples'])
+
     def update(self, data=None, flags=None, nsamples=None):
         '''Update internal data arrays (data_array, flag_array, and nsample_array)
         using DataContainers (if not left as None) in preparation for writing to disk.
@@ -631,7 +705,9 @@ class HERAData(UVData):
         # get writer or initialize new writer if necessary
         if output_path in self._writers:
             hd_writer = self._writers[output_path]  # This hd_writer has metadata for the entire output file
+            check_header = False  # already checked on the first write
         else:
+            check_header = True
             hd_writer = HERAData(self.filepaths[0])
             hd_writer.history += add_to_history
             for attribute, value in kwargs.items():
@@ -639,15 +715,50 @@ class HERAData(UVData):
             hd_writer.initialize_uvh5_file(output_path, clobber=clobber)  # Makes an empty file (called only once)
             self._writers[output_path] = hd_writer
         if inplace:  # update this objects's arrays using DataContainers
-            this = self
-        else:  # make a copy of this object and then update the relevant arrays using DataContainers
-            this = copy.deepcopy(self)
-        this.update(data=data, flags=flags, nsamples=nsamples)
-        hd_writer.write_uvh5_part(output_path, this.data_array, this.flag_array,
-                                  this.nsample_array, **self.last_read_kwargs)
+            self.update(data=data, flags=flags, nsamples=nsamples)
+            arrays = [self.data_array, self.flag_array, self.nsample_array]
+        else:  # copy only the arrays to update (not this whole object) and update them using DataContainers
+            arrays = []
+            for array, dc in [(self.data_array, data), (self.flag_array, flags), (self.nsample_array, nsamples)]:
+                if dc is not None:
+                    array = np.array(array)
+                    for bl in dc.keys():
+                        self._set_slice(array, bl, dc[bl])
+                arrays.append(array)
+
+        # write the hyperslabs of the output file holding the data in this object
+        orders, index_kwargs = self._write_indices(hd_writer)
+        for axis, order in zip([0, -2, -1], orders):
+            if np.any(order != np.arange(len(order))):
+                arrays = [np.take(array, order, axis=axis) for array in arrays]
+        hd_writer.write_uvh5_part(output_path, *arrays, check_header=check_header, **index_kwargs)
+
+    def _write_indices(self, hd_writer):
+        '''Find where the data in this object go in the file written by hd_writer, a HERAData object
+        with the metadata of the whole file, by matching antenna pairs, times, frequencies, and polarizations.
+
+        Returns:
+            orders: tuple of index arrays that sort the blt, frequency, and polarization axes of this
+                object's data like the file
+            index_kwargs: blt_inds, freq_chans, and polarizations keyword arguments for write_uvh5_part()
+                that select the sorted data in the file, or None where all of the file is selected
+        '''
+        blt_inds = np.empty(self.Nblts, dtype=int)
+        file_blts = np.arange(hd_writer.Nblts)
+        for antpair, blt_slice in self._blt_slices.items():
+            antpair_blts = file_blts[hd_writer._blt_slices[antpair]]
+            blt_inds[blt_slice] = antpair_blts[_match_indices(hd_writer.time_array[antpair_blts], self.time_array[blt_slice])]
+        freq_chans = _match_indices(np.ravel(hd_writer.freq_array), np.ravel(self.freq_array))
+        pol_inds = np.array([hd_writer._polnum_indices[polnum] for polnum in self.polarization_array])
+
+        orders = tuple(np.argsort(inds, kind='stable') for inds in [blt_inds, freq_chans, pol_inds])
+        index_kwargs = {'blt_inds': None if len(blt_inds) == hd_writer.Nblts else blt_inds[orders[0]],
+                        'freq_chans': None if len(freq_chans) == hd_writer.Nfreqs else freq_chans[orders[1]],
+                        'polarizations': None if len(pol_inds) == hd_writer.Npols else self.polarization_array[orders[2]]}
+        return orders, index_kwargs
 
     def iterate_over_bls(self, Nbls=1, bls=None, chunk_by_redundant_group=False, reds=None,
-                         bl_error_tol=1.0, include_autos=True, frequencies=None):
+                         bl_error_tol=1.0, include_autos=True, frequencies=None, prefetch=0):
         '''Produces a generator that iteratively yields successive calls to
         HERAData.read() by baseline or group of baselines.
 
@@ -676,6 +787,9 @@ class HERAData(UVData):
             frequencies: array-like, optional
                 optional list of float frequencies to load.
                 Default (None) loads all frequencies in data.
+            prefetch: int, optional
+                number of chunks to read ahead on a background thread while the current one
+                is processed. Default (0) reads each chunk when it is requested.
 
         Yields:
             data, flags, nsamples: DataContainers (see HERAData.read() for more info).
@@ -721,10 +835,10 @@ class HERAData(UVData):
             reds = redcal.filter_reds(reds, bls=bls)
             # make sure that every baseline is in reds
             baseline_chunks = chunk_baselines_by_redundant_groups(reds=reds, max_chunk_size=Nbls)
-        for chunk in baseline_chunks:
-            yield self.read(bls=chunk, frequencies=frequencies)
+        yield from self._iterate_reads([dict(bls=chunk, frequencies=frequencies) for chunk in baseline_chunks],
+                                       prefetch=prefetch)
 
-    def iterate_over_freqs(self, Nchans=1, freqs=None):
+    def iterate_over_freqs(self, Nchans=1, freqs=None, prefetch=0):
         '''Produces a generator that iteratively yields successive calls to
         HERAData.read() by frequency channel or group of contiguous channels.
 
@@ -732,6 +846,8 @@ class HERAData(UVData):
             Nchans: number of frequencies to load at once.
             freqs: optional user-provided list of frequencies to iterate over.
                 Default: use self.freqs (which only works for uvh5).
+            prefetch: number of chunks to read ahead on a background thread while the current
+                one is processed. Default (0) reads each chunk when it is requested.
 
         Yields:
             data, flags, nsamples: DataContainers (see HERAData.read() for more info).
@@ -743,10 +859,10 @@ class HERAData(UVData):
             freqs = self.freqs
             if isinstance(self.freqs, dict):  # multiple files
                 freqs = np.unique(list(self.freqs.values()))
-        for i in range(0, len(freqs), Nchans):
-            yield self.read(frequencies=freqs[i:i + Nchans])
+        yield from self._iterate_reads([dict(frequencies=freqs[i:i + Nchans]) for i in range(0, len(freqs), Nchans)],
+                                       prefetch=prefetch)
 
-    def iterate_over_times(self, Nints=1, times=None):
+    def iterate_over_times(self, Nints=1, times=None, prefetch=0):
         '''Produces a generator that iteratively yields successive calls to
         HERAData.read() by time or group of contiguous times.
 
@@ -754,6 +870,8 @@ class HERAData(UVData):
             Nints: number of integrations to load at once.
             times: optional user-provided list of times to iterate over.
                 Default: use self.times (which only works for uvh5).
+            prefetch: number of chunks to read ahead on a background thread while the current
+                one is processed. Default (0) reads each chunk when it is requested.
 
         Yields:
             data, flags, nsamples: DataContainers (see HERAData.read() for more info).
@@ -765,8 +883,189 @@ class HERAData(UVData):
             times = self.times
             if isinstance(times, dict):  # multiple files
                 times = np.unique(list(times.values()))
-        for i in range(0, len(times), Nints):
-            yield self.read(times=times[i:i + Nints])
+        yield from self._iterate_reads([dict(times=times[i:i + Nints]) for i in range(0, len(times), Nints)],
+                                       prefetch=prefetch)
+
+    def _iterate_reads(self, reads, prefetch=0):
+        '''Yield self.read(**kwargs) for each dictionary of keyword arguments in reads.
+
+        If prefetch > 0, a background thread reads up to prefetch chunks ahead of the one being
+        processed, each into a separate HERAData object. When a chunk is yielded, this object takes
+        over the state of the object that read it, exactly as if it had called read() itself, so that
+        e.g. update() and partial_write() work as usual. If reading fails, the error is raised when the
+        failed chunk would have been yielded. If the generator is closed early (or the caller raises),
+        the background thread is stopped before the generator exits.
+        '''
+        if prefetch <= 0 or self.filepaths is None:
+            for kwargs in reads:
+                yield self.read(**kwargs)
+            return
+
+        results = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
+
+        def _read_ahead():
+            template = None
+            for kwargs in reads:
+                try:
+                    if template is None:
+                        template = HERAData(self.filepaths, filetype=self.filetype)
+                    reader = copy.deepcopy(template)
+                    result = (reader, reader.read(**kwargs), None)
+                except BaseException as err:
+                    result = (None, None, err)
+                # wait for room in the queue, unless the generator was closed
+                while not stop.is_set():
+                    try:
+                        results.put(result, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set() or result[2] is not None:
+                    return
+
+        thread = threading.Thread(target=_read_ahead, daemon=True)
+        thread.start()
+        try:
+            for _ in reads:
+                reader, output, err = results.get()
+                if err is not None:
+                    raise err
+                self._take_read_state(reader)
+                yield output
+        finally:
+            stop.set()
+            thread.join()
+
+    def _take_read_state(self, other):
+        '''Take over the data, metadata, and read parameters that other, a HERAData object of the
+        same file(s), loaded with read(). Partial write state (and other per-object state) is kept.'''
+        keep = ['read', '_writers', '_lazy_data']
+        self.__dict__.update({k: v for k, v in other.__dict__.items() if k not in keep})
+
+
+# default maximum total size in bytes of the waterfalls kept in memory by each LazyDataContainer
+LAZY_CACHE_BYTES = 2**28
+
+
+class _LazyWaterfalls(MutableMapping):
+    '''Mapping from baseline keys to waterfalls of a uvh5 file, read on demand from one of its
+    datasets ('visdata', 'flags', or 'nsamples'). Used internally by LazyDataContainer.
+
+    Waterfalls read from disk are kept in a least-recently-used cache of at most cache_bytes, and are
+    read-only, since in-place modifications would be lost when they are evicted. Assigned waterfalls
+    are kept in memory and take precedence over the file.
+    '''
+
+    def __init__(self, filename, dataset, index, cache_bytes):
+        self.filename = filename
+        self.dataset = dataset
+        self._index = index  # maps keys to (blt slice, polarization index) in the file, or None if assigned
+        self.cache_bytes = cache_bytes
+        self._cache = odict()
+        self._cache_nbytes = 0
+        self._assigned = {}
+
+    def _read(self, key):
+        blt_slice, pol_index = self._index[key]
+        with h5py.File(self.filename, 'r') as _f:
+            dset = _f[u'Data'][self.dataset]
+            if dset.ndim == 4:  # (Nblts, 1, Nfreqs, Npols)
+                waterfall = dset[blt_slice, 0, :, pol_index]
+            else:  # (Nblts, Nfreqs, Npols)
+                waterfall = dset[blt_slice, :, pol_index]
+        if self.dataset == 'visdata':
+            if waterfall.dtype.names is not None:  # integer visibilities stored as separate real and imag fields
+                waterfall = waterfall['r'] + 1j * waterfall['i']
+            waterfall = waterfall.astype(np.complex128, copy=False)
+        return waterfall
+
+    def __getitem__(self, key):
+        if key in self._assigned:
+            return self._assigned[key]
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        if self._index.get(key) is None:
+            raise KeyError(key)
+        waterfall = self._read(key)
+        waterfall.flags.writeable = False
+        if waterfall.nbytes <= self.cache_bytes:
+            self._cache[key] = waterfall
+            self._cache_nbytes += waterfall.nbytes
+            while self._cache_nbytes > self.cache_bytes:
+                self._cache_nbytes -= self._cache.popitem(last=False)[1].nbytes
+        return waterfall
+
+    def __setitem__(self, key, value):
+        self._assigned[key] = value
+        if key in self._cache:
+            self._cache_nbytes -= self._cache.pop(key).nbytes
+        self._index.setdefault(key, None)
+
+    def __delitem__(self, key):
+        del self._index[key]
+        self._assigned.pop(key, None)
+        if key in self._cache:
+            self._cache_nbytes -= self._cache.pop(key).nbytes
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+
+class LazyDataContainer(DataContainer):
+    '''DataContainer backed by the Data/visdata, flags, or nsamples dataset of a uvh5 file. Each
+    waterfall is read from disk (as a hyperslab of the dataset) on first access, and kept in a
+    least-recently-used cache with a budget of cache_bytes. Supports the same key normalization
+    (baseline ordering and polarization case) and metadata as DataContainers made by HERAData.read().
+
+    Waterfalls read from disk are read-only. Assigning a waterfall (e.g. data[bl] = data[bl] * 2)
+    keeps it in memory, and it takes precedence over the file.
+    '''
+
+    def __init__(self, filename, dataset='visdata', cache_bytes=None):
+        '''Make a LazyDataContainer from a uvh5 file, reading only its metadata.
+
+        Arguments:
+            filename: path to uvh5 file
+            dataset: name of the dataset in the Data group of the file to read waterfalls from, i.e.
+                'visdata' (default), 'flags', or 'nsamples'
+            cache_bytes: maximum total size in bytes of the waterfalls kept in memory.
+                Default is LAZY_CACHE_BYTES.
+        '''
+        if dataset not in ['visdata', 'flags', 'nsamples']:
+            raise ValueError("dataset must be 'visdata', 'flags', or 'nsamples'.")
+        hd = HERAData(filename, filetype='uvh5')
+
+        # the slices of HERAData index blts after any reordering, so they only index the file if none was needed
+        with h5py.File(filename, 'r') as _f:
+            ant_1_array = _f[u'Header'][u'ant_1_array'][()]
+            ant_2_array = _f[u'Header'][u'ant_2_array'][()]
+        if not (np.array_equal(ant_1_array, hd.ant_1_array) and np.array_equal(ant_2_array, hd.ant_2_array)):
+            raise NotImplementedError('Lazy loading of uvh5 files with non-regular spacing of '
+                                      'baselines in their baseline-times is not supported.')
+
+        index = odict()
+        for bl in hd.bls:
+            index[comply_bl(bl)] = (hd._blt_slices[bl[:2]],
+                                    hd._polnum_indices[polstr2num(bl[2], x_orientation=hd.x_orientation)])
+        self._data = _LazyWaterfalls(filename, dataset, index,
+                                     LAZY_CACHE_BYTES if cache_bytes is None else cache_bytes)
+        self._antpairs = set([k[:2] for k in self._data.keys()])
+        self._pols = set([k[-1] for k in self._data.keys()])
+        for attr in ['ants', 'data_ants', 'antpos', 'data_antpos', 'freqs', 'times', 'lsts', 'times_by_bl', 'lsts_by_bl']:
+            setattr(self, attr, copy.deepcopy(getattr(hd, attr)))
+
+    def clear_cache(self):
+        '''Remove all waterfalls read from disk from memory. Assigned waterfalls are kept.'''
+        self._data._cache.clear()
+        self._data._cache_nbytes = 0
 
 
 def read_filter_cache_scratch(cache_dir):
@@ -931,7 +1230,98 @@ def load_flags(flagfile, filetype='h5', return_meta=False):
         return flags
 
 
-def get_file_times(filepaths, filetype='uvh5'):
+# name of the sidecar index of file times that get_file_times() keeps in each data directory
+FILE_TIME_INDEX = '.file_times.hdf5'
+
+
+def _read_file_times(filepath, filetype='uvh5'):
+    """Read (dlst, dtime, lst_array, time_array) of a single file. See get_file_times() for details."""
+    if filetype == 'miriad':
+        assert AIPY, "you need aipy to use the miriad filetype"
+        uv = aipy.miriad.UV(filepath)
+        # get integration time
+        int_time = uv['inttime'] / (units.si.day.in_units(units.si.s))
+        int_time_rad = uv['inttime'] * 2 * np.pi / (units.si.sday.in_units(units.si.s))
+        # get start and stop, add half an integration
+        start_lst = uv['lst'] + int_time_rad / 2.0
+        start_time = uv['time'] + int_time / 2.0
+        # form time arrays
+        lst_array = (start_lst + np.arange(uv['ntimes']) * int_time_rad) % (2 * np.pi)
+        time_array = start_time + np.arange(uv['ntimes']) * int_time
+
+    elif filetype == 'uvh5':
+        # get times directly from uvh5 file's header: faster than loading entire file via HERAData
+        with h5py.File(filepath, mode='r') as _f:
+            time_array = np.unique(_f[u'Header'][u'time_array'])
+            if u'lst_array' in _f[u'Header']:
+                lst_array = np.ravel(_f[u'Header'][u'lst_array'])
+            else:
+                lst_array = np.ravel(uvutils.get_lst_for_time(_f[u'Header'][u'time_array'],
+                                                              _f[u'Header'][u'latitude'][()],
+                                                              _f[u'Header'][u'longitude'][()],
+                                                              _f[u'Header'][u'altitude'][()]))
+        lst_indices = np.unique(lst_array, return_index=True)[1]
+        # resort by their appearance in lst_array, then unwrap
+        lst_array = np.unwrap(lst_array[np.sort(lst_indices)])
+        int_time_rad = np.median(np.diff(lst_array))
+        int_time = np.median(np.diff(time_array))
+
+    return int_time_rad, int_time, lst_array, time_array
+
+
+def _read_file_time_index(index_file):
+    """
+    Read a file time index written by _write_file_time_index() into a dictionary mapping
+    file basenames to ((filetype, mtime_ns, size), (dlst, dtime, lst_array, time_array)).
+    Missing or unreadable indices are treated as empty.
+    """
+    index = odict()
+    try:
+        with h5py.File(index_file, mode='r') as f:
+            names = [name.decode() for name in f['names'][()]]
+            filetypes = [filetype.decode() for filetype in f['filetypes'][()]]
+            mtimes, sizes = f['mtime_ns'][()], f['size'][()]
+            dlsts, dtimes = f['dlst'][()], f['dtime'][()]
+            lst_arrays = np.split(f['lst_array'][()], np.cumsum(f['nlsts'][()])[:-1])
+            time_arrays = np.split(f['time_array'][()], np.cumsum(f['ntimes'][()])[:-1])
+    except (OSError, KeyError):
+        return index
+    for i, name in enumerate(names):
+        index[name] = ((filetypes[i], int(mtimes[i]), int(sizes[i])),
+                       (dlsts[i], dtimes[i], lst_arrays[i], time_arrays[i]))
+    return index
+
+
+def _write_file_time_index(index_file, index):
+    """
+    Write a dictionary in the format returned by _read_file_time_index() to index_file, storing the
+    per-file arrays concatenated so that the whole index can be read back with a handful of dataset
+    reads. The index is written to a temporary file and moved into place, so concurrent readers never
+    see a partial index. Failures to write (e.g. in a read-only directory) are warned about and ignored.
+    """
+    stamps = [stamp for stamp, _ in index.values()]
+    times = [file_times for _, file_times in index.values()]
+    tmp_file = index_file + '.%032x.tmp' % random.getrandbits(128)
+    try:
+        with h5py.File(tmp_file, mode='w') as f:
+            f['names'] = np.array([name.encode() for name in index.keys()], dtype=bytes)
+            f['filetypes'] = np.array([stamp[0].encode() for stamp in stamps], dtype=bytes)
+            f['mtime_ns'] = np.array([stamp[1] for stamp in stamps], dtype=np.int64)
+            f['size'] = np.array([stamp[2] for stamp in stamps], dtype=np.int64)
+            f['dlst'] = np.array([ft[0] for ft in times], dtype=float)
+            f['dtime'] = np.array([ft[1] for ft in times], dtype=float)
+            f['nlsts'] = np.array([len(ft[2]) for ft in times], dtype=np.int64)
+            f['ntimes'] = np.array([len(ft[3]) for ft in times], dtype=np.int64)
+            f['lst_array'] = np.concatenate([np.asarray(ft[2], dtype=float) for ft in times] + [np.zeros(0)])
+            f['time_array'] = np.concatenate([np.asarray(ft[3], dtype=float) for ft in times] + [np.zeros(0)])
+        os.replace(tmp_file, index_file)
+    except OSError as err:
+        warnings.warn("Could not write file time index {}: {}".format(index_file, err))
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+def get_file_times(filepaths, filetype='uvh5', use_time_index=False):
     """
     Get a file's lst_array in radians and time_array in Julian Date.
 
@@ -943,6 +1333,10 @@ def get_file_times(filepaths, filetype='uvh5'):
     Args:
         filepaths : type=list or str, filepath or list of filepaths
         filetype : str, options=['miriad', 'uvh5']
+        use_time_index : bool, if True, look up the times of each file in a sidecar index (named
+            FILE_TIME_INDEX) in the file's directory, instead of reading them from the file.
+            Entries are keyed by file name, filetype, modification time and size, so files that
+            are new or have changed since they were indexed are read and the index is updated.
 
     Returns:
         dlst : ndarray (or float if filepaths is a string) of lst bin width [radian]
@@ -961,54 +1355,36 @@ def get_file_times(filepaths, filetype='uvh5'):
     if filetype not in ['miriad', 'uvh5']:
         raise ValueError("filetype {} not recognized".format(filetype))
 
-    # form empty lists
-    dlsts = []
-    dtimes = []
-    file_lst_arrays = []
-    file_time_arrays = []
-
-    # get Nfiles
-    Nfiles = len(filepaths)
-
-    # iterate over filepaths and extract time info
-    for i, f in enumerate(filepaths):
-        if filetype == 'miriad':
-            assert AIPY, "you need aipy to use the miriad filetype"
-            uv = aipy.miriad.UV(f)
-            # get integration time
-            int_time = uv['inttime'] / (units.si.day.in_units(units.si.s))
-            int_time_rad = uv['inttime'] * 2 * np.pi / (units.si.sday.in_units(units.si.s))
-            # get start and stop, add half an integration
-            start_lst = uv['lst'] + int_time_rad / 2.0
-            start_time = uv['time'] + int_time / 2.0
-            # form time arrays
-            lst_array = (start_lst + np.arange(uv['ntimes']) * int_time_rad) % (2 * np.pi)
-            time_array = start_time + np.arange(uv['ntimes']) * int_time
+    if use_time_index:
+        # read each directory's index once, then read and index only new or modified files
+        file_times = {}
+        dir_files = odict()
+        for f in filepaths:
+            dir_files.setdefault(os.path.dirname(os.path.abspath(f)), []).append(f)
+        for dirname, files in dir_files.items():
+            index_file = os.path.join(dirname, FILE_TIME_INDEX)
+            index = _read_file_time_index(index_file)
+            updated = False
+            for f in files:
+                name = os.path.basename(os.path.abspath(f))
+                stat = os.stat(f)
+                stamp = (filetype, stat.st_mtime_ns, stat.st_size)
+                if name not in index or index[name][0] != stamp:
+                    index[name] = (stamp, _read_file_times(f, filetype=filetype))
+                    updated = True
+                file_times[f] = index[name][1]
+            if updated:
+                _write_file_time_index(index_file, index)
+        # copy arrays, since callers are free to modify them in place
+        file_times = [(dlst, dtime, np.array(lsts), np.array(times)) for dlst, dtime, lsts, times in
+                      [file_times[f] for f in filepaths]]
+    else:
+        file_times = [_read_file_times(f, filetype=filetype) for f in filepaths]
 
-        elif filetype == 'uvh5':
-            # get times directly from uvh5 file's header: faster than loading entire file via HERAData
-            with h5py.File(f, mode='r') as _f:
-                time_array = np.unique(_f[u'Header'][u'time_array'])
-                if u'lst_array' in _f[u'Header']:
-                    lst_array = np.ravel(_f[u'Header'][u'lst_array'])
-                else:
-                    lst_array = np.ravel(uvutils.get_lst_for_time(_f[u'Header'][u'time_array'],
-                                                                  _f[u'Header'][u'latitude'][()],
-                                                                  _f[u'Header'][u'longitude'][()],
-                                                                  _f[u'Header'][u'altitude'][()]))
-            lst_indices = np.unique(lst_array, return_index=True)[1]
-            # resort by their appearance in lst_array, then unwrap
-            lst_array = np.unwrap(lst_array[np.sort(lst_indices)])
-            int_time_rad = np.median(np.diff(lst_array))
-            int_time = np.median(np.diff(time_array))
-
-        dlsts.append(int_time_rad)
-        dtimes.append(int_time)
-        file_lst_arrays.append(lst_array)
-        file_time_arrays.append(time_array)
-
-    dlsts = np.asarray(dlsts)
-    dtimes = np.asarray(dtimes)
+    dlsts = np.asarray([ft[0] for ft in file_times])
+    dtimes = np.asarray([ft[1] for ft in file_times])
+    file_lst_arrays = [ft[2] for ft in file_times]
+    file_time_arrays = [ft[3] for ft in file_times]
 
     if _array is False:
         return dlsts[0], dtimes[0], file_lst_arrays[0], file_time_arrays[0]
@@ -1086,6 +1462,8 @@ def save_redcal_meta(meta_filename, fc_meta, omni_meta, freqs, times, lsts, antp
         omni_grp['iter'].attrs['pols'] = pols_keys
         omni_grp['conv_crit'] = np.array([omni_meta['conv_crit'][pols] for pols in pols_keys])
         omni_grp['conv_crit'].attrs['conv_crit'] = np.string_(pols_keys)
+        if 'rerun_times' in omni_meta:  # wall-clock seconds spent on each run of redcal_run()
+            omni_grp['rerun_times'] = np.asarray(omni_meta['rerun_times'])
 
 
 def read_redcal_meta(meta_filename):
@@ -1125,6 +1503,8 @@ def read_redcal_meta(meta_filename):
         omni_meta['chisq'] = {pols: chisq for pols, chisq in zip(pols_keys, infile['omni_meta']['chisq'][:, :])}
         omni_meta['iter'] = {pols: itr for pols, itr in zip(pols_keys, infile['omni_meta']['iter'][:, :])}
         omni_meta['conv_crit'] = {pols: cc for pols, cc in zip(pols_keys, infile['omni_meta']['conv_crit'][:, :])}
+        if 'rerun_times' in infile['omni_meta']:
+            omni_meta['rerun_times'] = infile['omni_meta']['rerun_times'][:]
 
     return fc_meta, omni_meta, freqs, times, lsts, antpos, history
 
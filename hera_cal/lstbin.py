@@ -11,6 +11,11 @@ import numpy as np
 import operator
 import gc as garbage_collector
 import datetime
+import itertools
+import hashlib
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor
 
 from . import utils
 from . import version
@@ -20,6 +25,9 @@ from . import redcal
 from . import apply_cal
 from .datacontainer import DataContainer
 
+# name of the manifest of completed output files that lst_bin_files() keeps in its output directory
+LST_BIN_MANIFEST = 'lst_bin_manifest.json'
+
 
 def baselines_same_across_nights(data_list):
     """
@@ -68,9 +76,8 @@ def lst_bin(data_list, lst_list, flags_list=None, nsamples_list=None, dlst=None,
     flags_list : type=list, list of DataContainer dictionaries holding flags for each data dict
         in data_list. Flagged data do not contribute to the average of an LST bin.
     nsamples_list : type=list. List of DataContainer dictionaries holding nsamples for each data dict
-        in data_list. nsamples_list values are used to weight the data being averaged
-        when median=False. Default is None -> all non-flagged nsamples are set to unity.
-        median=False not supported if nsamples_list is not None!
+        in data_list. nsamples_list values are used to weight the data being averaged, or the
+        median if median=True. Default is None -> all non-flagged nsamples are set to unity.
     dlst : type=float, delta-LST spacing for lst_grid. If None, will use the delta-LST of the first
         array in lst_list.
     begin_lst : type=float, beginning LST for making the lst_grid, extending from
@@ -80,13 +87,12 @@ def lst_bin(data_list, lst_list, flags_list=None, nsamples_list=None, dlst=None,
     flag_thresh : type=float, minimum fraction of flagged points in an LST bin needed to
         flag the entire bin.
     atol : type=float, absolute tolerance for comparing LST bin center floats
-    median : type=boolean, if True use median for LST binning. Warning: this is slower.
-             median=True is not supported when nsamples_list is not None.
+    median : type=boolean, if True use the (nsamples-weighted) median of the real and imag components
+             for LST binning, instead of the mean.
     truncate_empty : type=boolean, if True, truncate output time bins that have
         no averaged data in them.
     sig_clip : type=boolean, if True, perform a sigma clipping algorithm of the LST bins on the
         real and imag components separately. Resultant clip flags are OR'd between real and imag.
-        Warning: This is considerably slow.
     sigma : type=float, input sigma threshold to use for sigma clipping algorithm.
     min_N : type=int, minimum number of points in averaged LST bin needed to perform sigma clipping
     return_no_avg : type=boolean, if True, return binned but un-averaged data and flags.
@@ -121,8 +127,6 @@ def lst_bin(data_list, lst_list, flags_list=None, nsamples_list=None, dlst=None,
             un-averaged complex visibilities in each LST bin as values.
         flags_min : dictionary with data flags
     """
-    if nsamples_list is not None and median:
-        raise NotImplementedError("LST binning with median not supported with nsamples_list is not None.")
     # get visibility shape
     Ntimes, Nfreqs = data_list[0][list(data_list[0].keys())[0]].shape
     # check whether baselines are the same across all nights
@@ -134,144 +138,82 @@ def lst_bin(data_list, lst_list, flags_list=None, nsamples_list=None, dlst=None,
         dlst = np.median(np.diff(lst_list[0]))
 
     # construct lst_grid
-    lst_grid = make_lst_grid(dlst, begin_lst=begin_lst, verbose=verbose)
-    dlst = np.median(np.diff(lst_grid))
-
-    # test for special case of lst grid restriction
-    if lst_low is not None and lst_hi is not None and lst_hi < lst_low:
-        lst_grid = lst_grid[(lst_grid > (lst_low - atol)) | (lst_grid < (lst_hi + atol))]
-    else:
-        # restrict lst_grid based on lst_low and lst_high
-        if lst_low is not None:
-            lst_grid = lst_grid[lst_grid > (lst_low - atol)]
-        if lst_hi is not None:
-            lst_grid = lst_grid[lst_grid < (lst_hi + atol)]
-
-    # Raise Exception if lst_grid is empty
-    if len(lst_grid) == 0:
-        raise ValueError("len(lst_grid) == 0; consider changing lst_low and/or lst_hi.")
-
-    # move lst_grid centers to the left
-    lst_grid_left = lst_grid - dlst / 2
-
-    # form new dictionaries
-    # data is a dictionary that will hold other dictionaries as values, which will
-    # themselves hold lists of ndarrays
-    data = odict()
-    flags = odict()
-    nsamples = odict()
+    lst_grid, dlst = _restricted_lst_grid(dlst, begin_lst=begin_lst, lst_low=lst_low, lst_hi=lst_hi, atol=atol, verbose=verbose)
+
+    # Every integration that falls in an LST bin becomes an "entry" of that (baseline, LST bin). Entries are
+    # first counted and assigned a slot along a days axis, then scattered into preallocated arrays of shape
+    # (Nbls, Nbins, Ndays, Nfreqs), so that all statistics can be computed with vectorized reductions.
+    keys = odict()  # maps each output baseline key to its index along the baseline axis
+    nentries = []  # for each baseline, the number of entries in each LST bin
+    first_filled = []  # for each baseline, the order in which each LST bin received its first entry
+    n_filled = 0
+    scatters = []  # (night index, baseline index, source key, conjugate, time indices, LST bins, slots)
+    nights = []  # (data, rephasing phasors or None)
+    dtypes = set()
     all_lst_indices = set()
     pols = list(set([pol for dc in data_list for pol in dc.pols()]))
-    # iterate over data_list
-    for i, d in enumerate(data_list):
-        # get lst array
-        li = copy.copy(lst_list[i])
 
-        # ensure l isn't wrapped relative to lst_grid
-        li[li < lst_grid_left.min() - atol] += 2 * np.pi
+    def _add_key(key):
+        keys[key] = len(keys)
+        nentries.append(np.zeros(len(lst_grid), dtype=int))
+        first_filled.append(np.full(len(lst_grid), -1, dtype=int))
 
-        # digitize data lst array "l"
-        grid_indices = np.digitize(li, lst_grid_left[1:], right=True)
+    def _fill(kidx, bins):
+        # record the order in which bins (given in order of appearance) get their first entry
+        nonlocal n_filled
+        new = bins[nentries[kidx][bins] == 0]
+        first_filled[kidx][new] = n_filled + np.arange(len(new))
+        n_filled += len(new)
 
-        # make data_in_bin boolean array, and set to False data that don't fall in any bin
-        data_in_bin = np.ones_like(li, np.bool)
-        data_in_bin[(li < lst_grid_left.min() - atol)] = False
-        data_in_bin[(li > lst_grid_left.max() + dlst + atol)] = False
+    # iterate over data_list
+    for i, d in enumerate(data_list):
+        # get the LST grid index of each integration
+        li, grid_indices, data_in_bin = _lst_grid_indices(lst_list[i], lst_grid, dlst, atol=atol)
 
         # update all_lst_indices
         all_lst_indices.update(set(grid_indices[data_in_bin]))
 
-        if rephase:
-            # rephase each integration in d to nearest LST bin
-            if freq_array is None or antpos is None:
-                raise ValueError("freq_array and antpos is needed for rephase")
+        # phasors that rephase each integration in d to nearest LST bin, applied as d is scattered
+        phasors = _grid_phasors(d, li, lst_grid[grid_indices], antpos, freq_array, lat=lat) if rephase else None
+        nights.append((d, phasors))
 
-            # form baseline dictionary
-            bls = odict([(k, antpos[k[0]] - antpos[k[1]]) for k in d.keys()])
-
-            # get appropriate lst_shift for each integration, then rephase
-            lst_shift = lst_grid[grid_indices] - li
-
-            # this makes a copy of the data in d
-            d = utils.lst_rephase(d, bls, freq_array, lst_shift, lat=lat, inplace=False)
+        # each integration's slot in its LST bin, relative to the entries from previous nights
+        tinds = np.nonzero(data_in_bin)[0]
+        tbins = grid_indices[tinds]
+        ranks, night_bins, night_counts = _bin_ranks(tbins)
 
         # iterate over keys in d
-        klist = list(d.keys())
-        for j, key in enumerate(klist):
-            # if bl_list is not None, use it to determine conjugation:
-            # this is to prevent situations where conjugation of bl in
-            # data_list is different from bl in data which can cause
-            # inconsistent conjugation conventions in different LST chunks.
-            if bl_list is not None:
-                if utils.reverse_bl(key)[:2] in bl_list:
-                    key = utils.reverse_bl(key)
-            # data[key] will be an odict. if data[key] doesn't exist
-            # create data[key] as an empty odict. if data[key] already
-            # exists, then pass
-            if key in data:
-                pass
-            elif utils.reverse_bl(key) in data:
-                # check to see if conj(key) exists in data
-                key = utils.reverse_bl(key)
-                d[key] = np.conj(d[utils.reverse_bl(key)])
-                if flags_list is not None:
-                    flags_list[i][key] = flags_list[i][utils.reverse_bl(key)]
-                if nsamples_list is not None:
-                    nsamples_list[i][key] = nsamples_list[i][utils.reverse_bl(key)]
-            else:
-                # if key or conj(key) not in data, insert key into data as an odict
-                data[key] = odict()
-                flags[key] = odict()
-                nsamples[key] = odict()
-            # data[key] is an odict, with keys as grid index integers and
-            # values as lists holding the LST bin data: ndarrays of shape (Nfreqs)
-
-            # iterate over grid_indices, and append to data if data_in_bin is True
-            for k, ind in enumerate(grid_indices):
-                # ensure data_in_bin is True for this grid index
-                if data_in_bin[k]:
-                    # if index not in data[key], insert it as empty list
-                    if ind not in data[key]:
-                        data[key][ind] = []
-                        flags[key][ind] = []
-                        nsamples[key][ind] = []
-                    # append data ndarray to LST bin
-                    data[key][ind].append(d[key][k])
-                    # also insert flags if fed
-                    if flags_list is None:
-                        flags[key][ind].append(np.zeros_like(d[key][k], np.bool))
-                    else:
-                        flags[key][ind].append(flags_list[i][key][k])
-                    if nsamples_list is None:
-                        nsamples[key][ind].append(np.ones_like(d[key][k], np.int8))
-                    else:
-                        nsamples[key][ind].append(nsamples_list[i][key][k])
+        for key in d.keys():
+            dtypes.add(d[key].dtype)
+            key, src_key, conj = _binned_key(key, keys, bl_list=bl_list)
+            if key not in keys:
+                _add_key(key)
+            kidx = keys[key]
+            slots = nentries[kidx][tbins] + ranks
+            _fill(kidx, night_bins)
+            nentries[kidx][night_bins] += night_counts
+            scatters.append((i, kidx, src_key, conj, tinds, tbins, slots))
 
         # add in spoofed baselines to keep baselines in different LST files consistent.
         if bl_list is not None:
             for antpair in bl_list:
                 for pol in pols:
                     key = antpair + (pol,)
-                    if key not in data and ((key[0] != key[1] and utils.reverse_bl(key) not in data) or key[0] == key[1]):
+                    if key not in keys and ((key[0] != key[1] and utils.reverse_bl(key) not in keys) or key[0] == key[1]):
                         # last part lets us spoof ne and en for autocorrs. If we dont include it, only en xor ne will be spoofed.
-                        nsamples[key] = odict({ind: [] for ind in range(len(lst_grid))})
-                        data[key] = odict({ind: [] for ind in range(len(lst_grid))})
-                        flags[key] = odict({ind: [] for ind in range(len(lst_grid))})
+                        _add_key(key)
+                    if key not in keys:
+                        continue
 
                     # Since different nights have different sets of baselines and different LST bins have different sets of nights,
                     # it is possible to get a baseline that appears in a subset of the LSTs within an LST chunk
                     # (for example, a baseline that exists in one of the nights that only contained a subset of
                     # the LSTs in the LST chunk being processed).
-                    # The following lines address this case.
-                    for ind in range(len(lst_grid)):
-                        if ind not in nsamples[key]:
-                            nsamples[key][ind] = []
-                            flags[key][ind] = []
-                            data[key][ind] = []
-                        if len(nsamples[key][ind]) == 0:
-                            nsamples[key][ind].append(np.zeros(Nfreqs, np.int8))
-                            flags[key][ind].append(np.ones(Nfreqs, dtype=bool))
-                            data[key][ind].append(np.zeros(Nfreqs, dtype=complex))
+                    # Every LST bin without any entries gets a single completely flagged, zero-weight placeholder entry.
+                    kidx = keys[key]
+                    empty = np.nonzero(nentries[kidx] == 0)[0]
+                    _fill(kidx, empty)
+                    nentries[kidx][empty] = 1
 
     # get final lst_bin array
     if truncate_empty:
@@ -279,17 +221,12 @@ def lst_bin(data_list, lst_list, flags_list=None, nsamples_list=None, dlst=None,
         lst_bins = lst_grid[sorted(all_lst_indices)]
     else:
         # keep all lst_grid bins and fill empty ones with zero data and mark as flagged
-        for index in range(len(lst_grid)):
-            if index in all_lst_indices and bls_same_across_nights:
-                continue
-            else:
-                for key in list(data.keys()):
-                    # fill data with blank data
-                    # if the index is not present.
-                    if index not in data[key]:
-                        data[key][index] = [np.zeros(Nfreqs, np.complex)]
-                        flags[key][index] = [np.ones(Nfreqs, np.bool)]
-                        nsamples[key][index] = [np.zeros(Nfreqs, np.int8)]
+        fill_bins = np.array([index for index in range(len(lst_grid))
+                              if not (index in all_lst_indices and bls_same_across_nights)], dtype=int)
+        for kidx in range(len(keys)):
+            empty = fill_bins[nentries[kidx][fill_bins] == 0]
+            _fill(kidx, empty)
+            nentries[kidx][empty] = 1
 
         # use all LST bins
         lst_bins = lst_grid
@@ -297,116 +234,555 @@ def lst_bin(data_list, lst_list, flags_list=None, nsamples_list=None, dlst=None,
     # wrap lst_bins if needed
     lst_bins = lst_bins % (2 * np.pi)
 
-    # make final dictionaries
+    # only allocate LST bins that have entries for some baseline
+    nentries = np.array(nentries, dtype=int).reshape(len(keys), len(lst_grid))
+    used_bins = np.nonzero(np.any(nentries > 0, axis=0))[0]
+    bin_col = np.zeros(len(lst_grid), dtype=int)
+    bin_col[used_bins] = np.arange(len(used_bins))
+    nentries = nentries[:, used_bins]
+    Ndays = max(np.max(nentries, initial=0), 1)
+
+    # scatter data into preallocated arrays. Unfilled slots and placeholder entries are zero data,
+    # flagged, with zero nsamples.
+    shape = (len(keys), len(used_bins), Ndays, Nfreqs)
+    data = np.zeros(shape, dtype=np.result_type(np.complex64, *dtypes))
+    flags = np.ones(shape, dtype=bool)
+    nsamples = np.zeros(shape, dtype=float)
+    for i, kidx, src_key, conj, tinds, tbins, slots in scatters:
+        inds = (kidx, bin_col[tbins], slots)
+        d, phasors = nights[i]
+        d = d[src_key][tinds] if phasors is None else d[src_key][tinds] * phasors[src_key][tinds]
+        data[inds] = np.conj(d) if conj else d
+        flags[inds] = False if flags_list is None else flags_list[i][src_key][tinds]
+        nsamples[inds] = 1 if nsamples_list is None else nsamples_list[i][src_key][tinds]
+    del nights, scatters
+
+    # return un-averaged data if desired
+    if return_no_avg:
+        # return all binned data instead of just the bin average, with LST bins in the order they were filled
+        data_bins, flag_bins = odict(), odict()
+        for key, kidx in keys.items():
+            bins = used_bins[nentries[kidx] > 0]
+            bins = bins[np.argsort(first_filled[kidx][bins], kind='stable')]
+            data_bins[key] = [list(data[kidx, bin_col[b], :nentries[kidx, bin_col[b]]]) for b in bins]
+            flag_bins[key] = [list(flags[kidx, bin_col[b], :nentries[kidx, bin_col[b]]]) for b in bins]
+
+        return lst_bins, data_bins, flag_bins
+
+    # get statistics for all baselines and LST bins at once
+    d_avg, f_min, d_std, d_num = _lst_bin_stats(data, flags, nsamples, nentries, flag_thresh=flag_thresh,
+                                                median=median, sig_clip=sig_clip, sigma=sigma, min_N=min_N)
+
+    # make final dictionaries, keeping only the LST bins with entries for each baseline
     flags_min = odict()
     data_avg = odict()
     data_count = odict()
     data_std = odict()
+    for key, kidx in keys.items():
+        cols = np.nonzero(nentries[kidx])[0]
+        data_avg[key] = d_avg[kidx, cols]
+        flags_min[key] = f_min[kidx, cols]
+        data_std[key] = d_std[kidx, cols]
+        data_count[key] = d_num[kidx, cols]
 
-    # return un-averaged data if desired
-    if return_no_avg:
-        # return all binned data instead of just the bin average
-        data_bins = odict([(k1, [data[k1][k2] for k2 in data[k1].keys()]) for k1 in data.keys()])
-        flag_bins = odict([(k1, [flags[k1][k2] for k2 in flags[k1].keys()]) for k1 in flags.keys()])
+    # turn into DataContainer objects
+    data_avg = DataContainer(data_avg)
+    flags_min = DataContainer(flags_min)
+    data_std = DataContainer(data_std)
+    data_count = DataContainer(data_count)
 
-        return lst_bins, data_bins, flag_bins
+    return lst_bins, data_avg, flags_min, data_std, data_count
 
-    # iterate over data keys (baselines) and get statistics
-    for i, key in enumerate(data.keys()):
 
-        # create empty lists
-        real_avg = []
-        imag_avg = []
-        f_min = []
-        real_std = []
-        imag_std = []
-        bin_count = []
-        # iterate over sorted LST grid indices in data[key]
-        for j, ind in enumerate(sorted(data[key].keys())):
+def _restricted_lst_grid(dlst, begin_lst=None, lst_low=None, lst_hi=None, atol=1e-10, verbose=True):
+    """
+    Make an LST grid with make_lst_grid() and restrict it to bin centers between lst_low and lst_hi.
+    See lst_bin() for details on the parameters.
 
-            # make data and flag arrays from lists
-            d = np.array(data[key][ind])  # shape = (Ndays x Nfreqs)
-            f = np.array(flags[key][ind])
-            n = np.array(nsamples[key][ind])
-            f[np.isnan(f)] = True
+    Output: (lst_grid, dlst)
+    -------
+    lst_grid : ndarray of LST bin centers
+    dlst : float, LST bin width of lst_grid
+    """
+    lst_grid = make_lst_grid(dlst, begin_lst=begin_lst, verbose=verbose)
+    dlst = np.median(np.diff(lst_grid))
 
-            # replace flagged data with nan
-            d[f] *= np.nan  # multiplication (instead of assignment) gets real and imag
+    # test for special case of lst grid restriction
+    if lst_low is not None and lst_hi is not None and lst_hi < lst_low:
+        lst_grid = lst_grid[(lst_grid > (lst_low - atol)) | (lst_grid < (lst_hi + atol))]
+    else:
+        # restrict lst_grid based on lst_low and lst_high
+        if lst_low is not None:
+            lst_grid = lst_grid[lst_grid > (lst_low - atol)]
+        if lst_hi is not None:
+            lst_grid = lst_grid[lst_grid < (lst_hi + atol)]
 
-            # sigma clip if desired
-            if sig_clip:
-                # clip real
-                real_f = sigma_clip(d.real, sigma=sigma, min_N=min_N, axis=0)
+    # Raise Exception if lst_grid is empty
+    if len(lst_grid) == 0:
+        raise ValueError("len(lst_grid) == 0; consider changing lst_low and/or lst_hi.")
 
-                # clip imag
-                imag_f = sigma_clip(d.imag, sigma=sigma, min_N=min_N, axis=0)
+    return lst_grid, dlst
 
-                # get real + imag flags
-                clip_flags = real_f + imag_f
 
-                # set clipped data to nan
-                d[clip_flags] *= np.nan
+def _lst_grid_indices(lsts, lst_grid, dlst, atol=1e-10):
+    """
+    Find the LST bin of each integration.
 
-                # merge clip flags
-                f += clip_flags
+    Parameters:
+    -----------
+    lsts : type=ndarray, LSTs of the integrations in radians
+    lst_grid : type=ndarray, LST bin centers, see _restricted_lst_grid()
+    dlst : type=float, LST bin width
+    atol : type=float, absolute tolerance for comparing LST bin center floats
 
-            # check thresholds for flagging entire output LST bins
-            if len(f) == 1:
-                flag_bin = np.zeros(f.shape[1], np.bool)
-            else:
-                flag_bin = np.sum(f, axis=0).astype(np.float) / len(f) > flag_thresh
-            d[:, flag_bin] *= np.nan
-            f[:, flag_bin] = True
-
-            # take bin average: real and imag separately
-            if median:
-                real_avg.append(np.nanmedian(d.real, axis=0))
-                imag_avg.append(np.nanmedian(d.imag, axis=0))
-            else:
-                # for mean to account for varying nsamples, take nsamples weighted sum.
-                # (inverse variance weighted sum).
-                isfinite = np.isfinite(d)
-                d[~isfinite] = 0.0
-                n[~isfinite] = 0.0
-
-                norm = np.sum(n, axis=0).clip(1e-99, np.inf)
-                real_avg.append(np.sum(d.real * n, axis=0) / norm)
-                imag_avg.append(np.sum(d.imag * n, axis=0) / norm)
-
-            # get minimum bin flag
-            f_min.append(np.nanmin(f, axis=0))
-
-            # get other stats
-            real_std.append(np.nanstd(d.real, axis=0))
-            imag_std.append(np.nanstd(d.imag, axis=0))
-            bin_count.append(np.nansum(~np.isnan(d) * n, axis=0))
-
-        # get final statistics
-        d_avg = np.array(real_avg) + 1j * np.array(imag_avg)
-        f_min = np.array(f_min)
-        d_std = np.array(real_std) + 1j * np.array(imag_std)
-        d_num = np.array(bin_count).astype(np.float)
-
-        # fill nans
-        d_nan = np.isnan(d_avg)
-        d_avg[d_nan] = 1.0
-        f_min[d_nan] = True
-        d_std[d_nan] = 1.0
-        d_num[d_nan] = 0.0
-
-        # insert into dictionaries
-        data_avg[key] = d_avg
-        flags_min[key] = f_min
-        data_std[key] = d_std
-        data_count[key] = d_num
+    Output: (lsts, grid_indices, data_in_bin)
+    -------
+    lsts : copy of the input lsts, unwrapped relative to lst_grid
+    grid_indices : integer ndarray of the index in lst_grid of each integration's LST bin
+    data_in_bin : boolean ndarray, False for integrations that don't fall in any LST bin
+    """
+    # move lst_grid centers to the left
+    lst_grid_left = lst_grid - dlst / 2
 
-    # turn into DataContainer objects
-    data_avg = DataContainer(data_avg)
-    flags_min = DataContainer(flags_min)
-    data_std = DataContainer(data_std)
-    data_count = DataContainer(data_count)
+    # ensure lsts aren't wrapped relative to lst_grid
+    lsts = copy.copy(lsts)
+    lsts[lsts < lst_grid_left.min() - atol] += 2 * np.pi
 
-    return lst_bins, data_avg, flags_min, data_std, data_count
+    # digitize lsts
+    grid_indices = np.searchsorted(lst_grid_left[1:], lsts, side='left')
+
+    # make data_in_bin boolean array, and set to False data that don't fall in any bin
+    data_in_bin = np.ones_like(lsts, bool)
+    data_in_bin[(lsts < lst_grid_left.min() - atol)] = False
+    data_in_bin[(lsts > lst_grid_left.max() + dlst + atol)] = False
+
+    return lsts, grid_indices, data_in_bin
+
+
+def _grid_phasors(data, lsts, bin_lsts, antpos, freq_array, lat=-30.72152):
+    """
+    Return a DataContainer mapping each key in data to the (Ntimes, Nfreqs) phasors that rephase
+    its integrations from lsts to the center of their LST bins, bin_lsts. Multiplying data by
+    these phasors is equivalent to utils.lst_rephase(), but does not require a copy of data.
+    Like data, indexing with a reversed key returns the conjugate phasors.
+    """
+    if freq_array is None or antpos is None:
+        raise ValueError("freq_array and antpos is needed for rephase")
+
+    # compute phasors of all baselines at once, in complex64 if the data are complex64
+    keys = list(data.keys())
+    dtype = np.complex64 if np.all([data[k].dtype == np.complex64 for k in keys]) else np.complex128
+    phasors = utils.lst_rephase_phasors([antpos[k[0]] - antpos[k[1]] for k in keys], freq_array,
+                                        bin_lsts - lsts, lat=lat, dtype=dtype)
+    return DataContainer(odict(zip(keys, phasors)))
+
+
+def _binned_key(key, binned_keys, bl_list=None):
+    """
+    Figure out which baseline key a data key is binned into.
+
+    Parameters:
+    -----------
+    key : type=tuple, baseline key like (0, 1, 'ee') in the data being binned
+    binned_keys : type=dict or set, keys that already have binned data
+    bl_list : type=list, optional list of antenna pairs that sets the conjugation of the binned keys. See lst_bin().
+
+    Output: (binned_key, src_key, conj)
+    -------
+    binned_key : the key to bin the data into, which may be new
+    src_key : the key to get data from the input data, which is either key or its reverse
+    conj : bool, if True, the binned data is the complex conjugate of the input data at src_key
+    """
+    src_key, conj = key, False
+    # if bl_list is not None, use it to determine conjugation:
+    # this is to prevent situations where conjugation of bl in
+    # data_list is different from bl in data which can cause
+    # inconsistent conjugation conventions in different LST chunks.
+    if bl_list is not None:
+        if utils.reverse_bl(key)[:2] in bl_list:
+            key = src_key = utils.reverse_bl(key)
+    if key not in binned_keys and utils.reverse_bl(key) in binned_keys:
+        # check to see if conj(key) exists in data
+        key, conj = utils.reverse_bl(key), True
+    return key, src_key, conj
+
+
+def _bin_ranks(bins):
+    """
+    Find each entry's rank among the entries that fall in the same bin.
+
+    Parameters:
+    -----------
+    bins : type=ndarray, 1D integer array of bin indices
+
+    Output: (ranks, unique_bins, counts)
+    -------
+    ranks : ndarray, same shape as bins, holding the number of preceeding entries in the same bin
+    unique_bins : ndarray of the unique bins, in order of first appearance in bins
+    counts : ndarray of the number of entries in each of unique_bins
+    """
+    order = np.argsort(bins, kind='stable')
+    unique_bins, first, counts = np.unique(bins[order], return_index=True, return_counts=True)
+    ranks = np.empty(len(bins), dtype=int)
+    ranks[order] = np.arange(len(bins)) - np.repeat(first, counts)
+    appearance = np.argsort(order[first])
+    return ranks, unique_bins[appearance], counts[appearance]
+
+
+def _lst_bin_stats(data, flags, nsamples, nentries, flag_thresh=0.7, median=False, sig_clip=False, sigma=4.0, min_N=4):
+    """
+    Compute LST-binned statistics from data stacked along a days axis. Warning: data, flags
+    and nsamples are modified in place.
+
+    Parameters:
+    -----------
+    data : type=ndarray, complex data of shape (..., Ndays, Nfreqs). Only the first nentries
+        entries along the days axis are used.
+    flags : type=ndarray, boolean flags matching data. Unused entries must be flagged.
+    nsamples : type=ndarray, nsamples matching data. Unused entries must have zero nsamples.
+    nentries : type=ndarray, integer array of shape (...) holding the number of entries
+        along the days axis of each LST bin.
+    flag_thresh : type=float, minimum fraction of flagged points in an LST bin needed to
+        flag the entire bin.
+    median : type=boolean, if True use the nsamples-weighted median of real and imag separately
+        for LST binning, instead of the nsamples-weighted mean.
+    sig_clip : type=boolean, if True, perform a sigma clipping algorithm of the LST bins on the
+        real and imag components separately. Resultant clip flags are OR'd between real and imag.
+    sigma : type=float, input sigma threshold to use for sigma clipping algorithm.
+    min_N : type=int, minimum number of points in averaged LST bin needed to perform sigma clipping
+
+    Output: (data_avg, flags_min, data_std, data_count)
+    -------
+    Arrays of shape (..., Nfreqs) holding the LST bin average, the minimum flag, the real and imag
+    std stored in the real and imag components, and the number of points in the LST bin.
+    """
+    days_axis = data.ndim - 2
+    nentries = nentries[..., None]
+    used = np.arange(data.shape[days_axis])[:, None] < nentries[..., None]
+
+    # replace flagged data with nan
+    data[flags] *= np.nan  # multiplication (instead of assignment) gets real and imag
+
+    # sigma clip if desired
+    if sig_clip:
+        # clip real and imag together, only in LST bins with enough entries
+        clip_flags = np.any(sigma_clip(np.stack([data.real, data.imag]), sigma=sigma, min_N=min_N,
+                                       axis=days_axis + 1, nentries=nentries), axis=0)
+
+        # set clipped data to nan and merge clip flags
+        data[clip_flags] *= np.nan
+        flags |= clip_flags
+
+    # check thresholds for flagging entire output LST bins, which is never done for single entries
+    with np.errstate(divide='ignore', invalid='ignore'):
+        flag_bin = np.sum(flags & used, axis=days_axis) / nentries > flag_thresh
+    flag_bin &= (nentries > 1)
+    flag_bin = np.broadcast_to(np.expand_dims(flag_bin, days_axis), data.shape)
+    data[flag_bin] *= np.nan
+    flags[flag_bin] = True
+
+    # take bin average: real and imag separately
+    if median:
+        # nsamples-weighted median, unless all unflagged data have unit nsamples
+        if np.all(nsamples[~np.isnan(data)] == 1):
+            real_avg = np.squeeze(_nanmedian(data.real, axis=days_axis), axis=days_axis)
+            imag_avg = np.squeeze(_nanmedian(data.imag, axis=days_axis), axis=days_axis)
+        else:
+            real_avg = np.squeeze(_weighted_nanmedian(data.real, nsamples, axis=days_axis), axis=days_axis)
+            imag_avg = np.squeeze(_weighted_nanmedian(data.imag, nsamples, axis=days_axis), axis=days_axis)
+    else:
+        # for mean to account for varying nsamples, take nsamples weighted sum.
+        # (inverse variance weighted sum).
+        isfinite = np.isfinite(data)
+        data[~isfinite] = 0.0
+        nsamples[~isfinite] = 0.0
+
+        norm = np.sum(nsamples, axis=days_axis).clip(1e-99, np.inf)
+        real_avg = np.sum(data.real * nsamples, axis=days_axis) / norm
+        imag_avg = np.sum(data.imag * nsamples, axis=days_axis) / norm
+
+    # get minimum bin flag
+    f_min = np.min(flags, axis=days_axis)
+
+    # get other stats: the std ignores nans and unused entries, like np.nanstd on only the used entries
+    stds = []
+    for arr in [data.real, data.imag]:
+        skip = np.isnan(arr) | ~used
+        count = np.sum(~skip, axis=days_axis, keepdims=True)
+        arr = np.where(skip, 0, arr)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            arr = np.where(skip, 0, arr - np.sum(arr, axis=days_axis, keepdims=True) / count)
+            stds.append(np.sqrt(np.sum(arr * arr, axis=days_axis) / np.squeeze(count, axis=days_axis)))
+    bin_count = np.nansum(~np.isnan(data) * nsamples, axis=days_axis)
+
+    # get final statistics
+    d_avg = real_avg + 1j * imag_avg
+    d_std = stds[0] + 1j * stds[1]
+    d_num = bin_count.astype(float)
+
+    # fill nans
+    d_nan = np.isnan(d_avg)
+    d_avg[d_nan] = 1.0
+    f_min[d_nan] = True
+    d_std[d_nan] = 1.0
+    d_num[d_nan] = 0.0
+
+    return d_avg, f_min, d_std, d_num
+
+
+class LSTBinAccumulator(object):
+    """
+    Out-of-core LST binner. Data are added one night (or one file) at a time with add(), which
+    updates running accumulators in each LST bin: the nsamples-weighted sum of the data, the
+    total nsamples, flag counts, and a Welford running mean and variance. Memory use is set by the
+    number of baselines, LST bins and frequencies, independent of the number of nights binned.
+
+    Adding each element of data_list in turn and then calling finalize() reproduces
+    lst_bin(data_list, ..., median=False, sig_clip=False, truncate_empty=False), up to floating
+    point precision.
+
+    Sigma clipping needs the statistics of all nights before any night can be clipped, so it is
+    done in two passes over the data:
+
+        acc = LSTBinAccumulator(dlst, ...)
+        for data, lsts, flags, nsamples in nights:
+            acc.add(data, lsts, flags=flags, nsamples=nsamples)
+        clipped = acc.sigma_clipped(sigma=4.0, min_N=4)
+        for data, lsts, flags, nsamples in nights:
+            clipped.add(data, lsts, flags=flags, nsamples=nsamples)
+        lst_bins, data_avg, flags_min, data_std, data_count = clipped.finalize()
+
+    Unlike lst_bin(), which clips around the median with a MAD-based scale, the second pass
+    clips the real and imaginary parts of unflagged data that are more than sigma times the
+    standard deviation away from the mean of the unflagged data in the first pass.
+    """
+
+    def __init__(self, dlst, begin_lst=None, lst_low=None, lst_hi=None, flag_thresh=0.7, atol=1e-10,
+                 bl_list=None, rephase=False, antpos=None, freq_array=None, lat=-30.72152, verbose=True):
+        """
+        Set up an empty LST binner. See lst_bin() for details on the parameters.
+
+        Parameters:
+        -----------
+        dlst : type=float, delta-LST spacing for lst_grid.
+        begin_lst : type=float, beginning LST for making the lst_grid. Default is 0 radians.
+        lst_low : type=float, truncate lst_grid below this lower bound on the LST bin center
+        lst_hi : type=float, truncate lst_grid above this upper bound on the LST bin center
+        flag_thresh : type=float, minimum fraction of flagged points in an LST bin needed to
+            flag the entire bin.
+        atol : type=float, absolute tolerance for comparing LST bin center floats
+        bl_list : optional list of antenna pairs that sets the conjugation of the binned data. Any of
+            these baselines that are not in the data are included in the output as flagged placeholders,
+            for the polarizations in the first chunk of data added.
+        rephase : type=bool, if True, phase data to center of the LST bin before binning.
+        antpos : type=dictionary, antenna positions in ENU frame in meters. Needed for rephase.
+        freq_array : type=ndarray, 1D array of data frequencies channels in Hz. Needed for rephase.
+        lat : type=float, latitude of array in degrees North. Needed for rephase.
+        verbose : type=bool, if True report feedback to stdout
+        """
+        self._init_kwargs = dict(dlst=dlst, begin_lst=begin_lst, lst_low=lst_low, lst_hi=lst_hi, flag_thresh=flag_thresh,
+                                 atol=atol, bl_list=bl_list, rephase=rephase, antpos=antpos, freq_array=freq_array,
+                                 lat=lat, verbose=verbose)
+        if rephase and (freq_array is None or antpos is None):
+            raise ValueError("freq_array and antpos is needed for rephase")
+        self.lst_grid, self.dlst = _restricted_lst_grid(dlst, begin_lst=begin_lst, lst_low=lst_low, lst_hi=lst_hi,
+                                                        atol=atol, verbose=verbose)
+        self.flag_thresh = flag_thresh
+        self.atol = atol
+        self.bl_list = bl_list
+        self.rephase = rephase
+        self.antpos = antpos
+        self.freq_array = freq_array
+        self.lat = lat
+        self.Nfreqs = None
+        self.pols = []
+        self.binned = np.zeros(len(self.lst_grid), dtype=bool)  # LST bins with any data
+        self.stats = odict()  # maps baseline keys to dictionaries of running statistics
+        self._placeholders_added = False
+        self._clip = None
+        self._sigma = None
+
+    def _new_stats(self):
+        shape = (len(self.lst_grid), self.Nfreqs)
+        return {'nentries': np.zeros(len(self.lst_grid), dtype=int),  # number of data, flagged or not
+                'nflagged': np.zeros(shape, dtype=int),  # number of flagged data
+                'ngood': np.zeros(shape, dtype=int),  # number of unflagged, finite data
+                'wsum': np.zeros(shape, dtype=complex),  # nsamples-weighted sum of unflagged, finite data
+                'nsum': np.zeros(shape, dtype=float),  # sum of nsamples of unflagged, finite data
+                'mean': np.zeros(shape, dtype=complex),  # running mean of all data, with bad data set to 0
+                'm2': np.zeros(shape, dtype=complex)}  # running sum of squared residuals, real and imag separately
+
+    def add(self, data, lsts, flags=None, nsamples=None):
+        """
+        Bin a night (or any other chunk of integrations) of data into the running accumulators.
+
+        Parameters:
+        -----------
+        data : type=DataContainer, complex visibility data with shape (Ntimes, Nfreqs)
+        lsts : type=ndarray, LSTs of the Ntimes integrations in radians
+        flags : type=DataContainer, flags for data. Flagged data do not contribute to the average.
+        nsamples : type=DataContainer, nsamples for data, used to weight the average. Default is all ones.
+        """
+        lsts, grid_indices, data_in_bin = _lst_grid_indices(lsts, self.lst_grid, self.dlst, atol=self.atol)
+        self.binned[grid_indices[data_in_bin]] = True
+        phasors = None
+        if self.rephase:
+            phasors = _grid_phasors(data, lsts, self.lst_grid[grid_indices], self.antpos, self.freq_array, lat=self.lat)
+        tinds = np.nonzero(data_in_bin)[0]
+        tbins = grid_indices[tinds]
+        # integrations with the same rank fall in different LST bins, so each rank can be added at once
+        ranks = _bin_ranks(tbins)[0]
+
+        for key in data.keys():
+            if self.Nfreqs is None:
+                self.Nfreqs = data[key].shape[1]
+            if key[2] not in self.pols:
+                self.pols.append(key[2])
+            key, src_key, conj = _binned_key(key, self.stats, bl_list=self.bl_list)
+            if key not in self.stats:
+                self.stats[key] = self._new_stats()
+            d = data[src_key][tinds]
+            if phasors is not None:
+                d = d * phasors[src_key][tinds]
+            if conj:
+                d = np.conj(d)
+            f = np.zeros(d.shape, dtype=bool) if flags is None else np.asarray(flags[src_key][tinds], dtype=bool)
+            n = np.ones(d.shape, dtype=float) if nsamples is None else np.asarray(nsamples[src_key][tinds], dtype=float)
+
+            # clip outliers relative to the first pass of a two-pass sigma clip
+            if self._clip is not None and key in self._clip:
+                location, scale, clippable = self._clip[key]
+                with np.errstate(invalid='ignore'):
+                    clip = ((np.abs(d.real - location[tbins].real) > self._sigma * scale[tbins].real)
+                            | (np.abs(d.imag - location[tbins].imag) > self._sigma * scale[tbins].imag))
+                f = f | (clip & clippable[tbins, None])
+
+            for rank in range(np.max(ranks, initial=-1) + 1):
+                rows = ranks == rank
+                self._update(self.stats[key], tbins[rows], d[rows], f[rows], n[rows])
+
+        # like lst_bin(), after the first chunk of data, give every empty LST bin of the
+        # baselines in bl_list a single flagged, zero-weight placeholder entry
+        if self.bl_list is not None and not self._placeholders_added and self.Nfreqs is not None:
+            self._add_placeholders()
+            self._placeholders_added = True
+
+    def _add_placeholders(self):
+        for antpair in self.bl_list:
+            for pol in self.pols:
+                key = antpair + (pol,)
+                if key not in self.stats and ((key[0] != key[1] and utils.reverse_bl(key) not in self.stats) or key[0] == key[1]):
+                    # last part lets us spoof ne and en for autocorrs. If we dont include it, only en xor ne will be spoofed.
+                    self.stats[key] = self._new_stats()
+                if key not in self.stats:
+                    continue
+                empty = np.nonzero(self.stats[key]['nentries'] == 0)[0]
+                zeros = np.zeros((len(empty), self.Nfreqs))
+                self._update(self.stats[key], empty, zeros.astype(complex), np.ones(zeros.shape, dtype=bool), zeros)
+
+    @staticmethod
+    def _update(stats, bins, d, f, n):
+        """Add one datum per frequency to each of the (unique) LST bins in bins."""
+        # like lst_bin(), flagged or non-finite data are set to zero with zero weight
+        bad = f | ~np.isfinite(d)
+        d = np.where(bad, 0, d)
+        n = np.where(bad, 0, n)
+        stats['nentries'][bins] += 1
+        stats['nflagged'][bins] += f
+        stats['ngood'][bins] += ~bad
+        stats['wsum'][bins] += d * n
+        stats['nsum'][bins] += n
+
+        # Welford's algorithm, with the real and imag parts of m2 tracking the real and imag variance
+        delta = d - stats['mean'][bins]
+        stats['mean'][bins] += delta / stats['nentries'][bins, None]
+        resid = d - stats['mean'][bins]
+        stats['m2'][bins] += delta.real * resid.real + 1j * delta.imag * resid.imag
+
+    def sigma_clipped(self, sigma=4.0, min_N=4):
+        """
+        Start the second pass of a two-pass sigma clip, using this binner as the first pass.
+
+        Parameters:
+        -----------
+        sigma : type=float, input sigma threshold to use for sigma clipping.
+        min_N : type=int, minimum number of points in an LST bin needed to perform sigma clipping
+
+        Output:
+        -------
+        clipped : a new, empty LSTBinAccumulator with the same settings as this one. The same data
+            must be added to it again; data that are more than sigma standard deviations from the
+            mean of the unflagged data in this pass are flagged as they are added.
+        """
+        clipped = LSTBinAccumulator(**self._init_kwargs)
+        clipped._sigma = sigma
+        clipped._clip = {}
+        for key, stats in self.stats.items():
+            nentries = stats['nentries'][:, None]
+            nbad = nentries - stats['ngood']
+            with np.errstate(divide='ignore', invalid='ignore'):
+                # mean and variance of the unflagged data, where the accumulated data have zeros for bad data
+                location = stats['mean'] * nentries / stats['ngood']
+                resid = stats['mean'] - location
+                m2 = (stats['m2'].real + nentries * resid.real**2 - nbad * location.real**2
+                      + 1j * (stats['m2'].imag + nentries * resid.imag**2 - nbad * location.imag**2))
+                scale = (np.sqrt(np.clip(m2.real / stats['ngood'], 0, np.inf))
+                         + 1j * np.sqrt(np.clip(m2.imag / stats['ngood'], 0, np.inf)))
+            clipped._clip[key] = (location, scale, stats['nentries'] >= min_N)
+        return clipped
+
+    def finalize(self, truncate_empty=False):
+        """
+        Compute the LST-binned statistics from the accumulated data.
+
+        Parameters:
+        -----------
+        truncate_empty : type=boolean, if True, only keep LST bins that have data in them.
+            Otherwise, keep all LST bins in the grid, flagging the ones without data.
+
+        Output: (lst_bins, data_avg, flags_min, data_std, data_count)
+        -------
+        Same as lst_bin().
+        """
+        # add placeholders for any baselines in bl_list with new polarizations since the first chunk of data
+        if self.bl_list is not None and self.Nfreqs is not None:
+            self._add_placeholders()
+
+        bins = np.nonzero(self.binned)[0] if truncate_empty else np.arange(len(self.lst_grid))
+        lst_bins = self.lst_grid[bins] % (2 * np.pi)
+        data_avg, flags_min, data_std, data_count = odict(), odict(), odict(), odict()
+        for key, stats in self.stats.items():
+            nentries = stats['nentries'][bins, None]
+            nflagged = stats['nflagged'][bins]
+            m2 = stats['m2'][bins]
+
+            # flag entire LST bins with too many flags, which is never done for single entries
+            flag_bin = (nflagged / np.clip(nentries, 1, np.inf) > self.flag_thresh) & (nentries > 1)
+
+            # take nsamples-weighted average and standard deviation of real and imag separately
+            d_avg = stats['wsum'][bins] / stats['nsum'][bins].clip(1e-99, np.inf)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                d_std = np.sqrt(m2.real / nentries) + 1j * np.sqrt(m2.imag / nentries)
+            d_std[np.broadcast_to(nentries == 0, d_std.shape)] = 0.0
+            d_num = stats['nsum'][bins].copy()
+            f_min = (nflagged == nentries) | flag_bin
+            d_avg[flag_bin] = 0.0
+            d_std[flag_bin] = 0.0
+            d_num[flag_bin] = 0.0
+
+            # fill nans
+            d_nan = np.isnan(d_avg)
+            d_avg[d_nan] = 1.0
+            f_min[d_nan] = True
+            d_std[d_nan] = 1.0
+            d_num[d_nan] = 0.0
+
+            data_avg[key] = d_avg
+            flags_min[key] = f_min
+            data_std[key] = d_std
+            data_count[key] = d_num
+
+        return lst_bins, DataContainer(data_avg), DataContainer(flags_min), DataContainer(data_std), DataContainer(data_count)
 
 
 def lst_align(data, data_lsts, flags=None, dlst=None,
@@ -507,10 +883,16 @@ def lst_bin_arg_parser():
     a.add_argument("--average_redundant_baselines", action="store_true", default=False, help="Redundantly average baselines within and between nights.")
     a.add_argument("--flag_thresh", default=0.7, type=float, help="fraction of flags over all nights in an LST bin on a baseline to flag that baseline.")
     a.add_argument("--ex_ant_yaml_files", default=None, type=str, nargs='+', help="list of paths to yamls with lists of antennas from each night to exclude lstbinned data files.")
+    a.add_argument("--streaming", default=False, action='store_true', help="bin one file at a time with running accumulators, so memory does not grow with the number of nights.")
+    a.add_argument("--nproc", default=1, type=int, help="number of processes with which to bin output files and baseline groups.")
+    a.add_argument("--resume", default=False, action='store_true', help="skip output files recorded as complete and up to date in the manifest in outdir.")
+    a.add_argument("--median", default=False, action='store_true', help="use the nsamples-weighted median instead of the mean of each LST bin. Not supported with --streaming.")
+    a.add_argument("--use_time_index", default=False, action='store_true', help="read file times from a sidecar index in each data directory, updating it for new or modified files.")
     return a
 
 
-def config_lst_bin_files(data_files, dlst=None, atol=1e-10, lst_start=None, verbose=True, ntimes_per_file=60):
+def config_lst_bin_files(data_files, dlst=None, atol=1e-10, lst_start=None, verbose=True, ntimes_per_file=60,
+                         use_time_index=False):
     """
     Configure data for LST binning.
 
@@ -526,6 +908,8 @@ def config_lst_bin_files(data_files, dlst=None, atol=1e-10, lst_start=None, verb
     lst_start : type=float, starting LST for binner as it sweeps from lst_start to lst_start + 2pi.
         Default is first LST of the first file of the first night.
     ntimes_per_file : type=int, number of LST bins in a single output file
+    use_time_index : type=bool, if True, get file times from (and update) the sidecar file time index
+        in each data directory. See io.get_file_times for details.
 
     Returns
     -------
@@ -540,14 +924,14 @@ def config_lst_bin_files(data_files, dlst=None, atol=1e-10, lst_start=None, verb
 
     # get dlst from first data file if None
     if dlst is None:
-        dlst, _, _, _ = io.get_file_times(data_files[0][0], filetype='uvh5')
+        dlst, _, _, _ = io.get_file_times(data_files[0][0], filetype='uvh5', use_time_index=use_time_index)
 
     # get time arrays for each file
     lst_arrays = []
     time_arrays = []
     for di, dfs in enumerate(data_files):
         # get times
-        _, _, larrs, tarrs = io.get_file_times(dfs, filetype='uvh5')
+        _, _, larrs, tarrs = io.get_file_times(dfs, filetype='uvh5', use_time_index=use_time_index)
         # append
         lst_arrays.append(larrs)
         time_arrays.append(tarrs)
@@ -596,7 +980,8 @@ def lst_bin_files(data_files, input_cals=None, dlst=None, verbose=True, ntimes_p
                   file_ext="{type}.{time:7.5f}.uvh5", outdir=None, overwrite=False, history='', lst_start=None,
                   atol=1e-6, sig_clip=True, sigma=5.0, min_N=5, rephase=False, output_file_select=None,
                   Nbls_to_load=None, ignore_flags=False, average_redundant_baselines=False,
-                  bl_error_tol=1.0, include_autos=True, ex_ant_yaml_files=None, **kwargs):
+                  bl_error_tol=1.0, include_autos=True, ex_ant_yaml_files=None, streaming=False, nproc=1, use_time_index=False,
+                  resume=False, median=False, **kwargs):
     """
     LST bin a series of UVH5 files with identical frequency bins, but varying
     time bins. Output file meta data (frequency bins, antennas positions, time_array)
@@ -645,6 +1030,22 @@ def lst_bin_files(data_files, input_cals=None, dlst=None, verbose=True, ntimes_p
                    between and within nights for purposes of average_redundant_baselines.
     ex_ant_yaml_files : list of strings, optional
         list of paths of yaml files specifying antennas to flag and remove from data on each night.
+    streaming : bool, if True, bin each file as it is loaded with an LSTBinAccumulator instead of loading all
+        nights before calling lst_bin(), so that memory use does not grow with the number of nights.
+        Sigma clipping then rereads the files for the second pass of a mean and standard deviation based
+        clip (see LSTBinAccumulator), rather than the median and MAD based clip of lst_bin().
+    nproc : int, number of processes with which to bin output files and the baseline groups within them.
+        If greater than 1, each (output file, baseline group) pair is binned on a process pool, with each
+        worker opening its own file handles, and output files are written in order by the parent process.
+        Results are identical to the serial (nproc=1) calculation.
+    use_time_index : bool, if True, get the times of the input files from (and update) the sidecar file
+        time index in each data directory, instead of opening every file. See io.get_file_times for details.
+    resume : bool, if True, skip output files that the manifest in outdir (named LST_BIN_MANIFEST) records as
+        completed with the same parameters and input files (by path, modification time and size), and that
+        are unchanged since. All other output files are (re)computed and overwritten. Output files are always
+        written atomically and recorded in the manifest, so an interrupted run can be resumed.
+    median : bool, if True, use the nsamples-weighted median of the real and imag components of each LST bin
+        instead of the weighted mean (see lst_bin). Not supported with streaming, which never holds all nights at once.
     kwargs : type=dictionary, keyword arguments to pass to io.write_vis()
 
     Result:
@@ -652,10 +1053,14 @@ def lst_bin_files(data_files, input_cals=None, dlst=None, verbose=True, ntimes_p
     zen.{pol}.LST.{file_lst}.uv : holds LST bin avg (data_array) and bin count (nsample_array)
     zen.{pol}.STD.{file_lst}.uv : holds LST bin stand dev along real and imag (data_array)
     """
+    if streaming and median:
+        raise NotImplementedError("LST binning with median is not implemented with streaming.")
+
     # get file lst arrays
     (lst_grid, dlst, file_lsts, begin_lst, lst_arrs,
      time_arrs) = config_lst_bin_files(data_files, dlst=dlst, atol=atol, lst_start=lst_start,
-                                       ntimes_per_file=ntimes_per_file, verbose=verbose)
+                                       ntimes_per_file=ntimes_per_file, verbose=verbose,
+                                       use_time_index=use_time_index)
     nfiles = len(file_lsts)
 
     # make sure the JD corresponding to file_lsts[0][0] is the lowest JD in the LST-binned data set
@@ -680,7 +1085,6 @@ def lst_bin_files(data_files, input_cals=None, dlst=None, verbose=True, ntimes_p
 
     # update kwrgs
     kwargs['outdir'] = outdir
-    kwargs['overwrite'] = overwrite
     # get metadata from the zeroth data file in the last day
     last_day_index = np.argmax([np.min([time for tarr in tarrs for time in tarr]) for tarrs in time_arrs])
     zeroth_file_on_last_day_index = np.argmin([np.min(tarr) for tarr in time_arrs[last_day_index]])
@@ -716,193 +1120,420 @@ def lst_bin_files(data_files, input_cals=None, dlst=None, verbose=True, ntimes_p
     blgroups = [bl_nightly_dicts[i * Nbls_to_load:(i + 1) * Nbls_to_load] for i in range(Nblgroups)]
     blgroups = [blg for blg in blgroups if len(blg) > 0]
 
-    # iterate over output LST files
+    loader = _NightlyFileLoader(data_files, lst_arrs, time_arrs, input_cals=input_cals, ex_ant_yaml_files=ex_ant_yaml_files,
+                                average_redundant_baselines=average_redundant_baselines, ignore_flags=ignore_flags,
+                                bl_error_tol=bl_error_tol, verbose=verbose)
+    bin_kwargs = dict(dlst=dlst, begin_lst=begin_lst, atol=atol, streaming=streaming, sig_clip=sig_clip, sigma=sigma,
+                      min_N=min_N, rephase=rephase, freq_array=freq_array, antpos=antpos, ignore_flags=ignore_flags,
+                      median=median, verbose=verbose)
+    write_kwargs = dict(dlst=dlst, file_ext=file_ext, history=history, integration_time=integration_time,
+                        freq_array=freq_array, antpos=antpos, x_orientation=x_orientation,
+                        overwrite=(overwrite or resume), verbose=verbose, **kwargs)
+
+    # fingerprint the parameters and inputs of each output file, and skip those completed with the same ones
+    config = dict(bin_kwargs, ntimes_per_file=ntimes_per_file, file_ext=file_ext, Nbls_to_load=Nbls_to_load,
+                  average_redundant_baselines=average_redundant_baselines, bl_error_tol=bl_error_tol,
+                  include_autos=include_autos, kwargs=sorted(kwargs.items()))
+    config.update(freq_array=np.asarray(freq_array).tolist(),
+                  antpos=sorted((ant, np.asarray(pos).tolist()) for ant, pos in antpos.items()))
+    manifest_file = os.path.join(outdir, LST_BIN_MANIFEST)
+    manifest = _read_lst_bin_manifest(manifest_file) if resume else {}
+    keys, fingerprints, todo = [], [], []
     for i, f_lst in enumerate(file_lsts):
-        utils.echo("LST file {} / {}: {}".format(i + 1, len(file_lsts), datetime.datetime.now()), type=1, verbose=verbose)
-        fmin = f_lst[0] - (dlst / 2 + atol)
-        fmax = f_lst[-1] + (dlst / 2 + atol)
-        # iterate over baseline groups (for memory efficiency)
-        data_conts, flag_conts, std_conts, num_conts = [], [], [], []
-        for bi, blgroup in enumerate(blgroups):
-            utils.echo("starting baseline-group {} / {}: {}".format(bi + 1, len(blgroups), datetime.datetime.now()), type=0, verbose=verbose)
-            # create empty data lists
-            data_list = []
-            file_list = []
-            flgs_list = []
-            lst_list = []
-            nsamples_list = []
-            # iterate over individual nights to bin
-            any_lst_overlap = False
-            for j in range(len(data_files)):
-                nightly_data_list = []
-                nightly_flgs_list = []
-                nightly_lst_list = []
-                nightly_nsamples_list = []
-                # iterate over files in each night, and open files that fall into this output file LST range
-                for k in range(len(data_files[j])):
-                    # unwrap la relative to itself
-                    larr = lst_arrs[j][k]
-                    tarr = time_arrs[j][k]
-                    larr[larr < larr[0]] += 2 * np.pi
-
-                    # phase wrap larr to get it to fall within 2pi of file_lists
-                    while larr[0] + 2 * np.pi < fmax:
-                        larr += 2 * np.pi
-                    while larr[-1] - 2 * np.pi > fmin:
-                        larr -= 2 * np.pi
-
-                    # check if this file has overlap with output file
-                    if larr[-1] < fmin or larr[0] > fmax:
-                        continue
+        keys.append("{:.10f}".format(f_lst[0]))
+        fingerprints.append(_lst_bin_fingerprint(loader, f_lst[0] - (dlst / 2 + atol), f_lst[-1] + (dlst / 2 + atol), config))
+        if resume and _lst_bin_output_is_current(manifest, keys[i], fingerprints[i], outdir):
+            utils.echo("LST file {} / {} is complete and up to date, skipping".format(i + 1, len(file_lsts)), verbose=verbose)
+        else:
+            todo.append(i)
+
+    def _write(i, results):
+        outputs = _write_lst_bin_file(file_lsts[i], results, **write_kwargs)
+        if outputs is not None:
+            _update_lst_bin_manifest(manifest_file, keys[i], fingerprints[i], outputs)
+
+    if nproc > 1:
+        # submit the (output file, baseline group) pairs of a window of nproc output files at a time, then gather
+        # and write output files in order, so that at most nproc output files' results are held in memory
+        def _submit(i):
+            return [executor.submit(_lst_bin_blgroup, loader, file_lsts[i], blgroup, bi, len(blgroups), **bin_kwargs)
+                    for bi, blgroup in enumerate(blgroups)]
+
+        with ProcessPoolExecutor(max_workers=nproc) as executor:
+            futures = {i: _submit(i) for i in todo[:nproc]}
+            for n, i in enumerate(todo):
+                utils.echo("LST file {} / {}: {}".format(i + 1, len(file_lsts), datetime.datetime.now()), type=1, verbose=verbose)
+                results = [future.result() for future in futures.pop(i)]
+                if n + nproc < len(todo):
+                    futures[todo[n + nproc]] = _submit(todo[n + nproc])
+                _write(i, results)
+                del results
+                garbage_collector.collect()
+    else:
+        # iterate over output LST files
+        for i in todo:
+            utils.echo("LST file {} / {}: {}".format(i + 1, len(file_lsts), datetime.datetime.now()), type=1, verbose=verbose)
+            # iterate over baseline groups (for memory efficiency)
+            results = [_lst_bin_blgroup(loader, file_lsts[i], blgroup, bi, len(blgroups), **bin_kwargs)
+                       for bi, blgroup in enumerate(blgroups)]
+            _write(i, results)
+            del results
+            garbage_collector.collect()
+
+
+class _NightlyFileLoader(object):
+    """
+    Loads, calibrates and (optionally) redundantly averages the parts of the nightly data files of
+    lst_bin_files() that fall into an output LST range. This is a picklable stand-in for a closure,
+    so that output files and baseline groups can be binned on a process pool.
 
-                    any_lst_overlap = True
-
-                    # if overlap, get relevant time indicies
-                    tinds = (larr > fmin) & (larr < fmax)
-
-                    # load data: only times needed for this output LST-bin file
-                    hd = io.HERAData(data_files[j][k], filetype='uvh5')
-                    try:
-                        bls_to_load = []
-                        key_baselines = []  # map first baseline in each group to
-                        # first baseline in group on earliest night that has the baseline.
-                        reds = []
-                        for bl_nightly_dict in blgroup:
-                            # only load group if present in the current night.
-                            if j in bl_nightly_dict:
-                                # key to earliest night with this redundant group.
-                                key_bl = bl_nightly_dict[np.min(list(bl_nightly_dict.keys()))][0]
-                                key_baselines.append(key_bl)
-                                reds.append(bl_nightly_dict[j])
-                                bls_to_load.extend(bl_nightly_dict[j])
-
-                        data, flags, nsamps = hd.read(bls=bls_to_load, times=tarr[tinds])
-                        # if we want to throw away data associated with flagged antennas, throw it away.
-                        if ex_ant_yaml_files is not None:
-                            from hera_qm.utils import apply_yaml_flags
-                            hd = apply_yaml_flags(hd, a_priori_flag_yaml=ex_ant_yaml_files[j], ant_indices_only=True, flag_ants=True,
-                                                  flag_freqs=False, flag_times=False, throw_away_flagged_ants=True)
-                            data, flags, nsamps = hd.build_datacontainers()
-                        data.phase_type = 'drift'
-                    except ValueError:
-                        # if no baselines in the file, skip this file
-                        utils.echo("No baselines from blgroup {} found in {}, skipping file for these bls".format(bi + 1, data_files[j][k]), verbose=verbose)
-                        # check that the current night is not present in any of the baselines in the current blgroup.
-                        if np.all([j not in list(bl_nightly_dict.keys()) for bl_nightly_dict in blgroup]):
-                            utils.echo(f"The current night {j} is not present in any of the baseline dicts in the current blgroup.", verbose=verbose)
-                        continue
-                    data, flags, nsamps = hd.read(bls=bls_to_load, times=tarr[tinds])
-                    data.phase_type = 'drift'
-
-                    # load calibration
-                    if input_cals is not None:
-                        if input_cals[j][k] is not None:
-                            utils.echo("Opening and applying {}".format(input_cals[j][k]), verbose=verbose)
-                            uvc = io.to_HERACal(input_cals[j][k])
-                            gains, cal_flags, quals, totquals = uvc.read()
-                            # down select times in necessary
-                            if False in tinds and uvc.Ntimes > 1:
-                                # If uvc has Ntimes == 1, then broadcast across time will work automatically
-                                uvc.select(times=uvc.time_array[tinds])
-                                gains, cal_flags, quals, totquals = uvc.build_calcontainers()
-                            apply_cal.calibrate_in_place(data, gains, data_flags=flags, cal_flags=cal_flags,
-                                                         gain_convention=uvc.gain_convention)
-
-                    # redundantly average baselines, keying to baseline group key
-                    # on earliest night.
-                    if average_redundant_baselines:
-                        if ignore_flags:
-                            raise NotImplementedError("average_redundant_baselines with ignore_flags True is not implemented.")
-                        utils.red_average(data=data, flags=flags, nsamples=nsamps,
-                                          bl_tol=bl_error_tol, inplace=True,
-                                          reds=reds, red_bl_keys=key_baselines)
-                    file_list.append(data_files[j][k])
-                    nightly_data_list.append(data)  # this is data
-                    nightly_flgs_list.append(flags)  # this is flgs
-                    nightly_lst_list.append(larr[tinds])  # this is lsts
-                    nightly_nsamples_list.append(nsamps)
-
-                # skip if nothing accumulated in nightly files
-                if len(nightly_data_list) == 0:
-                    continue
+    HERAData handles (with their parsed metadata) and calibration solutions are kept across loads in
+    per-loader caches with LRU eviction of all but the max_cached_files most recently used files, so that
+    binning many baseline groups or output files does not reparse the same headers and calfits files.
+    """
 
-                # extend to data lists
-                data_list.extend(nightly_data_list)
-                flgs_list.extend(nightly_flgs_list)
-                lst_list.extend(nightly_lst_list)
-                nsamples_list.extend(nightly_nsamples_list)
-                del nightly_data_list, nightly_flgs_list, nightly_lst_list, nightly_nsamples_list
-
-            all_blgroup_baselines = [list(bl_nightly_dict.values())[0][0] for bl_nightly_dict in blgroup]
-            all_blgroup_antpairpols = []
-            if len(data_list) == 0:
-                if any_lst_overlap:
-                    # spoof data  if data_list is empty but there are some data files with overlap with this lst.
-                    # this is to avoid creating lstbinned files with varying numbers of baselines
-                    # if we happen to be at an lst bin where one of the blgroups is empty.
-                    for pol in hd.pols:
-                        for bl in all_blgroup_baselines:
-                            all_blgroup_antpairpols.append(bl + (pol,))
-                    data_list = [DataContainer({bl: np.ones((len(f_lst), hd.Nfreqs), dtype=complex) for bl in all_blgroup_antpairpols})]
-                    flgs_list = [DataContainer({bl: np.ones((len(f_lst), hd.Nfreqs), dtype=bool) for bl in all_blgroup_antpairpols})]
-                    lst_list = [f_lst]
-                    nsamples_list = [DataContainer({bl: np.zeros((len(f_lst), hd.Nfreqs)) for bl in all_blgroup_antpairpols})]
-                else:
-                    continue
-            # pass through lst-bin function
-            if ignore_flags:
-                flgs_list = None
-            (bin_lst, bin_data, flag_data, std_data,
-             num_data) = lst_bin(data_list, lst_list, flags_list=flgs_list, dlst=dlst, begin_lst=begin_lst,
-                                 lst_low=fmin, lst_hi=fmax, truncate_empty=False, sig_clip=sig_clip, nsamples_list=nsamples_list,
-                                 sigma=sigma, min_N=min_N, rephase=rephase, freq_array=freq_array, antpos=antpos, bl_list=all_blgroup_baselines)
-            # append to lists
-            data_conts.append(bin_data)
-            flag_conts.append(flag_data)
-            std_conts.append(std_data)
-            num_conts.append(num_data)
-        # if all blgroups were empty skip
-        if len(data_conts) == 0:
-            utils.echo("data_list is empty for beginning LST {}".format(f_lst[0]), verbose=verbose)
-            continue
-
-        # join DataContainers across blgroups
-        bin_data = DataContainer(dict(functools.reduce(operator.add, [list(dc.items()) for dc in data_conts])))
-        flag_data = DataContainer(dict(functools.reduce(operator.add, [list(dc.items()) for dc in flag_conts])))
-        std_data = DataContainer(dict(functools.reduce(operator.add, [list(dc.items()) for dc in std_conts])))
-        num_data = DataContainer(dict(functools.reduce(operator.add, [list(dc.items()) for dc in num_conts])))
-
-        # update history
-        file_history = history + " Input files: " + "-".join(list(map(lambda ff: os.path.basename(ff), file_list)))
-        kwargs['history'] = file_history + version.history_string()
-
-        # form integration time array
-        _Nbls = len(set([bl[:2] for bl in list(bin_data.keys())]))
-        kwargs['integration_time'] = np.ones(len(bin_lst) * _Nbls, dtype=np.float64) * integration_time
-
-        # file in data ext
-        fkwargs = {"type": "LST", "time": bin_lst[0] - dlst / 2.0}
-        if "{pol}" in file_ext:
-            fkwargs['pol'] = '.'.join(bin_data.pols())
-
-        # configure filenames
-        bin_file = "zen." + file_ext.format(**fkwargs)
-        fkwargs['type'] = 'STD'
-        std_file = "zen." + file_ext.format(**fkwargs)
-
-        # check for overwrite
-        if os.path.exists(bin_file) and overwrite is False:
-            utils.echo("{} exists, not overwriting".format(bin_file), verbose=verbose)
-            continue
-        # write to file
-        io.write_vis(bin_file, bin_data, bin_lst, freq_array, antpos, flags=flag_data, verbose=verbose,
-                     nsamples=num_data, filetype='uvh5', x_orientation=x_orientation, **kwargs)
-        io.write_vis(std_file, std_data, bin_lst, freq_array, antpos, flags=flag_data, verbose=verbose,
-                     nsamples=num_data, filetype='uvh5', x_orientation=x_orientation, **kwargs)
-
-        del bin_file, std_file, bin_data, std_data, num_data, bin_lst, flag_data
-        del data_conts, flag_conts, std_conts, num_conts
-        garbage_collector.collect()
+    def __init__(self, data_files, lst_arrs, time_arrs, input_cals=None, ex_ant_yaml_files=None,
+                 average_redundant_baselines=False, ignore_flags=False, bl_error_tol=1.0, verbose=True,
+                 max_cached_files=32):
+        self.data_files = data_files
+        self.lst_arrs = lst_arrs
+        self.time_arrs = time_arrs
+        self.input_cals = input_cals
+        self.ex_ant_yaml_files = ex_ant_yaml_files
+        self.average_redundant_baselines = average_redundant_baselines
+        self.ignore_flags = ignore_flags
+        self.bl_error_tol = bl_error_tol
+        self.verbose = verbose
+        # HERAData of the latest file opened and whether any file overlapped the LST range of the latest load
+        self.hd = None
+        self.any_lst_overlap = False
+        self.max_cached_files = max_cached_files
+        self._handles = odict()
+        self._cals = odict()
+
+    def __getstate__(self):
+        # caches are not shared between processes
+        state = self.__dict__.copy()
+        state.update(hd=None, _handles=odict(), _cals=odict())
+        return state
+
+    def _cached(self, cache, key, load):
+        """Return cache[key] (marking it as recently used), first storing load() there if necessary."""
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        cache[key] = value = load()
+        while len(cache) > self.max_cached_files:
+            cache.popitem(last=False)
+        return value
+
+    def _handle(self, filepath):
+        """Get a HERAData handle on filepath from the handle cache."""
+        return self._cached(self._handles, filepath, lambda: io.HERAData(filepath, filetype='uvh5'))
+
+    def _calibration(self, input_cal):
+        """Get the (gains, cal_flags, gain_convention, Ntimes) of input_cal from the calibration cache."""
+        def _load():
+            uvc = io.to_HERACal(input_cal)
+            gains, cal_flags, _, _ = uvc.read()
+            return gains, cal_flags, uvc.gain_convention, uvc.Ntimes
+        key = input_cal if isinstance(input_cal, str) else id(input_cal)
+        return self._cached(self._cals, key, _load)
+
+    def _wrapped_lsts(self, j, k, fmin, fmax):
+        """Return the LSTs of file k on night j, phase wrapped to the LST range [fmin, fmax],
+        or None if the file does not overlap with that range."""
+        # unwrap la relative to itself. This works on a copy, so that the result
+        # does not depend on which LST ranges were loaded before
+        larr = np.array(self.lst_arrs[j][k])
+        larr[larr < larr[0]] += 2 * np.pi
+
+        # phase wrap larr to get it to fall within 2pi of file_lists
+        while larr[0] + 2 * np.pi < fmax:
+            larr += 2 * np.pi
+        while larr[-1] - 2 * np.pi > fmin:
+            larr -= 2 * np.pi
+
+        # check if this file has overlap with output file
+        if larr[-1] < fmin or larr[0] > fmax:
+            return None
+        return larr
+
+    def overlapping_files(self, fmin, fmax):
+        """Return the (night, file) indices of the data files that overlap with the LST range [fmin, fmax]."""
+        return [(j, k) for j in range(len(self.data_files)) for k in range(len(self.data_files[j]))
+                if self._wrapped_lsts(j, k, fmin, fmax) is not None]
+
+    def load(self, blgroup, bi, fmin, fmax, file_list=None):
+        """Load, calibrate and yield (data, flags, nsamples, lsts) of each file with data in the LST range
+        [fmin, fmax], for the baselines in blgroup. Loaded files are appended to file_list, if not None."""
+        data_files, verbose = self.data_files, self.verbose
+        self.any_lst_overlap = False
+        # iterate over individual nights to bin, and open files that fall into this output file LST range
+        for j, k in self.overlapping_files(fmin, fmax):
+            larr = self._wrapped_lsts(j, k, fmin, fmax)
+            tarr = self.time_arrs[j][k]
+            self.any_lst_overlap = True
+
+            # if overlap, get relevant time indicies
+            tinds = (larr > fmin) & (larr < fmax)
+
+            # load data: only times needed for this output LST-bin file
+            hd = self.hd = self._handle(data_files[j][k])
+            try:
+                bls_to_load = []
+                key_baselines = []  # map first baseline in each group to
+                # first baseline in group on earliest night that has the baseline.
+                reds = []
+                for bl_nightly_dict in blgroup:
+                    # only load group if present in the current night.
+                    if j in bl_nightly_dict:
+                        # key to earliest night with this redundant group.
+                        key_bl = bl_nightly_dict[np.min(list(bl_nightly_dict.keys()))][0]
+                        key_baselines.append(key_bl)
+                        reds.append(bl_nightly_dict[j])
+                        bls_to_load.extend(bl_nightly_dict[j])
+
+                data, flags, nsamps = hd.read(bls=bls_to_load, times=tarr[tinds])
+                # if we want to throw away data associated with flagged antennas, throw it away.
+                if self.ex_ant_yaml_files is not None:
+                    from hera_qm.utils import apply_yaml_flags
+                    hd = self.hd = apply_yaml_flags(hd, a_priori_flag_yaml=self.ex_ant_yaml_files[j], ant_indices_only=True,
+                                                    flag_ants=True, flag_freqs=False, flag_times=False,
+                                                    throw_away_flagged_ants=True)
+                    data, flags, nsamps = hd.build_datacontainers()
+                data.phase_type = 'drift'
+            except ValueError:
+                # if no baselines in the file, skip this file
+                utils.echo("No baselines from blgroup {} found in {}, skipping file for these bls".format(bi + 1, data_files[j][k]), verbose=verbose)
+                # check that the current night is not present in any of the baselines in the current blgroup.
+                if np.all([j not in list(bl_nightly_dict.keys()) for bl_nightly_dict in blgroup]):
+                    utils.echo(f"The current night {j} is not present in any of the baseline dicts in the current blgroup.", verbose=verbose)
+                continue
+            # the DataContainers hold the data now, so don't keep it alive in the cached handle
+            hd.data_array, hd.flag_array, hd.nsample_array = None, None, None
+
+            # load calibration
+            if self.input_cals is not None:
+                if self.input_cals[j][k] is not None:
+                    utils.echo("Opening and applying {}".format(self.input_cals[j][k]), verbose=verbose)
+                    gains, cal_flags, gain_convention, cal_Ntimes = self._calibration(self.input_cals[j][k])
+                    # down select times in necessary
+                    if False in tinds and cal_Ntimes > 1:
+                        # If uvc has Ntimes == 1, then broadcast across time will work automatically
+                        gains = {ant: gain[tinds] for ant, gain in gains.items()}
+                        cal_flags = {ant: flag[tinds] for ant, flag in cal_flags.items()}
+                    apply_cal.calibrate_in_place(data, gains, data_flags=flags, cal_flags=cal_flags,
+                                                 gain_convention=gain_convention)
+
+            # redundantly average baselines, keying to baseline group key
+            # on earliest night.
+            if self.average_redundant_baselines:
+                if self.ignore_flags:
+                    raise NotImplementedError("average_redundant_baselines with ignore_flags True is not implemented.")
+                utils.red_average(data=data, flags=flags, nsamples=nsamps,
+                                  bl_tol=self.bl_error_tol, inplace=True,
+                                  reds=reds, red_bl_keys=key_baselines)
+            if file_list is not None:
+                file_list.append(data_files[j][k])
+            yield data, flags, nsamps, larr[tinds]
+
+
+def _lst_bin_blgroup(loader, f_lst, blgroup, bi, Nblgroups, dlst, begin_lst=None, atol=1e-6, streaming=False,
+                     sig_clip=True, sigma=5.0, min_N=5, rephase=False, freq_array=None, antpos=None,
+                     ignore_flags=False, median=False, verbose=True):
+    """
+    LST bin one baseline group of lst_bin_files() into the output file with LST bins f_lst,
+    loading data with loader (a _NightlyFileLoader). Returns the list of files loaded and
+    (bin_lst, bin_data, flag_data, std_data, num_data), or None if no file overlaps f_lst.
+    """
+    utils.echo("starting baseline-group {} / {}: {}".format(bi + 1, Nblgroups, datetime.datetime.now()), type=0, verbose=verbose)
+    fmin = f_lst[0] - (dlst / 2 + atol)
+    fmax = f_lst[-1] + (dlst / 2 + atol)
+    file_list = []
+    all_blgroup_baselines = [list(bl_nightly_dict.values())[0][0] for bl_nightly_dict in blgroup]
+    if streaming:
+        # bin one file at a time, making a second pass over the files for sigma clipping
+        binner = LSTBinAccumulator(dlst, begin_lst=begin_lst, lst_low=fmin, lst_hi=fmax, bl_list=all_blgroup_baselines,
+                                   rephase=rephase, freq_array=freq_array, antpos=antpos, verbose=verbose)
+        spoof = None
+        for data, flags, nsamps, lsts in loader.load(blgroup, bi, fmin, fmax, file_list):
+            binner.add(data, lsts, flags=(None if ignore_flags else flags), nsamples=nsamps)
+        if len(binner.stats) == 0:
+            if not loader.any_lst_overlap:
+                return file_list, None
+            spoof = _spoof_blgroup(all_blgroup_baselines, loader.hd.pols, len(f_lst), loader.hd.Nfreqs)
+            binner.add(spoof[0], f_lst, flags=(None if ignore_flags else spoof[1]), nsamples=spoof[2])
+        if sig_clip:
+            binner = binner.sigma_clipped(sigma=sigma, min_N=min_N)
+            for data, flags, nsamps, lsts in ([spoof[:3] + (f_lst,)] if spoof is not None else
+                                              loader.load(blgroup, bi, fmin, fmax)):
+                binner.add(data, lsts, flags=(None if ignore_flags else flags), nsamples=nsamps)
+        return file_list, binner.finalize(truncate_empty=False)
+
+    # create empty data lists
+    data_list = []
+    flgs_list = []
+    lst_list = []
+    nsamples_list = []
+    for data, flags, nsamps, lsts in loader.load(blgroup, bi, fmin, fmax, file_list):
+        data_list.append(data)  # this is data
+        flgs_list.append(flags)  # this is flgs
+        lst_list.append(lsts)  # this is lsts
+        nsamples_list.append(nsamps)
+    if len(data_list) == 0:
+        if loader.any_lst_overlap:
+            # spoof data  if data_list is empty but there are some data files with overlap with this lst.
+            # this is to avoid creating lstbinned files with varying numbers of baselines
+            # if we happen to be at an lst bin where one of the blgroups is empty.
+            data, flags, nsamps = _spoof_blgroup(all_blgroup_baselines, loader.hd.pols, len(f_lst), loader.hd.Nfreqs)
+            data_list = [data]
+            flgs_list = [flags]
+            lst_list = [f_lst]
+            nsamples_list = [nsamps]
+        else:
+            return file_list, None
+    # pass through lst-bin function
+    if ignore_flags:
+        flgs_list = None
+    return file_list, lst_bin(data_list, lst_list, flags_list=flgs_list, dlst=dlst, begin_lst=begin_lst,
+                              lst_low=fmin, lst_hi=fmax, truncate_empty=False, sig_clip=sig_clip, nsamples_list=nsamples_list,
+                              sigma=sigma, min_N=min_N, rephase=rephase, freq_array=freq_array, antpos=antpos,
+                              bl_list=all_blgroup_baselines, median=median)
+
+
+def _write_lst_bin_file(f_lst, results, dlst, file_ext, history, integration_time, freq_array, antpos,
+                        x_orientation=None, outdir="./", overwrite=False, verbose=True, **kwargs):
+    """
+    Join the _lst_bin_blgroup() results of all baseline groups of the output file with
+    LST bins f_lst and write them to LST and STD files in outdir. Each file is written to
+    a temporary file first and then renamed, so that a job that dies while writing never
+    leaves a partial output file behind. kwargs are passed to io.write_vis().
+
+    Returns the list of names of the files written, which is empty if there was no data
+    to write, or None if the output files exist and overwrite is False.
+    """
+    binned = [result for file_list, result in results if result is not None]
+    # if all blgroups were empty skip
+    if len(binned) == 0:
+        utils.echo("data_list is empty for beginning LST {}".format(f_lst[0]), verbose=verbose)
+        return []
+    bin_lst = binned[-1][0]
+
+    # join DataContainers across blgroups
+    bin_data, flag_data, std_data, num_data = [DataContainer(dict(functools.reduce(operator.add, [list(result[n].items()) for result in binned])))
+                                               for n in range(1, 5)]
+
+    # update history
+    file_list = results[-1][0]
+    file_history = history + " Input files: " + "-".join(list(map(lambda ff: os.path.basename(ff), file_list)))
+    kwargs['history'] = file_history + version.history_string()
+
+    # form integration time array
+    _Nbls = len(set([bl[:2] for bl in list(bin_data.keys())]))
+    kwargs['integration_time'] = np.ones(len(bin_lst) * _Nbls, dtype=np.float64) * integration_time
+
+    # file in data ext
+    fkwargs = {"type": "LST", "time": bin_lst[0] - dlst / 2.0}
+    if "{pol}" in file_ext:
+        fkwargs['pol'] = '.'.join(bin_data.pols())
+
+    # configure filenames
+    bin_file = "zen." + file_ext.format(**fkwargs)
+    fkwargs['type'] = 'STD'
+    std_file = "zen." + file_ext.format(**fkwargs)
+
+    # check for overwrite
+    if os.path.exists(os.path.join(outdir, bin_file)) and overwrite is False:
+        utils.echo("{} exists, not overwriting".format(bin_file), verbose=verbose)
+        return None
+    # write to temporary files, then move them into place
+    for fname, dc in [(bin_file, bin_data), (std_file, std_data)]:
+        tmp_file = '{}.{:032x}.tmp'.format(fname, random.getrandbits(128))
+        try:
+            io.write_vis(tmp_file, dc, bin_lst, freq_array, antpos, flags=flag_data, verbose=verbose, nsamples=num_data,
+                         filetype='uvh5', x_orientation=x_orientation, outdir=outdir, overwrite=True, **kwargs)
+            os.replace(os.path.join(outdir, tmp_file), os.path.join(outdir, fname))
+        finally:
+            if os.path.exists(os.path.join(outdir, tmp_file)):
+                os.remove(os.path.join(outdir, tmp_file))
+    return [bin_file, std_file]
+
+
+def _lst_bin_fingerprint(loader, fmin, fmax, config):
+    """
+    Hash config (a dictionary of the lst_bin_files() parameters that affect its outputs) together with
+    the paths, modification times and sizes of the data files that overlap with the LST range
+    [fmin, fmax] and of their calibration and antenna flag yaml files, if any.
+    """
+    paths = []
+    for j, k in loader.overlapping_files(fmin, fmax):
+        paths.append(loader.data_files[j][k])
+        if loader.input_cals is not None and isinstance(loader.input_cals[j][k], str):
+            paths.append(loader.input_cals[j][k])
+        if loader.ex_ant_yaml_files is not None:
+            paths.append(loader.ex_ant_yaml_files[j])
+    stamps = []
+    for path in paths:
+        stat = os.stat(path)
+        stamps.append((os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
+    return hashlib.sha1(repr((sorted(config.items()), stamps)).encode()).hexdigest()
+
+
+def _read_lst_bin_manifest(manifest_file):
+    """Read the manifest of completed output files written by _update_lst_bin_manifest(), or return an empty
+    one if manifest_file is missing or unreadable."""
+    try:
+        with open(manifest_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _update_lst_bin_manifest(manifest_file, key, fingerprint, outputs):
+    """
+    Record in manifest_file that the output file keyed by key was completed with the inputs hashed in fingerprint,
+    writing the files in outputs (in the same directory as manifest_file). Their modification times and sizes are
+    recorded so that _lst_bin_output_is_current() can verify them. The manifest is reread before being updated,
+    so that jobs sharing an output directory lose as few updates as possible, and written atomically.
+    """
+    outdir = os.path.dirname(manifest_file)
+    manifest = _read_lst_bin_manifest(manifest_file)
+    manifest[key] = {'fingerprint': fingerprint, 'outputs': []}
+    for fname in outputs:
+        stat = os.stat(os.path.join(outdir, fname))
+        manifest[key]['outputs'].append([fname, stat.st_mtime_ns, stat.st_size])
+    tmp_file = '{}.{:032x}.tmp'.format(manifest_file, random.getrandbits(128))
+    with open(tmp_file, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_file, manifest_file)
+
+
+def _lst_bin_output_is_current(manifest, key, fingerprint, outdir):
+    """Check whether the manifest records the output file keyed by key as completed with the inputs hashed
+    in fingerprint, and whether all of the files it wrote are unchanged in outdir."""
+    if key not in manifest or manifest[key]['fingerprint'] != fingerprint:
+        return False
+    for fname, mtime_ns, size in manifest[key]['outputs']:
+        path = os.path.join(outdir, fname)
+        if not os.path.exists(path):
+            return False
+        stat = os.stat(path)
+        if stat.st_mtime_ns != mtime_ns or stat.st_size != size:
+            return False
+    return True
+
+
+def _spoof_blgroup(bls, pols, Ntimes, Nfreqs):
+    """
+    Make completely flagged placeholder data, flags and nsamples for a group of baselines
+    with no data in an LST range.
+    """
+    antpairpols = [bl + (pol,) for pol in pols for bl in bls]
+    data = DataContainer({bl: np.ones((Ntimes, Nfreqs), dtype=complex) for bl in antpairpols})
+    flags = DataContainer({bl: np.ones((Ntimes, Nfreqs), dtype=bool) for bl in antpairpols})
+    nsamples = DataContainer({bl: np.zeros((Ntimes, Nfreqs)) for bl in antpairpols})
+    return data, flags, nsamples
 
 
 def make_lst_grid(dlst, begin_lst=None, verbose=True):
@@ -952,7 +1583,46 @@ def make_lst_grid(dlst, begin_lst=None, verbose=True):
     return lst_grid
 
 
-def sigma_clip(array, flags=None, sigma=4.0, axis=0, min_N=4):
+def _nanmedian(array, axis=0):
+    """
+    Sort-based equivalent of np.nanmedian(array, axis=axis, keepdims=True) for real arrays.
+    NaNs sort to the end of each slice, so the median is read off at the middle of the
+    unflagged entries of each slice after a single sort along axis.
+    """
+    if array.shape[axis] == 0:
+        return np.full(array.shape[:axis] + (1,) + array.shape[axis + 1:], np.nan)
+    N = np.sum(~np.isnan(array), axis=axis, keepdims=True)
+    lo, hi = np.maximum((N - 1) // 2, 0), N // 2
+    srt = np.sort(array, axis=axis)
+    median = (np.take_along_axis(srt, lo, axis=axis) + np.take_along_axis(srt, hi, axis=axis)) / 2
+    median[N == 0] = np.nan
+    return median
+
+
+def _weighted_nanmedian(array, weights, axis=0):
+    """
+    Weighted equivalent of _nanmedian(array, axis=axis), counting each entry of array with its
+    weight and ignoring NaNs and entries with zero weight. Where half of the total weight of a slice
+    falls exactly between two entries, their mean is taken, so that equal weights give the median.
+    """
+    if array.shape[axis] == 0:
+        return np.full(array.shape[:axis] + (1,) + array.shape[axis + 1:], np.nan)
+    weights = np.where(np.isnan(array), 0, np.broadcast_to(weights, array.shape))
+    order = np.argsort(array, axis=axis)
+    srt = np.take_along_axis(array, order, axis=axis)
+    cumulative = np.cumsum(np.take_along_axis(weights, order, axis=axis), axis=axis)
+    half = np.take(cumulative, [-1], axis=axis) / 2
+
+    # the median lies between the first entries whose cumulative weight reaches and exceeds half the total
+    last = array.shape[axis] - 1
+    lo = np.minimum(np.sum(cumulative < half, axis=axis, keepdims=True), last)
+    hi = np.minimum(np.sum(cumulative <= half, axis=axis, keepdims=True), last)
+    median = (np.take_along_axis(srt, lo, axis=axis) + np.take_along_axis(srt, hi, axis=axis)) / 2
+    median[~(half > 0)] = np.nan
+    return median
+
+
+def sigma_clip(array, flags=None, sigma=4.0, axis=0, min_N=4, nentries=None):
     """
     one-iteration robust sigma clipping algorithm. returns clip_flags array.
     Warning: this function will directly replace flagged and clipped data in array with
@@ -960,7 +1630,8 @@ def sigma_clip(array, flags=None, sigma=4.0, axis=0, min_N=4):
 
     Parameters:
     -----------
-    array : ndarray of complex visibility data. If 2D, [0] axis is samples and [1] axis is freq.
+    array : ndarray of real data of any shape, e.g. a (Nbins, Ndays, Nfreqs) cube of LST binned data.
+        If 2D, [0] axis is samples and [1] axis is freq.
 
     flags : ndarray matching array shape containing boolean flags. True if flagged.
 
@@ -971,7 +1642,10 @@ def sigma_clip(array, flags=None, sigma=4.0, axis=0, min_N=4):
     min_N : int, minimum length of array to sigma clip, below which no sigma
                 clipping is performed.
 
-    return_arrs : type=boolean, if True, return array and flags
+    nentries : integer ndarray holding the number of entries along axis in each slice, which is
+        compared to min_N instead of the length of the axis. Its shape must broadcast with the
+        shape of array with axis removed. This is for arrays padded along axis, where padding
+        is flagged or NaN. Default is the length of axis for all slices.
 
     Output: flags
     -------
@@ -996,13 +1670,19 @@ def sigma_clip(array, flags=None, sigma=4.0, axis=0, min_N=4):
         array[flags] *= np.nan
 
     # get robust location
-    location = np.nanmedian(array, axis=axis)
+    location = _nanmedian(array, axis=axis)
 
     # get MAD! * 1.482579
-    scale = np.nanmedian(np.abs(array - location), axis=axis) * 1.482579
+    deviation = np.abs(array - location)
+    scale = _nanmedian(deviation, axis=axis) * 1.482579
 
     # get clipped data
-    clip = np.abs(array - location) / scale > sigma
+    with np.errstate(divide='ignore', invalid='ignore'):
+        clip = deviation / scale > sigma
+    if nentries is not None:
+        axis = axis % array.ndim
+        enough = np.broadcast_to(np.asarray(nentries) >= min_N, array.shape[:axis] + array.shape[axis + 1:])
+        clip &= np.expand_dims(enough, axis)
 
     # set clipped data to nan and set clipped flags to True
     array[clip] *= np.nan
@@ -1018,6 +1698,7 @@ def gen_bl_nightly_dicts(hds, bl_error_tol=1.0, include_autos=True, redundant=Fa
     Parameters:
     -----------
     hds : list of HERAData objects. Can have no data loaded (preferable) and should refer to single files.
+          Only their metadata is used.
     bl_error_tol : float (meters), optional. baselines whose vector difference are within this tolerance are considered
                    redundant. Default is 1.0 meter.
     include_autos : bool, if True, include autos in bl_nightly_dicts.
@@ -1041,71 +1722,59 @@ def gen_bl_nightly_dicts(hds, bl_error_tol=1.0, include_autos=True, redundant=Fa
         In other words, each baseline dict corresponds to a unique baseline rather then a group
         and each value is that baseline in a length 1 list and each key is each night in which the baseline is present.
     """
-    # check that all hds are minimally redundant
-    blvecs = {}
+    # grid cells of baseline vectors (with side bl_error_tol) mapped to the indices of the
+    # bl_nightly_dicts whose reference baseline vector falls in that cell
+    cell_size = bl_error_tol if bl_error_tol > 0 else 1.0
+    cells = {}
+    ref_vecs = []
+    # antenna pairs mapped to the index of their bl_nightly_dict, in the orientation first seen
+    bl_indices = {}
     bl_nightly_dicts = []
     for night, hd in enumerate(hds):
         assert len(hd.filepaths) == 1, 'HERAData objects must be for single data files.'
         reds = redcal.get_reds(hd.antpos, bl_error_tol=bl_error_tol, pols=hd.pols[0], include_autos=include_autos)
-        # read to get baselines in data
-        d, _, _ = hd.read()
+        # get baselines in data from the file's metadata
+        data_bls = set(hd.antpairs)
         # if we are throwing away data with flagged ants, do it here.
         if ex_ant_yaml_files is not None:
-            from hera_qm.utils import apply_yaml_flags
-            hd = apply_yaml_flags(hd, a_priori_flag_yaml=ex_ant_yaml_files[night], ant_indices_only=True, flag_ants=True,
-                                  flag_freqs=False, flag_times=False, throw_away_flagged_ants=True)
-            d, _, _ = hd.build_datacontainers()
-        data_bls = d.antpairs()
+            from hera_qm.metrics_io import read_a_priori_ant_flags
+            ex_ants = set(read_a_priori_ant_flags(ex_ant_yaml_files[night], ant_indices_only=True))
+            data_bls = set(bl for bl in data_bls if bl[0] not in ex_ants and bl[1] not in ex_ants)
         reds = [[bl for bl in grp if bl[:2] in data_bls or bl[:2][::-1] in data_bls] for grp in reds]
         reds = [grp for grp in reds if len(grp) > 0]
         reds = [[bl[:2] for bl in grp] for grp in reds]
-        for grp in reds:
-            for bl in grp:
-                # store baseline vectors for all data.
-                blvecs[bl] = hd.antpos[bl[1]] - hd.antpos[bl[0]]
-                blvecs[bl[::-1]] = hd.antpos[bl[0]] - hd.antpos[bl[1]]
-        # otherwise, loop through baselines, for each bl_nightly_dict, see if the first
-        # entry matches (or conjugate matches). If yes, append to that bl_nightly_dict
         for grp in reds:
             if redundant:
-                present = False
-                for bl_nightly_dict in bl_nightly_dicts:
-                    # check if baseline group occured in previous nights
-                    # if it did, add it to the appropriate bl_nightly_dict.
-                    for i in bl_nightly_dict:
-                        if np.linalg.norm(blvecs[grp[0]] - blvecs[bl_nightly_dict[i][0]]) <= bl_error_tol or np.linalg.norm(blvecs[grp[0]] + blvecs[bl_nightly_dict[i][0]]) <= bl_error_tol:
-                            # I was having a lot of trouble getting a unittest for two separate cases here because
-                            # I'm not sure how to conveniently create a UVData object with baselines conjugated.
-                            # two cases is more readable then one so I'd prefer to have two.
-                            sign = -1
-                            if np.linalg.norm(blvecs[grp[0]] - blvecs[bl_nightly_dict[i][0]]) <= bl_error_tol:
-                                sign = 1
-                            bl_nightly_dict[night] = [bl[::sign] for bl in grp]
-                            present = True
-                            break
-                if not present:
+                # look for a previous group within bl_error_tol of this one (or its conjugate)
+                # among the bl_nightly_dicts in neighboring cells.
+                blvec = hd.antpos[grp[0][1]] - hd.antpos[grp[0][0]]
+                matches = []
+                for sign in [1, -1]:
+                    cell = np.floor(sign * blvec / cell_size).astype(int)
+                    candidates = set(i for offset in itertools.product([-1, 0, 1], repeat=len(cell))
+                                     for i in cells.get(tuple(cell + offset), []))
+                    matches += [(i, sign) for i in candidates if np.linalg.norm(sign * blvec - ref_vecs[i]) <= bl_error_tol]
+                # prefer the earliest bl_nightly_dict, and matching without conjugation
+                match = min(matches, key=lambda m: (m[0], -m[1])) if len(matches) > 0 else None
+                if match is not None:
+                    bl_nightly_dicts[match[0]][night] = [bl[::match[1]] for bl in grp]
+                else:
                     # this baseline group has not occured in previous nights
                     # add it.
+                    cells.setdefault(tuple(np.floor(blvec / cell_size).astype(int)), []).append(len(bl_nightly_dicts))
+                    ref_vecs.append(blvec)
                     bl_nightly_dicts.append({night: grp})
             else:
                 for bl in grp:
-                    present = False
-                    # check if baseline occured in previous nights
+                    # check if baseline occured in previous nights (in either orientation)
                     # if it did, add it to its corresponding baseline dictionary.
-                    for bl_nightly_dict in bl_nightly_dicts:
-                        for i in bl_nightly_dict:
-                            if bl in bl_nightly_dict[i] or bl[::-1] in bl_nightly_dict[i]:
-                                # I was having a lot of trouble getting a unittest for two separate cases here because
-                                # I'm not sure how to conveniently create a UVData object with baselines conjugated.
-                                # two cases is more readable then one so I'd prefer to have two.
-                                sign = -1
-                                if np.linalg.norm(blvecs[grp[0]] - blvecs[bl_nightly_dict[i][0]]) <= bl_error_tol:
-                                    sign = 1
-                                bl_nightly_dict[night] = [bl[::sign]]
-                                present = True
-                                break
-                    if not present:
+                    if bl in bl_indices:
+                        bl_nightly_dicts[bl_indices[bl]][night] = [bl]
+                    elif bl[::-1] in bl_indices:
+                        bl_nightly_dicts[bl_indices[bl[::-1]]][night] = [bl[::-1]]
+                    else:
                         # if this baseline does not appear in previous nights
                         # add it with this night.
+                        bl_indices[bl] = len(bl_nightly_dicts)
                         bl_nightly_dicts.append({night: [bl]})
     return bl_nightly_dicts
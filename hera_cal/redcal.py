@@ -6,7 +6,16 @@ import numpy as np
 from copy import deepcopy
 import argparse
 import os
+import glob
+import pickle
+import random
+import hashlib
+import warnings
+import time
 import linsolve
+from collections import OrderedDict, deque
+from scipy.sparse import csr_matrix
+from concurrent.futures import ProcessPoolExecutor
 
 from . import utils
 from . import version
@@ -21,6 +30,42 @@ SEC_PER_DAY = 86400.
 IDEALIZED_BL_TOL = 1e-8  # bl_error_tol for redcal.get_reds when using antenna positions calculated from reds
 
 
+# in-memory cache of redundancies, keyed by a hash of antenna positions and redundancy parameters, with LRU eviction
+REDS_CACHE_SIZE = 32
+_REDS_CACHE = OrderedDict()
+
+
+def _reds_cache_key(antpos, *args):
+    """Hash the antenna numbers and positions (in order) and any other hashable args into a cache key."""
+    key = hashlib.sha1()
+    for ant, pos in antpos.items():
+        key.update(repr(ant).encode())
+        key.update(np.asarray(pos, dtype=float).tobytes())
+        key.update(b'|')
+    key.update(repr(args).encode())
+    return key.hexdigest()
+
+
+def _get_cached_reds(key):
+    """Return a copy of the reds cached under key (marking them as recently used), or None if not cached."""
+    if key not in _REDS_CACHE:
+        return None
+    _REDS_CACHE.move_to_end(key)
+    return [list(red) for red in _REDS_CACHE[key]]
+
+
+def _cache_reds(key, reds):
+    """Store a copy of reds in the redundancy cache under key, evicting the least recently used if necessary."""
+    _REDS_CACHE[key] = [list(red) for red in reds]
+    while len(_REDS_CACHE) > REDS_CACHE_SIZE:
+        _REDS_CACHE.popitem(last=False)
+
+
+def clear_reds_cache():
+    """Remove all redundancies from the in-memory cache used by get_pos_reds() and get_reds()."""
+    _REDS_CACHE.clear()
+
+
 def get_pos_reds(antpos, bl_error_tol=1.0, include_autos=False):
     """ Figure out and return list of lists of redundant baseline pairs. Ordered by length. All baselines
         in a group have the same orientation with a preference for positive b_y and, when b_y==0, positive
@@ -37,48 +82,75 @@ def get_pos_reds(antpos, bl_error_tol=1.0, include_autos=False):
             sorted by index with the first index of the first baseline the lowest in the group.
     """
     keys = list(antpos.keys())
-    reds = {}
     assert np.all([len(pos) <= 3 for pos in antpos.values()]), 'Get_pos_reds only works in up to 3 dimensions.'
-    ap = {ant: np.pad(pos, (0, 3 - len(pos)), mode='constant') for ant, pos in antpos.items()}  # increase dimensionality
-    array_is_flat = np.all(np.abs(np.array(list(ap.values()))[:, 2] - np.mean(list(ap.values()), axis=0)[2]) < bl_error_tol / 4.0)
+    cache_key = _reds_cache_key(antpos, bl_error_tol, include_autos)
+    cached = _get_cached_reds(cache_key)
+    if cached is not None:
+        return cached
+    if len(keys) == 0:
+        return []
+    ap = np.array([np.pad(pos, (0, 3 - len(pos)), mode='constant') for pos in antpos.values()])  # increase dimensionality
+    array_is_flat = np.all(np.abs(ap[:, 2] - np.mean(ap, axis=0)[2]) < bl_error_tol / 4.0)
     p_or_m = (0, -1, 1)
     if array_is_flat:
-        epsilons = [[dx, dy, 0] for dx in p_or_m for dy in p_or_m]
+        epsilons = [(dx, dy, 0) for dx in p_or_m for dy in p_or_m]
     else:
-        epsilons = [[dx, dy, dz] for dx in p_or_m for dy in p_or_m for dz in p_or_m]
-
-    def check_neighbors(delta):  # Check to make sure reds doesn't have the key plus or minus rounding error
-        for epsilon in epsilons:
-            newKey = (delta[0] + epsilon[0], delta[1] + epsilon[1], delta[2] + epsilon[2])
-            if newKey in reds:
-                return newKey
-        return
-
-    for i, ant1 in enumerate(keys):
-        if include_autos:
-            start_ind = i
-        else:
-            start_ind = i + 1
-        for ant2 in keys[start_ind:]:
-            bl_pair = (ant1, ant2)
-            delta = tuple(np.round(1.0 * (np.array(ap[ant2]) - np.array(ap[ant1])) / bl_error_tol).astype(int))
-            new_key = check_neighbors(delta)
-            if new_key is None:  # forward baseline has no matches
-                new_key = check_neighbors(tuple([-d for d in delta]))
-                if new_key is not None:  # reverse baseline does have a match
-                    bl_pair = (ant2, ant1)
-            if new_key is not None:  # either the forward or reverse baseline has a match
-                reds[new_key].append(bl_pair)
-            else:  # this baseline is entirely new
-                if delta[0] <= 0 or (delta[0] == 0 and delta[1] <= 0) or (delta[0] == 0 and delta[1] == 0 and delta[2] <= 0):
-                    delta = tuple([-d for d in delta])
-                    bl_pair = (ant2, ant1)
-                reds[delta] = [bl_pair]
+        epsilons = [(dx, dy, dz) for dx in p_or_m for dy in p_or_m for dz in p_or_m]
+
+    # quantize all baseline vectors at once, in the order (i, j > i) that they would be visited in a double loop
+    ant1_inds, ant2_inds = np.triu_indices(len(keys), k=(0 if include_autos else 1))
+    deltas = np.round(1.0 * (ap[ant2_inds] - ap[ant1_inds]) / bl_error_tol).astype(int)
+    if len(deltas) == 0:
+        return []
+    dmin = deltas.min(axis=0)
+    dshape = tuple(deltas.max(axis=0) - dmin + 1)
+    ucodes, first_inds, inverse = np.unique(np.ravel_multi_index((deltas - dmin).T, dshape),
+                                            return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    udeltas = [tuple(int(d) for d in delta) for delta in np.array(np.unravel_index(ucodes, dshape)).T + dmin]
+
+    def neighbors(delta):  # keys that delta could be merged into because of rounding error, in order of preference
+        return [(delta[0] + eps[0], delta[1] + eps[1], delta[2] + eps[2]) for eps in epsilons]
+
+    # A new redundant group is only ever started by the first baseline with a given quantized vector, and only
+    # if neither it nor its reverse is a neighbor of an existing group. Record when each group was started.
+    started, started_flipped = {}, []
+    for u in np.argsort(first_inds):
+        delta = udeltas[u]
+        if not any([key in started for key in neighbors(delta) + neighbors(tuple(-d for d in delta))]):
+            if delta[0] <= 0:  # new groups are oriented with positive b_x
+                delta = tuple(-d for d in delta)
+                started_flipped.append(first_inds[u])
+            started[delta] = first_inds[u]
+
+    # Each baseline joins the first neighboring group (forward, then reversed) that existed when it was reached.
+    group_inds = {key: n for n, key in enumerate(started)}
+    group = np.zeros(len(deltas), dtype=int)
+    flipped = np.zeros(len(deltas), dtype=bool)
+    bl_inds = np.split(np.argsort(inverse, kind='stable'), np.cumsum(np.bincount(inverse))[:-1])
+    for u, delta in enumerate(udeltas):
+        candidates = [(group_inds[key], started[key], False) for key in neighbors(delta) if key in started]
+        candidates += [(group_inds[key], started[key], True) for key in neighbors(tuple(-d for d in delta)) if key in started]
+        if len(candidates) == 1 or candidates[0][1] <= first_inds[u]:  # the first candidate applies to every baseline
+            group[bl_inds[u]], flipped[bl_inds[u]] = candidates[0][0], candidates[0][2]
+        else:  # preferred groups were started later, so earlier baselines go in less preferred groups
+            for gi, start_ind, flip in candidates[::-1]:
+                these_bls = bl_inds[u][bl_inds[u] >= start_ind]
+                group[these_bls], flipped[these_bls] = gi, flip
+    flipped[started_flipped] = True  # baselines that start a group take its orientation (only matters for null baselines)
+
+    first_ants = [keys[i] for i in np.where(flipped, ant2_inds, ant1_inds)]
+    second_ants = [keys[i] for i in np.where(flipped, ant1_inds, ant2_inds)]
+    bls = list(zip(first_ants, second_ants))
+    bls_by_group = np.split(np.argsort(group, kind='stable'), np.cumsum(np.bincount(group))[:-1])
+    reds = {key: [bls[n] for n in bls_in_group] for key, bls_in_group in zip(started, bls_by_group)}
 
     # sort reds by length and each red to make sure the first antenna of the first bl in each group is the lowest antenna number
     orderedDeltas = [delta for (length, delta) in sorted(zip([np.linalg.norm(delta) for delta in reds.keys()], reds.keys()))]
-    return [sorted(reds[delta]) if sorted(reds[delta])[0][0] == np.min(reds[delta])
+    reds = [sorted(reds[delta]) if sorted(reds[delta])[0][0] == np.min(reds[delta])
             else sorted([reverse_bl(bl) for bl in reds[delta]]) for delta in orderedDeltas]
+    _cache_reds(cache_key, reds)
+    return [list(red) for red in reds]
 
 
 def add_pol_reds(reds, pols=['nn'], pol_mode='1pol'):
@@ -134,8 +206,13 @@ def get_reds(antpos, pols=['nn'], pol_mode='1pol', bl_error_tol=1.0, include_aut
             Each interior list is sorted so that the lowest index is first in the first baseline.
 
     """
-    pos_reds = get_pos_reds(antpos, bl_error_tol=bl_error_tol, include_autos=include_autos)
-    return add_pol_reds(pos_reds, pols=pols, pol_mode=pol_mode)
+    cache_key = _reds_cache_key(antpos, bl_error_tol, include_autos, tuple(pols), pol_mode)
+    reds = _get_cached_reds(cache_key)
+    if reds is None:
+        pos_reds = get_pos_reds(antpos, bl_error_tol=bl_error_tol, include_autos=include_autos)
+        reds = add_pol_reds(pos_reds, pols=pols, pol_mode=pol_mode)
+        _cache_reds(cache_key, reds)
+    return reds
 
 
 def filter_reds(reds, bls=None, ex_bls=None, ants=None, ex_ants=None, ubls=None, ex_ubls=None,
@@ -462,7 +539,61 @@ def _recursive_try_assumptions(polarity_groups, ants, prior_is_flipped, prior_ev
     assert False  # neither solution worked, so move on to another line of inquiry
 
 
-def find_polarity_flipped_ants(dly_cal_data, reds, edge_cut=0, max_rel_angle=(np.pi / 8), max_recursion_depth=6):
+def _graph_polarity_flips(polarity_groups, ants):
+    '''Deterministic, polynomial-time alternative to _recursive_try_assumptions(). Each baseline in a polarity group
+    is a linear equation mod 2: is_flipped[ant0] XOR is_flipped[ant1] XOR group_is_odd_even = (0 for group 1, 1 for
+    group 2), where group_is_odd_even is True if group 1 is the "odd" group. These are solved exactly by Gaussian
+    elimination over GF(2), representing each equation as the bits of an integer. Group 1 baselines (the majority)
+    are added before group 2 baselines, each in order of group lopsidedness, and equations that contradict the ones
+    already added are skipped. Unconstrained variables (e.g. the overall polarity) are set to not flipped, then each
+    connected set of antennas is given the overall polarity that flips the fewest of them.'''
+    ants = sorted(ants)
+    ant_bits = {ant: 1 << n for n, ant in enumerate(ants)}
+    group_keys = sorted(polarity_groups, key=lambda k: len(polarity_groups[k][0]) - len(polarity_groups[k][1]), reverse=True)
+    group_bits = {key: 1 << (len(ants) + n) for n, key in enumerate(group_keys)}
+
+    # rows of the reduced row echelon form, keyed by pivot bit, containing no other pivot bits
+    pivot_rows = {}
+    for grp_ind, rhs in [(0, 0), (1, 1)]:
+        for key in group_keys:
+            for bl in polarity_groups[key][grp_ind]:
+                ant0, ant1 = utils.split_bl(bl)
+                row, row_rhs = ant_bits[ant0] ^ ant_bits[ant1] ^ group_bits[key], rhs
+                for bit in [ant_bits[ant0], ant_bits[ant1], group_bits[key]]:
+                    if bit in pivot_rows:
+                        row, row_rhs = row ^ pivot_rows[bit][0], row_rhs ^ pivot_rows[bit][1]
+                if row == 0:  # either redundant or a contradiction, so skip
+                    continue
+                pivot = 1 << (row.bit_length() - 1)
+                for pbit, (prow, prhs) in pivot_rows.items():
+                    if prow & pivot:
+                        pivot_rows[pbit] = (prow ^ row, prhs ^ row_rhs)
+                pivot_rows[pivot] = (row, row_rhs)
+
+    # connect antennas that share baselines, then minimize the number of flips in each connected set
+    rel_flips = {ant: (ant_bits[ant] in pivot_rows) and (pivot_rows[ant_bits[ant]][1] == 1) for ant in ants}
+    connected = {ant: ant for ant in ants}
+
+    def find(ant):
+        while connected[ant] != ant:
+            connected[ant] = connected[connected[ant]]
+            ant = connected[ant]
+        return ant
+
+    for grp1, grp2 in polarity_groups.values():
+        for bl in grp1 + grp2:
+            root0, root1 = [find(ant) for ant in utils.split_bl(bl)]
+            connected[root1] = root0
+    n_flipped, n_ants = {}, {}
+    for ant in ants:
+        root = find(ant)
+        n_flipped[root] = n_flipped.get(root, 0) + rel_flips[ant]
+        n_ants[root] = n_ants.get(root, 0) + 1
+    return {ant: rel_flips[ant] ^ (2 * n_flipped[find(ant)] > n_ants[find(ant)]) for ant in ants}
+
+
+def find_polarity_flipped_ants(dly_cal_data, reds, edge_cut=0, max_rel_angle=(np.pi / 8), max_recursion_depth=6,
+                               method='recursive'):
     '''Looks at delay calibrated (but not phase calibrated or redcaled) data to determine which
     antennas appear to have reversed polarities (effectively a factor of -1 in the gains).
 
@@ -481,6 +612,9 @@ def find_polarity_flipped_ants(dly_cal_data, reds, edge_cut=0, max_rel_angle=(np
         5) When we get stuck, make another assumption recursively (go to 2) about the most-lopsided un-IDed group.
         6) Continue until a contradiction arises or the max_recursion_depth is reached. In that case, try the
            opposite assumption at the previous step, eventually recursively trying all assumptions.
+    With method='graph', steps 2-6 are replaced by solving the parity equations implied by the groups directly
+    with Gaussian elimination mod 2, which needs no assumptions or backtracking. Contradictory baselines in the
+    minority groups are ignored rather than causing a failure. See _graph_polarity_flips().
 
     Arugments:
         dly_cal_data: DataContainer mapping baseline tuples e.g. (0, 1, 'Jee') to delay-only calibrated visibilities
@@ -490,15 +624,21 @@ def find_polarity_flipped_ants(dly_cal_data, reds, edge_cut=0, max_rel_angle=(np
             (pi - max_rel_angle() is the cutoff for "minority" group. Must be between 0 and pi/2.
         max_recursion_depth: maximum number of assumptions to try before giving up. Warning: the complexity
             of this scales exponentially as 2^max_recursion_depth.
+        method: 'recursive' (default) tries assumptions recursively and fails if they lead to contradictions.
+            'graph' solves in polynomial time, ignoring contradictory baselines (max_recursion_depth is unused).
 
     Returns:
         is_flipped: dictionary mapping antenna tuple e.g. (0, 'Jee') to Booleans.
             If no solution is found returns a dictionary mapping antennas to None.
     '''
+    if method not in ['recursive', 'graph']:
+        raise ValueError("method must be 'recursive' or 'graph', not " + str(method))
 
     ants = set([ant for red in reds for bl in red for ant in utils.split_bl(bl)])
     polarity_groups = _build_polarity_baseline_groups(dly_cal_data, reds, edge_cut=edge_cut, max_rel_angle=np.pi / 8)
 
+    if method == 'graph':
+        return _graph_polarity_flips(polarity_groups, ants)
     try:
         is_flipped, even_vs_odd_IDs = _recursive_try_assumptions(polarity_groups, ants, {}, {}, 1, max_recursion_depth=5)
     except AssertionError:  # No solution is found.
@@ -579,6 +719,81 @@ def make_sol_finite(sol):
             sol[k][~np.isfinite(sol[k])] = np.ones_like(sol[k][~np.isfinite(sol[k])])
 
 
+OMNICAL_ACCEL_MODES = ['anderson', 'adaptive']
+
+
+class _OmnicalAccelerator:
+    def __init__(self, mode, gain, npix, depth=4, max_gain=1.0):
+        """Accelerate omnical's damped fixed-point iteration, x -> x + gain * (T(x) - x), independently
+        for each pixel of stacked (Nvar, Npix) solutions.
+
+        Args:
+            mode: 'anderson' extrapolates from the last depth iterates by Anderson mixing (i.e. finds the
+                combination of previous steps that minimizes the residual T(x) - x). 'adaptive' grows each
+                pixel's gain by 25% (up to max_gain) while its residual shrinks and halves it (down to gain)
+                when it doesn't.
+            gain: the damping factor of the underlying omnical iteration.
+            npix: the number of pixels being solved for.
+            depth: number of previous iterates to use for Anderson mixing.
+            max_gain: maximum gain for adaptive steps.
+        """
+        if mode not in OMNICAL_ACCEL_MODES:
+            raise ValueError("accel must be None or one of {}, not {}".format(OMNICAL_ACCEL_MODES, mode))
+        self.mode, self.depth = mode, depth
+        self.base_gain, self.max_gain = np.float32(gain), np.float32(max_gain)
+        self.gains = np.full(npix, gain, dtype=np.float32)
+        self.res = np.full(npix, np.inf)
+        self.stale = np.zeros(npix, dtype=bool)
+        self.prev_f, self.prev_gx = None, None
+        self.df, self.dgx = [], []
+
+    def select(self, inds):
+        '''Keep only the pixels at inds, e.g. when the others have converged.'''
+        self.gains, self.res, self.stale = self.gains[inds], self.res[inds], self.stale[inds]
+        if self.prev_f is not None:
+            self.prev_f, self.prev_gx = self.prev_f[:, inds], self.prev_gx[:, inds]
+        self.df, self.dgx = [d[:, inds] for d in self.df], [d[:, inds] for d in self.dgx]
+
+    def reset(self, mask):
+        '''Fall back to plain damped steps for the pixels in boolean mask, forgetting their history.'''
+        self.gains[mask] = self.base_gain
+        self.res[mask] = np.inf
+        self.stale |= mask
+        for d in self.df + self.dgx:
+            d[:, mask] = 0
+
+    def step(self, x, gx):
+        '''Given the current solution x and the damped omnical update gx, return the accelerated update.'''
+        f = gx - x
+        res = np.sum(np.abs(f)**2, axis=0) / np.sum(np.abs(gx)**2, axis=0)
+        shrinking, diverging = (res < self.res), (res > 2 * self.res)
+        self.res = res
+
+        if self.mode == 'adaptive':
+            self.gains = np.where(shrinking, np.minimum(self.gains * 1.25, self.max_gain),
+                                  np.maximum(self.gains / 2, self.base_gain)).astype(np.float32)
+            return x + (self.gains / self.base_gain) * f
+
+        # Anderson mixing: gx - dGX.gamma, where real gamma minimizes |f - dF.gamma|^2
+        if self.prev_f is not None:
+            self.df.append(np.where(self.stale, 0, f - self.prev_f))
+            self.dgx.append(np.where(self.stale, 0, gx - self.prev_gx))
+            self.stale[:] = False
+            if len(self.df) > self.depth:
+                self.df, self.dgx = self.df[1:], self.dgx[1:]
+        self.prev_f, self.prev_gx = f, gx
+        self.reset(diverging)
+        if len(self.df) == 0:
+            return gx
+        df, dgx = np.array(self.df), np.array(self.dgx)
+        A = np.einsum('ivp,jvp->pij', df.conj(), df).real.astype(float)
+        b = np.einsum('ivp,vp->pi', df.conj(), f).real.astype(float)
+        A += (1e-8 * np.trace(A, axis1=1, axis2=2) + np.finfo(float).tiny)[:, None, None] * np.eye(len(df))
+        gamma = np.linalg.solve(A, b[:, :, None])[:, :, 0]
+        gamma[~np.isfinite(gamma)] = 0
+        return (gx - np.einsum('ivp,pi->vp', dgx, gamma)).astype(gx.dtype)
+
+
 class OmnicalSolver(linsolve.LinProductSolver):
     def __init__(self, data, sol0, wgts={}, gain=.3, **kwargs):
         """Set up a nonlinear system of equations of the form g_i * g_j.conj() * V_mdl = V_ij
@@ -615,7 +830,7 @@ class OmnicalSolver(linsolve.LinProductSolver):
         _sol.update(sol)
         return {k: eval(k, _sol) for k in keys}
 
-    def solve_iteratively(self, conv_crit=1e-10, maxiter=50, check_every=4, check_after=1, verbose=False):
+    def solve_iteratively(self, conv_crit=1e-10, maxiter=50, check_every=4, check_after=1, accel=None, verbose=False):
         """Repeatedly solves and updates solution until convergence or maxiter is reached.
         Returns a meta-data about the solution and the solution itself.
 
@@ -626,6 +841,9 @@ class OmnicalSolver(linsolve.LinProductSolver):
             maxiter: An integer maximum number of iterations to perform before quitting. Default 50.
             check_every: Compute convergence and updates weights every Nth iteration (saves computation). Default 4.
             check_after: Start computing convergence and updating weights after the first N iterations.  Default 1.
+            accel: Optional acceleration of the iterations, either 'anderson' or 'adaptive'. See _OmnicalAccelerator.
+                Pixels whose chi^2 gets worse are restarted once from their best solution with plain damped
+                steps before being given up on. Default None is the plain damped iteration.
 
         Returns: meta, sol
             meta: a dictionary with metadata about the solution, including
@@ -647,6 +865,9 @@ class OmnicalSolver(linsolve.LinProductSolver):
         sol_u = {k: v[update].flatten() for k, v in sol.items()}
         iters = np.zeros(chisq.shape, dtype=np.int)
         conv = np.ones_like(chisq)
+        if accel is not None:
+            accelerator = _OmnicalAccelerator(accel, self.gain, update[0].size)
+            retried_u = np.zeros(update[0].size, dtype=bool)
         for i in range(1, maxiter + 1):
             if verbose:
                 print('Beginning iteration %d/%d' % (i, maxiter))
@@ -670,6 +891,11 @@ class OmnicalSolver(linsolve.LinProductSolver):
                 sol_sum_u[uij] += numerator
             new_sol_u = {k: v * ((1 - self.gain) + self.gain * sol_sum_u[k] / sol_wgt_u[k])
                          for k, v in sol_u.items()}
+            if accel is not None:
+                sol_keys = list(sol_u.keys())
+                accel_sol_u = accelerator.step(np.array([sol_u[k] for k in sol_keys]),
+                                               np.array([new_sol_u[k] for k in sol_keys]))
+                new_sol_u = dict(zip(sol_keys, accel_sol_u))
             dmdl_u = self._get_ans0(new_sol_u)
             # check if i % check_every is 0, which is purposely one less than the '1' up at the top of the loop
             if i < maxiter and (i < check_after or (i % check_every) != 0):
@@ -692,6 +918,11 @@ class OmnicalSolver(linsolve.LinProductSolver):
                 for k, v in new_sol_u.items():
                     sol[k][update] = v
                 update_u = np.where((conv_u > conv_crit) & gotbetter_u)
+                if accel is not None:
+                    # restart pixels that got worse once from their best solution before giving up on them
+                    retry_u = ~gotbetter_u & ~retried_u
+                    accelerator.reset(retry_u)
+                    update_u = np.where(((conv_u > conv_crit) & gotbetter_u) | retry_u)
                 if update_u[0].size == 0 or i == maxiter:
                     meta = {'iter': iters, 'chisq': chisq, 'conv_crit': conv}
                     return meta, sol
@@ -699,10 +930,305 @@ class OmnicalSolver(linsolve.LinProductSolver):
                 wgts_u = {k: v[update_u] for k, v in wgts_u.items()}
                 sol_u = {k: v[update_u] for k, v in new_sol_u.items()}
                 update = tuple(u[update_u] for u in update)
+                if accel is not None:
+                    accelerator.select(update_u[0])
+                    if np.any(retry_u):
+                        dmdl_u = self._get_ans0(sol_u)
+                    retried_u = ~gotbetter_u[update_u]
             if verbose:
                 print('    <CHISQ> = %f, <CONV> = %f, CNT = %d', (np.mean(chisq), np.mean(conv), update[0].size))
 
 
+class OmnicalArraySolver:
+    def __init__(self, reds, data, sol0, wgts={}, gain=.3):
+        """Set up the same system of equations as OmnicalSolver, g_i * g_j.conj() * V_mdl = V_ij,
+        but compile the redundancies once into integer index arrays (antenna i, antenna j, unique
+        baseline) so that models and updates are computed with vectorized gathers and scatters on
+        stacked (Nvar, Npix) arrays instead of by evaluating equation strings.
+
+        Args:
+            reds: list of lists of redundant baseline tuples, e.g. (ind1,ind2,pol). The first
+                item in each list will be treated as the key for the unique baseline.
+            data: visibility data in the dictionary format {(ant1,ant2,pol): np.array}
+            sol0: dictionary of guess gains and unique model visibilities, keyed by antenna tuples
+                like (ant,antpol) or by the first baseline tuple in each group in reds.
+            wgts: dictionary of linear weights in the same format as data. Defaults to equal wgts.
+            gain: The fractional step made toward the new solution each iteration.  Default is 0.3.
+                Values in the range 0.1 to 0.5 are generally safe.  Increasing values trade speed
+                for stability.
+        """
+        self.reds = reds
+        self.ants = sorted(set([ant for red in reds for bl in red for ant in split_bl(bl)]))
+        self.ubls = [red[0] for red in reds]
+        self.bls = [bl for red in reds for bl in red]
+        ant_index = {ant: i for i, ant in enumerate(self.ants)}
+        self.ant_i = np.array([ant_index[split_bl(bl)[0]] for bl in self.bls], dtype=int)
+        self.ant_j = np.array([ant_index[split_bl(bl)[1]] for bl in self.bls], dtype=int)
+        self.ubl_index = np.array([u for u, red in enumerate(reds) for bl in red], dtype=int)
+        self.gain = np.float32(gain)  # float32 to avoid accidentally promoting data to doubles.
+
+        # precompute sparse matrices for scattering per-baseline sums onto the variables they depend on
+        nvar, nbl = len(self.ants) + len(self.ubls), len(self.bls)
+        cols = np.arange(nbl)
+        self._scatter_i = csr_matrix((np.ones(2 * nbl), (np.concatenate([self.ant_i, len(self.ants) + self.ubl_index]),
+                                                         np.concatenate([cols, cols]))), shape=(nvar, nbl))
+        self._scatter_j = csr_matrix((np.ones(nbl), (self.ant_j, cols)), shape=(nvar, nbl))
+
+        # stack data, weights, and starting solutions
+        dc = DataContainer(data)
+        self.data = np.array([dc[bl] for bl in self.bls])
+        self.shape = self.data.shape[1:]
+        if len(wgts) > 0:
+            wc = DataContainer(wgts)
+            self.wgts = np.array([wc[bl] * np.ones(self.shape, dtype=np.float32) for bl in self.bls])
+        else:
+            self.wgts = np.ones(self.data.shape, dtype=np.float32)
+        self.sol0 = np.array([sol0[ant] for ant in self.ants] + [sol0[ubl] for ubl in self.ubls])
+
+    def _get_ans0(self, sol):
+        '''Evaluate g_i * g_j.conj() * V_mdl for every baseline given stacked (Nvar, Npix) solutions.'''
+        gains, vis = sol[:len(self.ants)], sol[len(self.ants):]
+        return np.take(gains, self.ant_i, axis=0) * np.take(gains.conj(), self.ant_j, axis=0) * np.take(vis, self.ubl_index, axis=0)
+
+    def _scatter(self, vals, conj_j=False):
+        '''Sum per-baseline (Nbl, Npix) quantities onto the variables they depend on: the first antenna,
+        the unique baseline, and the second antenna (which gets the complex conjugate if conj_j).'''
+        to_j = self._scatter_j.dot(vals)
+        return self._scatter_i.dot(vals) + (to_j.conj() if conj_j else to_j)
+
+    def solve_iteratively(self, conv_crit=1e-10, maxiter=50, check_every=4, check_after=1, accel=None, verbose=False):
+        """Repeatedly solves and updates solution until convergence or maxiter is reached.
+        Identical in algorithm and arguments to OmnicalSolver.solve_iteratively().
+
+        Returns: meta, sol
+            meta: a dictionary with metadata about the solution, including
+                iter: the number of iterations taken to reach convergence (or maxiter), with dimensions of the data.
+                chisq: the chi^2 of the solution produced by the final iteration, with dimensions of the data.
+                conv_crit: the convergence criterion evaluated at the final iteration, with dimensions of the data.
+            sol: a dictionary of complex solutions keyed by antenna and unique baseline tuples,
+                with dimensions of the data.
+        """
+        npix = int(np.prod(self.shape))
+        data = self.data.reshape(len(self.bls), npix)
+        wgts = self.wgts.reshape(len(self.bls), npix)
+        sol = self.sol0.reshape(len(self.sol0), npix).copy()
+        dmdl_u = self._get_ans0(sol)
+        chisq = np.sum(np.abs(data - dmdl_u)**2 * wgts, axis=0)
+        update = np.flatnonzero(chisq > 0)
+        # variables with '_u' only include pixels that need updating
+        dmdl_u, wgts_u, sol_u = dmdl_u[:, update], wgts[:, update], sol[:, update]
+        iters = np.zeros(chisq.shape, dtype=int)
+        conv = np.ones_like(chisq)
+        if accel is not None:
+            accelerator = _OmnicalAccelerator(accel, self.gain, update.size)
+            retried_u = np.zeros(update.size, dtype=bool)
+        for i in range(1, maxiter + 1):
+            if verbose:
+                print('Beginning iteration %d/%d' % (i, maxiter))
+            if (i % check_every) == 1:
+                # compute data wgts: dwgts = sum(V_mdl^2 / n^2) = sum(V_mdl^2 * wgts)
+                dwgts_u = np.abs(dmdl_u)**2 * wgts_u
+                sol_wgt_u = self._scatter(dwgts_u)
+                dw_u = data[:, update] * dwgts_u
+            # compute sum(wgts * V_meas / V_mdl)
+            numerator = dw_u / dmdl_u
+            sol_sum_u = self._scatter(numerator, conj_j=True)
+            new_sol_u = sol_u * ((1 - self.gain) + self.gain * sol_sum_u / sol_wgt_u)
+            if accel is not None:
+                new_sol_u = accelerator.step(sol_u, new_sol_u)
+            dmdl_u = self._get_ans0(new_sol_u)
+            if i < maxiter and (i < check_after or (i % check_every) != 0):
+                # Fast branch when we aren't expensively computing convergence/chisq
+                sol_u = new_sol_u
+            else:
+                # Slow branch when we compute convergence/chisq
+                new_chisq_u = np.sum(np.abs(data[:, update] - dmdl_u)**2 * wgts_u, axis=0)
+                gotbetter_u = (chisq[update] > new_chisq_u)
+                update_where = update[gotbetter_u]
+                chisq[update_where] = new_chisq_u[gotbetter_u]
+                iters[update_where] = i
+                new_sol_u = np.where(gotbetter_u, new_sol_u, sol_u)
+                conv_u = np.sqrt(np.sum(np.abs(new_sol_u - sol_u)**2, axis=0) / np.sum(np.abs(new_sol_u)**2, axis=0))
+                conv[update_where] = conv_u[gotbetter_u]
+                sol[:, update] = new_sol_u
+                update_u = np.flatnonzero((conv_u > conv_crit) & gotbetter_u)
+                if accel is not None:
+                    # restart pixels that got worse once from their best solution before giving up on them
+                    retry_u = ~gotbetter_u & ~retried_u
+                    accelerator.reset(retry_u)
+                    update_u = np.flatnonzero(((conv_u > conv_crit) & gotbetter_u) | retry_u)
+                if update_u.size == 0 or i == maxiter:
+                    break
+                dmdl_u, wgts_u, sol_u = dmdl_u[:, update_u], wgts_u[:, update_u], new_sol_u[:, update_u]
+                update = update[update_u]
+                if accel is not None:
+                    accelerator.select(update_u)
+                    if np.any(retry_u):
+                        dmdl_u = self._get_ans0(sol_u)
+                    retried_u = ~gotbetter_u[update_u]
+            if verbose:
+                print('    <CHISQ> = %f, <CONV> = %f, CNT = %d' % (np.mean(chisq), np.mean(conv), update.size))
+
+        meta = {'iter': iters.reshape(self.shape), 'chisq': chisq.reshape(self.shape), 'conv_crit': conv.reshape(self.shape)}
+        sol = {key: s.reshape(self.shape) for key, s in zip(self.ants + self.ubls, sol)}
+        return meta, sol
+
+
+class _SharedLinearSystem:
+    """Precompiled weighted linear system A x = y in which A (including weights) is the same for every
+    pixel, so the normal equations can be factorized once and reused. Mirrors linsolve's shared-inverse
+    solve (x = (At A)^-1 At y) for a linsolve.LinearSolver whose equations and weights are those of ls."""
+
+    def __init__(self, ls):
+        A = ls.get_A()[..., 0]
+        At = A.T.conj()
+        self.dtype = ls.dtype
+        self.prms = sorted(ls.prm_order, key=ls.prm_order.get)
+        self.sqrt_wgts = np.array([ls.wgts[k] for k in ls.keys], dtype=self.dtype)**.5
+        self.At = csr_matrix(At)
+        self.AtAi = np.linalg.pinv(np.dot(At, A), rcond=np.finfo(self.dtype).resolution, hermitian=True)
+
+    def solve(self, y):
+        """Solve for all pixels at once, where y is an (Neqs, ...) array of data ordered like the
+        equations used to build this system. Returns a dictionary mapping parameters to solutions."""
+        shape = y.shape[1:]
+        y = np.asarray(y, dtype=self.dtype).reshape(len(y), -1) * self.sqrt_wgts[:, None]
+        x = np.dot(self.AtAi, self.At.dot(y))
+        return {prm: x[i].reshape(shape) for i, prm in enumerate(self.prms)}
+
+
+# in-memory cache of _SharedLinearSystems, keyed by a hash of their equations and weights, with LRU eviction
+SOLVER_CACHE_SIZE = 16
+_SOLVER_CACHE = OrderedDict()
+
+
+def _has_shared_wgts(wgts):
+    """Returns True if wgts is empty or all weights are scalars, so that all pixels share an A matrix."""
+    return all([np.ndim(w) == 0 for w in wgts.values()])
+
+
+def _solver_cache_key(kind, d_ls, w_ls):
+    """Hash the kind of solver, the equations, their weights, and the data dtype into a cache key."""
+    key = hashlib.sha1(kind.encode())
+    key.update('|'.join(d_ls.keys()).encode())
+    if len(w_ls) > 0:
+        key.update(np.array([w_ls[k] for k in d_ls], dtype=float).tobytes())
+    key.update(str(np.result_type(*[d_ls[k] for k in d_ls], *[w for w in w_ls.values()])).encode())
+    return key.hexdigest()
+
+
+def _get_shared_linear_systems(kind, d_ls, w_ls):
+    """Get the list of _SharedLinearSystems for a linsolve 'linear' or 'log' solver with equations and
+    weights d_ls and w_ls from the solver cache, building and caching them (with LRU eviction) if necessary."""
+    key = _solver_cache_key(kind, d_ls, w_ls)
+    if key in _SOLVER_CACHE:
+        _SOLVER_CACHE.move_to_end(key)
+        return _SOLVER_CACHE[key]
+    # build the equations with one pixel of data, which is all that's needed for A
+    d_one = {k: np.ones(1, dtype=np.asarray(d).dtype) for k, d in d_ls.items()}
+    if kind == 'log':
+        ls = linsolve.LogProductSolver(d_one, wgts=w_ls)
+        systems = [_SharedLinearSystem(ls.ls_amp)] + ([_SharedLinearSystem(ls.ls_phs)] if ls.ls_phs is not None else [])
+    else:
+        systems = [_SharedLinearSystem(linsolve.LinearSolver(d_one, wgts=w_ls))]
+    _SOLVER_CACHE[key] = systems
+    while len(_SOLVER_CACHE) > SOLVER_CACHE_SIZE:
+        _SOLVER_CACHE.popitem(last=False)
+    return systems
+
+
+def clear_solver_cache():
+    """Remove all precompiled linear systems from the in-memory solver cache."""
+    _SOLVER_CACHE.clear()
+
+
+def read_solver_cache(cache_dir):
+    """Load precompiled logcal and firstcal linear systems from .redcal_cache files in cache_dir
+    (written by write_solver_cache(), e.g. while calibrating other files from the same night) into
+    the in-memory solver cache. Returns the list of cache keys that were loaded."""
+    loaded = []
+    for cache_file in sorted(glob.glob(os.path.join(cache_dir, '*.redcal_cache'))):
+        with open(cache_file, 'rb') as cfile:
+            cache = pickle.load(cfile)
+        for key, systems in cache.items():
+            if key not in _SOLVER_CACHE:
+                _SOLVER_CACHE[key] = systems
+                loaded.append(key)
+    while len(_SOLVER_CACHE) > SOLVER_CACHE_SIZE:
+        _SOLVER_CACHE.popitem(last=False)
+    return loaded
+
+
+def write_solver_cache(cache_dir=None, skip_keys=None):
+    """Write the in-memory solver cache (except for skip_keys, e.g. those just loaded with read_solver_cache())
+    to a new randomly-named .redcal_cache file in cache_dir (default: the current working directory).
+    Like filter caches, these are scratch files meant to be shared by the jobs of a single night."""
+    if skip_keys is None:
+        skip_keys = []
+    new_systems = {key: systems for key, systems in _SOLVER_CACHE.items() if key not in skip_keys}
+    if len(new_systems) == 0:
+        warnings.warn("No new linear systems in the solver cache. No cache file written.")
+        return
+    if cache_dir is None:
+        cache_dir = os.getcwd()
+    with open(os.path.join(cache_dir, '%032x' % random.getrandbits(128) + '.redcal_cache'), 'wb') as cfile:
+        pickle.dump(new_systems, cfile)
+
+
+# maximum number of complex elements in each stack of baseline pair products whose delays are found by firstcal
+FIRSTCAL_BATCH_SIZE = 2**23
+
+# maximum number of elements in each stack of baselines whose chi^2 is computed by normalized_chisq
+CHISQ_BATCH_SIZE = 2**23
+
+# in-memory cache of quantities that depend only on the layout of reds (e.g. degeneracy projectors and
+# predicted chi^2 per baseline), keyed by a hash of the reds and any other arguments, with LRU eviction
+LAYOUT_CACHE_SIZE = 32
+_LAYOUT_CACHE = OrderedDict()
+
+
+def _get_layout_cached(builder, kind, reds, *args):
+    """Get the result of builder() cached under kind, reds, and args, calling it and caching
+    the result (evicting the least recently used entry if necessary) if it's not cached."""
+    key = hashlib.sha1(kind.encode())
+    key.update(repr(reds).encode())
+    key.update(repr(args).encode())
+    key = key.hexdigest()
+    if key in _LAYOUT_CACHE:
+        _LAYOUT_CACHE.move_to_end(key)
+        return _LAYOUT_CACHE[key]
+    _LAYOUT_CACHE[key] = builder()
+    while len(_LAYOUT_CACHE) > LAYOUT_CACHE_SIZE:
+        _LAYOUT_CACHE.popitem(last=False)
+    return _LAYOUT_CACHE[key]
+
+
+def clear_layout_cache():
+    """Remove all degeneracy projectors and predicted chi^2s from the in-memory cache of quantities
+    that depend only on the layout of reds."""
+    _LAYOUT_CACHE.clear()
+
+
+def _firstcal_pairs(nbls, max_pairs_per_bl=None):
+    """Indices (i, j), with i < j, of the pairs of baselines in a redundant group of nbls baselines used by firstcal.
+    By default, all pairs are used. If max_pairs_per_bl is not None, each baseline is only paired with the next
+    max_pairs_per_bl baselines in the group (wrapping around), which connects all baselines in the group with
+    O(nbls * max_pairs_per_bl) rather than O(nbls^2) pairs."""
+    if (max_pairs_per_bl is None) or (2 * max_pairs_per_bl >= nbls - 1):
+        return [(i, j) for i in range(nbls) for j in range(i + 1, nbls)]
+    if max_pairs_per_bl < 1:
+        raise ValueError('max_pairs_per_bl must be at least 1, not {}'.format(max_pairs_per_bl))
+    return sorted(set([tuple(sorted((i, (i + step) % nbls))) for i in range(nbls)
+                       for step in range(1, max_pairs_per_bl + 1)]))
+
+
+def _mean_abs_product(abs_gains):
+    """Mean of |g_i| * |g_j| over all ordered pairs of different antennas i != j, given stacked |g_i|."""
+    n = len(abs_gains)
+    total = np.sum(abs_gains, axis=0)
+    return (total**2 - np.sum(abs_gains**2, axis=0)) / (n * (n - 1))
+
+
 class RedundantCalibrator:
 
     def __init__(self, reds, check_redundancy=False):
@@ -754,7 +1280,12 @@ class RedundantCalibrator:
         Returns:
             solver: instantiated solver with redcal equations and weights
         """
-        dtype = list(data.values())[0].dtype
+        d_ls, w_ls = self._solver_data_and_wgts(data, wgts=wgts, detrend_phs=detrend_phs)
+        return solver(data=d_ls, wgts=w_ls, **kwargs)
+
+    def _solver_data_and_wgts(self, data, wgts={}, detrend_phs=False):
+        """Build the dictionaries mapping redcal equations to data and weights used by _solver().
+        See _solver() for a description of the arguments."""
         dc = DataContainer(data)
         eqs = self.build_eqs(dc)
         self.phs_avg = {}  # detrend phases within redundant group, used for logcal to avoid phase wraps
@@ -770,7 +1301,7 @@ class RedundantCalibrator:
             wc = DataContainer(wgts)
             for eq, key in eqs.items():
                 w_ls[eq] = wc[key]
-        return solver(data=d_ls, wgts=w_ls, **kwargs)
+        return d_ls, w_ls
 
     def unpack_sol_key(self, k):
         """Turn linsolve's internal variable string into antenna or baseline tuple (with polarization)."""
@@ -800,8 +1331,8 @@ class RedundantCalibrator:
             ubl_sols[blgrp[0]] = np.average(d_gp, axis=0)  # XXX add option for median here?
         return ubl_sols
 
-    def _firstcal_iteration(self, data, df, f0, wgts={}, offsets_only=False, edge_cut=0,
-                            sparse=False, mode='default', norm=True, medfilt=False, kernel=(1, 11)):
+    def _firstcal_iteration(self, data, df, f0, wgts={}, offsets_only=False, edge_cut=0, sparse=False, mode='default',
+                            norm=True, medfilt=False, kernel=(1, 11), use_cache=True, max_pairs_per_bl=None):
         '''Runs a single iteration of firstcal, which uses phase differences between nominally
         redundant meausrements to solve for delays and phase offsets that produce gains of the
         form: np.exp(2j * np.pi * delay * freqs + 1j * offset).
@@ -817,23 +1348,25 @@ class RedundantCalibrator:
                 format.  All delays are multiplied by 1/df, so use that to set physical scale.
             off_sol: dictionary of per antenna phase offsets (in radians) in the same format.
         '''
-        Nfreqs = data[next(iter(data))].shape[1]  # hardcode freq is axis 1 (time is axis 0)
         if len(wgts) == 0:
             wgts = {k: np.ones_like(data[k], dtype=np.float32) for k in data}
         wgts = DataContainer(wgts)
+        pairs = [(bls[i], bls[j]) for bls in self.reds for (i, j) in _firstcal_pairs(len(bls), max_pairs_per_bl)]
+
+        # find delays of stacks of baseline pair products, each with a single FFT
         taus_offs, twgts = {}, {}
-        for bls in self.reds:
-            for i, bl1 in enumerate(bls):
-                d1, w1 = data[bl1], wgts[bl1]
-                for bl2 in bls[i + 1:]:
-                    d12 = d1 * np.conj(data[bl2])
-                    if norm:
-                        ad12 = np.abs(d12)
-                        d12 /= np.where(ad12 == 0, np.float32(1), ad12)
-                    w12 = w1 * wgts[bl2]
-                    taus_offs[(bl1, bl2)] = utils.fft_dly(d12, df, f0=f0, wgts=w12, medfilt=medfilt,
-                                                          kernel=kernel, edge_cut=edge_cut)
-                    twgts[(bl1, bl2)] = np.sum(w12)
+        batch_size = max(FIRSTCAL_BATCH_SIZE // max(data[pairs[0][0]].size, 1), 1) if len(pairs) > 0 else 1
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            d12 = np.array([data[bl1] for bl1, bl2 in batch]) * np.conj(np.array([data[bl2] for bl1, bl2 in batch]))
+            if norm:
+                ad12 = np.abs(d12)
+                d12 /= np.where(ad12 == 0, np.float32(1), ad12)
+            w12 = np.array([wgts[bl1] for bl1, bl2 in batch]) * np.array([wgts[bl2] for bl1, bl2 in batch])
+            dlys, offs = utils.fft_dly(d12, df, f0=f0, wgts=w12, medfilt=medfilt, kernel=kernel, edge_cut=edge_cut)
+            for n, pair in enumerate(batch):
+                taus_offs[pair] = (dlys[n], offs[n])
+                twgts[pair] = np.sum(w12[n])
         d_ls, w_ls = {}, {}
         for (bl1, bl2), tau_off_ij in taus_offs.items():
             ai, aj = split_bl(bl1)
@@ -842,8 +1375,11 @@ class RedundantCalibrator:
             eq_key = '%s-%s-%s+%s' % (i, j, m, n)
             d_ls[eq_key] = np.array(tau_off_ij)
             w_ls[eq_key] = twgts[(bl1, bl2)]
-        ls = linsolve.LinearSolver(d_ls, wgts=w_ls, sparse=sparse)
-        sol = ls.solve(mode=mode)
+        if use_cache and mode == 'default' and not sparse:  # weights are scalars, so the system is the same for every integration
+            sol = _get_shared_linear_systems('linear', d_ls, w_ls)[0].solve(np.array([d_ls[k] for k in d_ls]))
+        else:
+            ls = linsolve.LinearSolver(d_ls, wgts=w_ls, sparse=sparse)
+            sol = ls.solve(mode=mode)
         dly_sol = {self.unpack_sol_key(k): v[0] for k, v in sol.items()}
         off_sol = {self.unpack_sol_key(k): v[1] for k, v in sol.items()}
         # add back in antennas in reds but not in the system of equations
@@ -854,7 +1390,8 @@ class RedundantCalibrator:
 
     def firstcal(self, data, freqs, wgts={}, maxiter=25, conv_crit=1e-6,
                  sparse=False, mode='default', norm=True, medfilt=False, kernel=(1, 11),
-                 edge_cut=0, max_rel_angle=(np.pi / 8), max_recursion_depth=6):
+                 edge_cut=0, max_rel_angle=(np.pi / 8), max_recursion_depth=6, method='recursive', use_cache=True,
+                 max_pairs_per_bl=None):
         """Solve for a calibration solution parameterized by a single delay and phase offset
         per antenna using the phase difference between nominally redundant measurements.
         Delays are solved in a single iteration, but phase offsets are solved for
@@ -882,6 +1419,14 @@ class RedundantCalibrator:
                 (pi - max_rel_angle() is the cutoff for "minority" group. Must be between 0 and pi/2.
             max_recursion_depth: maximum number of assumptions to try before giving up.
                 Warning: the maximum complexity of this scales exponentially as 2^max_recursion_depth.
+            method: algorithm for finding polarity flipped antennas, either 'recursive' (default) or 'graph',
+                which takes polynomial time and ignores contradictory baselines. See find_polarity_flipped_ants().
+            use_cache: if True and mode is 'default' and sparse is False, get the factorized linear system for
+                these reds and weights from the solver cache (building it if necessary) and solve all integrations
+                with a single matrix product. See read_solver_cache() for reusing systems across files.
+            max_pairs_per_bl: if not None, pair each baseline with only this many others in its redundant group
+                (rather than all of them) when measuring delay differences, which bounds the cost of firstcal
+                for large redundant groups while keeping every group connected. See _firstcal_pairs().
 
         Returns:
             meta: dictionary of metadata (including delays and suspected antenna flips for each integration)
@@ -895,7 +1440,8 @@ class RedundantCalibrator:
         for i in range(maxiter):
             dlys, delta_off = self._firstcal_iteration(data, df=df, f0=freqs[0], wgts=wgts, edge_cut=edge_cut,
                                                        offsets_only=(i > 0), sparse=sparse, mode=mode,
-                                                       norm=norm, medfilt=medfilt, kernel=kernel)
+                                                       norm=norm, medfilt=medfilt, kernel=kernel, use_cache=use_cache,
+                                                       max_pairs_per_bl=max_pairs_per_bl)
             if i == 0:  # only solve for delays on the first iteration, also apply polarity flips
                 g_fc = {ant: np.array(np.exp(2j * np.pi * np.outer(dly, freqs)),
                                       dtype=dtype) for ant, dly in dlys.items()}
@@ -904,7 +1450,8 @@ class RedundantCalibrator:
                 # build metadata and apply detected polarities as a firstcal starting point
                 meta = {'dlys': {ant: dly.flatten() for ant, dly in dlys.items()}}
                 polarity_flips = find_polarity_flipped_ants(data, self.reds, max_rel_angle=max_rel_angle,
-                                                            edge_cut=edge_cut, max_recursion_depth=max_recursion_depth)
+                                                            edge_cut=edge_cut, max_recursion_depth=max_recursion_depth,
+                                                            method=method)
                 meta['polarity_flips'] = {ant: np.array([polarity_flips[ant] for i in range(len(dlys[ant]))])
                                           for ant in polarity_flips}
                 if np.all([flip is not None for flip in polarity_flips.values()]):
@@ -924,7 +1471,7 @@ class RedundantCalibrator:
         calibrate_in_place(data, g_fc, gain_convention='multiply')  # unapply calibration
         return meta, g_fc
 
-    def logcal(self, data, sol0={}, wgts={}, sparse=False, mode='default'):
+    def logcal(self, data, sol0={}, wgts={}, sparse=False, mode='default', use_cache=True):
         """Takes the log to linearize redcal equations and minimizes chi^2.
 
         Args:
@@ -938,6 +1485,9 @@ class RedundantCalibrator:
             mode: solving mode passed to the linsolve linear solver ('default', 'lsqr', 'pinv', or 'solve')
                 Suggest using 'default' unless solver is having stability (convergence) problems.
                 More documentation of modes in linsolve.LinearSolver.solve().
+            use_cache: if True, mode is 'default', sparse is False, and the weights are the same for all times
+                and frequencies (e.g. the default), get the factorized linear systems for these reds from the solver
+                cache (building them if necessary) and solve all pixels with a single matrix product.
 
         Returns:
             meta: empty dictionary (to maintain consistency with related functions)
@@ -946,8 +1496,20 @@ class RedundantCalibrator:
         """
         fc_data = deepcopy(data)
         calibrate_in_place(fc_data, sol0)
-        ls = self._solver(linsolve.LogProductSolver, fc_data, wgts=wgts, detrend_phs=True, sparse=sparse)
-        sol = ls.solve(mode=mode)
+        d_ls, w_ls = self._solver_data_and_wgts(fc_data, wgts=wgts, detrend_phs=True)
+        if use_cache and mode == 'default' and not sparse and _has_shared_wgts(w_ls):
+            systems = _get_shared_linear_systems('log', d_ls, w_ls)
+            log_data = np.log(np.array([d_ls[k] for k in d_ls]))
+            amp = systems[0].solve(log_data.real)
+            if len(systems) > 1:
+                phs = systems[1].solve(log_data.imag)
+                dtype = np.promote_types(systems[0].dtype, np.complex64)
+                sol = {k: np.exp(amp[k] + np.complex64(1j) * phs[k]).astype(dtype) for k in amp}
+            else:
+                sol = {k: np.exp(amp[k]).astype(systems[0].dtype) for k in amp}
+        else:
+            ls = linsolve.LogProductSolver(data=d_ls, wgts=w_ls, sparse=sparse)
+            sol = ls.solve(mode=mode)
         sol = {self.unpack_sol_key(k): sol[k] for k in sol.keys()}
         for ubl_key in [k for k in sol.keys() if len(k) == 3]:
             sol[ubl_key] = sol[ubl_key] * self.phs_avg[ubl_key].conj()
@@ -982,7 +1544,8 @@ class RedundantCalibrator:
         sol = {self.unpack_sol_key(k): sol[k] for k in sol.keys()}
         return meta, sol
 
-    def omnical(self, data, sol0, wgts={}, gain=.3, conv_crit=1e-10, maxiter=50, check_every=4, check_after=1):
+    def omnical(self, data, sol0, wgts={}, gain=.3, conv_crit=1e-10, maxiter=50, check_every=4, check_after=1,
+                engine='linsolve', accel=None):
         """Use the Liu et al 2010 Omnical algorithm to linearize equations and iteratively minimize chi^2.
 
         Args:
@@ -997,6 +1560,12 @@ class RedundantCalibrator:
             gain: The fractional step made toward the new solution each iteration.  Default is 0.3.
                 Values in the range 0.1 to 0.5 are generally safe.  Increasing values trade speed
                 for stability.
+            engine: 'linsolve' (default) uses OmnicalSolver, which evaluates linsolve equation strings.
+                'array' uses OmnicalArraySolver, which compiles self.reds into index arrays and is
+                much faster for large arrays. Both produce the same solutions.
+            accel: optional acceleration of omnical's iterations, either 'anderson' (Anderson mixing of the
+                last few iterates) or 'adaptive' (per-pixel gain that grows while the solution converges).
+                Both fall back to plain damped steps where they diverge. Default None uses fixed gain.
 
         Returns:
             meta: dictionary of information about the convergence and chi^2 of the solution
@@ -1004,9 +1573,18 @@ class RedundantCalibrator:
                 and {(ind1,ind2,pol): np.array} formats respectively
         """
 
+        if accel is not None and accel not in OMNICAL_ACCEL_MODES:
+            raise ValueError("accel must be None or one of {}, not {}".format(OMNICAL_ACCEL_MODES, accel))
+        if engine == 'array':
+            ls = OmnicalArraySolver(self.reds, data, sol0, wgts=wgts, gain=gain)
+            return ls.solve_iteratively(conv_crit=conv_crit, maxiter=maxiter, check_every=check_every, check_after=check_after,
+                                        accel=accel)
+        elif engine != 'linsolve':
+            raise ValueError("engine must be 'linsolve' or 'array', not {}".format(engine))
         sol0 = {self.pack_sol_key(k): sol0[k] for k in sol0.keys()}
         ls = self._solver(OmnicalSolver, data, sol0=sol0, wgts=wgts, gain=gain)
-        meta, sol = ls.solve_iteratively(conv_crit=conv_crit, maxiter=maxiter, check_every=check_every, check_after=check_after)
+        meta, sol = ls.solve_iteratively(conv_crit=conv_crit, maxiter=maxiter, check_every=check_every, check_after=check_after,
+                                         accel=accel)
         sol = {self.unpack_sol_key(k): sol[k] for k in sol.keys()}
         return meta, sol
 
@@ -1055,19 +1633,9 @@ class RedundantCalibrator:
         gainSols = np.array([gains[ant] for ant in ants])
         degenGains = np.array([degen_gains[ant] for ant in ants])
 
-        # Build matrices for projecting gain degeneracies
-        antpos = reds_to_antpos(self.reds)
-        positions = np.array([antpos[ant[0]] for ant in gains])
-        if self.pol_mode == '1pol' or self.pol_mode == '4pol_minV':
-            # In 1pol and 4pol_minV, the phase degeneracies are 1 overall phase and 2 tip-tilt terms
-            # Rgains maps gain phases to degenerate parameters (either average phases or phase slopes)
-            Rgains = np.hstack((positions, np.ones((positions.shape[0], 1))))
-        else:  # pol_mode is '4pol'
-            # two columns give sums for two different polarizations
-            phasePols = np.vstack((gainPols == antpols[0], gainPols == antpols[1])).T
-            Rgains = np.hstack((positions, phasePols))
-        # Mgains is like (AtA)^-1 At in linear estimator formalism. It's a normalized estimator of degeneracies
-        Mgains = np.linalg.pinv(Rgains.T.dot(Rgains)).dot(Rgains.T)
+        # Get (cached) matrices for projecting gain degeneracies
+        Rgains, Mgains = _get_layout_cached(lambda: self._degen_projectors(list(ants), antpols), 'degen',
+                                            self.reds, list(ants), antpols, self.pol_mode)
 
         # degenToRemove is the amount we need to move in the degenerate subspace
         if mode == 'phase':
@@ -1080,18 +1648,31 @@ class RedundantCalibrator:
             gainSols *= np.exp(np.complex64(-1j) * np.einsum('ij,jkl', Rgains, degenToRemove))
             # Fix abs terms: fixes the mean abs product of gains (as they appear in visibilities)
             for pol in antpols:
-                meanSqAmplitude = np.mean([np.abs(g1 * g2) for (a1, p1), g1 in gains.items()
-                                           for (a2, p2), g2 in gains.items()
-                                           if p1 == pol and p2 == pol and a1 != a2], axis=0)
-                degenMeanSqAmplitude = np.mean([np.abs(degen_gains[k1] * degen_gains[k2]) for k1 in gains.keys()
-                                                for k2 in gains.keys()
-                                                if k1[1] == pol and k2[1] == pol and k1[0] != k2[0]], axis=0)
+                meanSqAmplitude = _mean_abs_product(np.abs(np.array([gains[ant] for ant in ants if ant[1] == pol])))
+                degenMeanSqAmplitude = _mean_abs_product(np.abs(degenGains[gainPols == pol]))
                 gainSols[gainPols == pol] *= (degenMeanSqAmplitude / meanSqAmplitude)**.5
 
         # Create new solutions dictionary
         new_gains = {ant: gainSol for ant, gainSol in zip(ants, gainSols)}
         return new_gains
 
+    def _degen_projectors(self, ants, antpols):
+        """Build the matrices for projecting out the gain phase degeneracies of ants (in order): Rgains maps
+        degenerate parameters (average phases and phase slopes) to gain phases and Mgains, which is like
+        (AtA)^-1 At in the linear estimator formalism, is a normalized estimator of the degeneracies."""
+        antpos = reds_to_antpos(self.reds)
+        positions = np.array([antpos[ant[0]] for ant in ants])
+        if self.pol_mode == '1pol' or self.pol_mode == '4pol_minV':
+            # In 1pol and 4pol_minV, the phase degeneracies are 1 overall phase and 2 tip-tilt terms
+            Rgains = np.hstack((positions, np.ones((positions.shape[0], 1))))
+        else:  # pol_mode is '4pol'
+            # two columns give sums for two different polarizations
+            gainPols = np.array([ant[1] for ant in ants])
+            phasePols = np.vstack((gainPols == antpols[0], gainPols == antpols[1])).T
+            Rgains = np.hstack((positions, phasePols))
+        Mgains = np.linalg.pinv(Rgains.T.dot(Rgains)).dot(Rgains.T)
+        return Rgains, Mgains
+
     def remove_degen(self, sol, degen_sol=None):
         """ Removes degeneracies from solutions (or replaces them with those in degen_sol).  This
         function is nominally intended for use with solutions from logcal, omnical, or lincal, which
@@ -1181,17 +1762,22 @@ def predict_chisq_per_bl(reds):
             value of chi^2 = |Vij - gigj*Vi-j|^2/sigmaij^2.
     '''
     bls = [bl for red in reds for bl in red]
-    dummy_data = DataContainer({bl: np.ones((1, 1), dtype=np.complex) for bl in bls})
+    return dict(zip(bls, _get_layout_cached(lambda: _predict_chisq_per_bl(reds), 'chisq_per_bl', reds)))
+
+
+def _predict_chisq_per_bl(reds):
+    '''Array of predicted chi^2 for each baseline in reds (in order). See predict_chisq_per_bl().'''
+    bls = [bl for red in reds for bl in red]
+    dummy_data = DataContainer({bl: np.ones((1, 1), dtype=complex) for bl in bls})
     rc = RedundantCalibrator(reds)
     solver = rc._solver(linsolve.LogProductSolver, dummy_data)
 
+    # diagonals of the data resolution matrices A (AtA)^-1 At and B (BtB)^-1 Bt, without building them
     A = solver.ls_amp.get_A()[:, :, 0]
     B = solver.ls_phs.get_A()[:, :, 0]
-    A_data_resolution = A.dot(np.linalg.pinv(A.T.dot(A)).dot(A.T))
-    B_data_resolution = B.dot(np.linalg.pinv(B.T.dot(B)).dot(B.T))
-
-    predicted_chisq_per_bl = 1.0 - np.diag(A_data_resolution + B_data_resolution) / 2.0
-    return {bl: dof for bl, dof in zip(bls, predicted_chisq_per_bl)}
+    A_data_resolution = np.sum(A.dot(np.linalg.pinv(A.T.dot(A))) * A, axis=1)
+    B_data_resolution = np.sum(B.dot(np.linalg.pinv(B.T.dot(B))) * B, axis=1)
+    return 1.0 - (A_data_resolution + B_data_resolution) / 2.0
 
 
 def predict_chisq_per_red(reds):
@@ -1222,9 +1808,55 @@ def predict_chisq_per_ant(reds):
         sum(|Vij - gigj*Vi-j|^2/sigmaij^2) over all baselines including that antenna
     '''
     predicted_chisq_per_bl = predict_chisq_per_bl(reds)
-    bls = [bl for red in reds for bl in red]
+    predicted_chisq_per_ant = {}
+    for bl, dof in predicted_chisq_per_bl.items():
+        for ant in set(split_bl(bl)):
+            predicted_chisq_per_ant[ant] = predicted_chisq_per_ant.get(ant, 0.0) + dof
+    return {ant: predicted_chisq_per_ant[ant] for ant in sorted(predicted_chisq_per_ant)}
+
+
+def _stacked_chisq(data, data_wgts, reds, vis_sols, gains, split_by_antpol=False):
+    '''Computes the same chisq and chisq_per_ant as utils.chisq(data, vis_sols, data_wgts=data_wgts, gains=gains,
+    reds=reds, split_by_antpol=split_by_antpol) for the baselines in reds, but on stacks of baselines (of at most
+    CHISQ_BATCH_SIZE elements each) that are summed into antennas and antenna polarizations with sparse matrices.'''
+    bls = [bl for red in reds for bl in red if (bl in data) and (bl in data_wgts)]
+    if split_by_antpol:
+        bls = [bl for bl in bls if split_pol(bl[2])[0] == split_pol(bl[2])[1]]
+    ubl_of = {bl: red[0] for red in reds for bl in red}
     ants = sorted(set([ant for bl in bls for ant in split_bl(bl)]))
-    return {ant: np.sum([predicted_chisq_per_bl[bl] for bl in bls if ant in split_bl(bl)]) for ant in ants}
+    antpols = sorted(set([ant[1] for ant in ants]))
+    ant_index = {ant: i for i, ant in enumerate(ants)}
+    ant_i = np.array([ant_index[split_bl(bl)[0]] for bl in bls], dtype=int)
+    ant_j = np.array([ant_index[split_bl(bl)[1]] for bl in bls], dtype=int)
+
+    # sparse matrices summing chi^2 per baseline into antennas and into the antpol of the first antenna
+    cols = np.arange(len(bls))
+    to_ants = csr_matrix((np.ones(2 * len(bls)), (np.concatenate([ant_i, ant_j]), np.concatenate([cols, cols]))),
+                         shape=(len(ants), len(bls)))
+    antpol_index = np.array([antpols.index(ants[i][1]) for i in ant_i], dtype=int)
+    to_antpols = csr_matrix((np.ones(len(bls)), (antpol_index, cols)), shape=(len(antpols), len(bls)))
+
+    shape = data[next(iter(data))].shape if len(bls) == 0 else data[bls[0]].shape
+    npix = int(np.prod(shape))
+    chisq_per_ant = np.zeros((len(ants), npix), dtype=float)
+    chisq_by_antpol = np.zeros((len(antpols), npix), dtype=float)
+    g = np.array([gains[ant] for ant in ants]).reshape(len(ants), npix)
+    batch_size = max(CHISQ_BATCH_SIZE // max(npix, 1), 1)
+    for start in range(0, len(bls), batch_size):
+        batch = slice(start, start + batch_size)
+        d = np.array([data[bl] for bl in bls[batch]]).reshape(-1, npix)
+        w = np.array([np.broadcast_to(data_wgts[bl], shape) for bl in bls[batch]]).reshape(-1, npix)
+        assert np.isrealobj(w)
+        mdl = np.array([vis_sols[ubl_of[bl]] for bl in bls[batch]]).reshape(-1, npix)
+        mdl = mdl * g[ant_i[batch]] * np.conj(g[ant_j[batch]])
+        chisq_here = np.asarray(np.abs(mdl - d)**2 * w, dtype=np.float64)
+        chisq_per_ant += to_ants[:, batch].dot(chisq_here)
+        chisq_by_antpol += to_antpols[:, batch].dot(chisq_here)
+
+    chisq_per_ant = {ant: cspa.reshape(shape) for ant, cspa in zip(ants, chisq_per_ant)}
+    if split_by_antpol:
+        return {antpol: cs.reshape(shape) for antpol, cs in zip(antpols, chisq_by_antpol)}, chisq_per_ant
+    return np.sum(chisq_by_antpol, axis=0).reshape(shape), chisq_per_ant
 
 
 def normalized_chisq(data, data_wgts, reds, vis_sols, gains):
@@ -1252,8 +1884,8 @@ def normalized_chisq(data, data_wgts, reds, vis_sols, gains):
             visibilities that an antenna participates in, DoF normalized using predict_chisq_per_ant
     '''
     pol_mode = parse_pol_mode(reds)
-    chisq, _, chisq_per_ant, _ = utils.chisq(data, vis_sols, data_wgts=data_wgts, gains=gains,
-                                             reds=reds, split_by_antpol=(pol_mode in ['1pol', '2pol']))
+    chisq, chisq_per_ant = _stacked_chisq(data, data_wgts, reds, vis_sols, gains,
+                                          split_by_antpol=(pol_mode in ['1pol', '2pol']))
     predicted_chisq_per_ant = predict_chisq_per_ant(reds)
     chisq_per_ant = {ant: cs / predicted_chisq_per_ant[ant] for ant, cs in chisq_per_ant.items()}
     if pol_mode in ['1pol', '2pol']:  # in this case, chisq is split by antpol
@@ -1302,7 +1934,7 @@ def linear_cal_update(bls, cal, data, all_reds, weight_by_nsamples=False, weight
     Arguments:
         bls: list of baseline tuples like (0,1,'nn') to solve for the single remaining term
             using the corresponding data and the prior gain/visibility solutions. If any
-            bl has two unsolved terms, linsolve will throw an error.
+            bl has two unsolved terms, a ValueError is raised.
         cal: dictionary of redundant calibration solutions, updated in place, like the one
             produced by redcal.redundantly_calibrate(). See that function more details.
         data: DataContainer mapping baseline-pol tuples like (0,1,'nn') to complex data of
@@ -1316,28 +1948,14 @@ def linear_cal_update(bls, cal, data, all_reds, weight_by_nsamples=False, weight
             to downweight the equations they participate in. If a particular frequency
             and integration is flagged for all input data, this will produce np.nan
     '''
-    # use RedundantCalibrator to build up constants and equations
-    rc_all = RedundantCalibrator(all_reds)
-    consts = {rc_all.pack_sol_key(ant): cal['g_omnical'][ant] for ant in cal['g_omnical']}
-    all_reds_sets = [set(red) for red in all_reds]
-    for bl in cal['v_omnical']:
-        for red, red_set in zip(all_reds, all_reds_sets):
-            if bl in red_set:
-                consts.update({rc_all.pack_sol_key(red[0]): cal['v_omnical'][bl]})
-                match_found = True
-                break
-    eqs = {eq_str: bl for eq_str, bl in rc_all.build_eqs().items() if bl in bls}
-
-    # map baselines to ubls
-    bl_to_ubl_map = {bl: None for bl in bls}
-    for red in all_reds:
-        for bl in bls:
-            if bl in red:
-                bls_in_sol = [k for k in cal['v_omnical'] if k in red]
-                if len(bls_in_sol) > 0:
-                    bl_to_ubl_map[bl] = bls_in_sol[0]
-                else:
-                    bl_to_ubl_map[bl] = red[0]
+    # map baselines to ubls, using the visibility solution's key if there is one
+    red_index = {bl: i for i, red in enumerate(all_reds) for bl in red}
+    bls = [bl for bl in bls if bl in red_index]
+    ubl_in_sol = {}
+    for k in cal['v_omnical']:
+        if (k in red_index) and (red_index[k] not in ubl_in_sol):
+            ubl_in_sol[red_index[k]] = k
+    bl_to_ubl_map = {bl: ubl_in_sol.get(red_index[bl], all_reds[red_index[bl]][0]) for bl in bls}
 
     # build up weights
     bl_wgts = {bl: 1.0 for bl in bls}
@@ -1362,10 +1980,25 @@ def linear_cal_update(bls, cal, data, all_reds, weight_by_nsamples=False, weight
         total_wgts[ant0] += bl_wgts[bl]
         total_wgts[ant1] += bl_wgts[bl]
 
-    d_ls = {eq: data[bl] for eq, bl in eqs.items()}
-    w_ls = {eq: bl_wgts[bl] for eq, bl in eqs.items()}
-    ls = linsolve.LinearSolver(d_ls, wgts=w_ls, **consts)
-    sol = {rc_all.unpack_sol_key(k): val for k, val in ls.solve(mode='pinv').items()}
+    # Each equation, data = g_i * conj(g_j) * V, has a single unknown x (possibly conjugated) with a known
+    # coefficient c, so each unknown's weighted least-squares solution is sum(w * conj(c) * d) / sum(w * |c|^2)
+    numerators, denominators, dtypes = {}, {}, {}
+    for bl in bls:
+        ant0, ant1 = split_bl(bl)
+        ubl = bl_to_ubl_map[bl]
+        unknowns = [k for k, solved in [(ant0, ant0 in cal['g_omnical']), (ant1, ant1 in cal['g_omnical']),
+                                        (ubl, ubl in cal['v_omnical'])] if not solved]
+        if len(unknowns) != 1:
+            raise ValueError('Baseline {} has {} unsolved terms, but must have exactly 1.'.format(bl, len(unknowns)))
+        g0, g1 = cal['g_omnical'].get(ant0, 1.0), cal['g_omnical'].get(ant1, 1.0)
+        coeff, d = g0 * np.conj(g1) * cal['v_omnical'].get(ubl, 1.0), data[bl]
+        if unknowns[0] == ant1:  # the unknown is conjugated, so solve conj(data) = conj(g_i * V) * g_j instead
+            coeff, d = np.conj(coeff), np.conj(d)
+        numerators[unknowns[0]] = numerators.get(unknowns[0], 0) + bl_wgts[bl] * np.conj(coeff) * d
+        denominators[unknowns[0]] = denominators.get(unknowns[0], 0) + bl_wgts[bl] * np.abs(coeff)**2
+        dtypes[unknowns[0]] = np.result_type(d, coeff)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sol = {k: np.asarray(numerators[k] / denominators[k], dtype=dtypes[k]) for k in numerators}
     for k in sol:  # flag data when it has zero or undefined weight
         sol[k][(total_wgts[k] == 0) | ~np.isfinite(total_wgts[k])] = np.nan
     return sol
@@ -1493,9 +2126,38 @@ def expand_omni_sol(cal, all_reds, data, nsamples):
             cal['vns_omnical'][bl] = np.zeros_like(vis, dtype=np.float32)
 
 
+def _warm_start_sol(data, reds, gains, fallback_gains):
+    '''Build a starting point for omnical from gains, using fallback_gains (e.g. from firstcal) for
+    antennas and pixels where gains are missing or not finite. Unique baseline visibilities are the
+    average over each redundant group of data calibrated with the resulting gains.'''
+    sol = {}
+    for ant, g_fb in fallback_gains.items():
+        if ant in gains:
+            sol[ant] = np.where(np.isfinite(gains[ant]), gains[ant], g_fb).astype(g_fb.dtype)
+        else:
+            sol[ant] = g_fb.copy()
+    for red in reds:
+        cal_data = [data[bl] / (sol[split_bl(bl)[0]] * np.conj(sol[split_bl(bl)[1]])) for bl in red]
+        sol[red[0]] = np.mean(cal_data, axis=0).astype(data[red[0]].dtype)
+    return sol
+
+
+def _median_chisq(chisq):
+    '''Median of the finite, nonzero values of a chisq array or dictionary of chisq arrays (e.g. from
+    redundantly_calibrate or the total quality of an omnical calfits file). Returns None if there are none.'''
+    if isinstance(chisq, dict):
+        chisq = np.array([c for c in chisq.values()])
+    chisq = np.asarray(chisq)
+    good = np.isfinite(chisq) & (chisq != 0)
+    if not np.any(good):
+        return None
+    return np.median(chisq[good])
+
+
 def redundantly_calibrate(data, reds, freqs=None, times_by_bl=None, fc_conv_crit=1e-6,
-                          fc_maxiter=50, oc_conv_crit=1e-10, oc_maxiter=500, check_every=10,
-                          check_after=50, gain=.4, max_dims=2):
+                          fc_maxiter=50, fc_max_pairs_per_bl=None, oc_conv_crit=1e-10, oc_maxiter=500, check_every=10,
+                          check_after=50, gain=.4, max_dims=2, oc_engine='linsolve', oc_accel=None, sol0=None,
+                          g_firstcal=None, fc_meta=None):
     '''Performs all three steps of redundant calibration: firstcal, logcal, and omnical.
 
     Arguments:
@@ -1511,6 +2173,8 @@ def redundantly_calibrate(data, reds, freqs=None, times_by_bl=None, fc_conv_crit
             if it doesn't have .times_by_bl, or if the length of any list of times is 1.
         fc_conv_crit: maximum allowed changed in firstcal phases for convergence
         fc_maxiter: maximum number of firstcal iterations allowed for finding per-antenna phases
+        fc_max_pairs_per_bl: if not None, the number of other baselines in its redundant group with which each
+            baseline is paired to find firstcal delays. Default None uses all pairs. See RedundantCalibrator.firstcal().
         oc_conv_crit: maximum allowed relative change in omnical solutions for convergence
         oc_maxiter: maximum number of omnical iterations allowed before it gives up
         check_every: compute omnical convergence every Nth iteration (saves computation).
@@ -1521,6 +2185,17 @@ def redundantly_calibrate(data, reds, freqs=None, times_by_bl=None, fc_conv_crit
             with remove_degen() and must be later abscaled. None is no limit. 2 is a classically
             "redundantly calibratable" planar array.  More than 2 usually arises with subarrays of
             redundant baselines. Antennas will be excluded from reds to satisfy this.
+        oc_engine: omnical solver to use, either 'linsolve' (default) or 'array'. The latter compiles
+            reds into index arrays and is faster for large arrays. See RedundantCalibrator.omnical().
+        oc_accel: optional acceleration of omnical's iterations, either 'anderson' or 'adaptive'. Default None
+            uses the fixed gain. Iteration counts are recorded in omni_meta['iter']. See RedundantCalibrator.omnical().
+        sol0: optional dictionary mapping ant-pol tuples to starting gains (e.g. from a previous omnical
+            solution) of the same shape as the data. If provided, logcal is skipped and omnical is
+            warm-started from these gains (falling back to firstcal gains where they are missing or not
+            finite) and from visibilities averaged over redundant groups of data calibrated with them.
+        g_firstcal: optional dictionary mapping ant-pol tuples to firstcal gains of the same shape as the data
+            (e.g. from a previous run on the same data). If provided, firstcal is skipped and these are used instead.
+        fc_meta: firstcal metadata to return along with g_firstcal (see 'fc_meta' below). Only used with g_firstcal.
 
     Returns a dictionary of results with the following keywords:
         'g_firstcal': firstcal gains in dictionary keyed by ant-pol tuples like (1,'Jnn').
@@ -1549,17 +2224,27 @@ def redundantly_calibrate(data, reds, freqs=None, times_by_bl=None, fc_conv_crit
     if times_by_bl is None:
         times_by_bl = data.times_by_bl
 
-    # perform firstcal
-    rv['fc_meta'], rv['g_firstcal'] = rc.firstcal(data, freqs, maxiter=fc_maxiter, conv_crit=fc_conv_crit)
+    # perform firstcal (or reuse firstcal gains)
+    if g_firstcal is None:
+        rv['fc_meta'], rv['g_firstcal'] = rc.firstcal(data, freqs, maxiter=fc_maxiter, conv_crit=fc_conv_crit,
+                                                      max_pairs_per_bl=fc_max_pairs_per_bl)
+    else:
+        ants = set([ant for red in filtered_reds for bl in red for ant in split_bl(bl)])
+        rv['g_firstcal'] = {ant: g_firstcal[ant] for ant in ants}
+        rv['fc_meta'] = {key: {ant: fc_meta[key][ant] for ant in ants} for key in fc_meta} if fc_meta is not None else {}
     rv['gf_firstcal'] = {ant: np.zeros_like(g, dtype=bool) for ant, g in rv['g_firstcal'].items()}
 
-    # perform logcal and omnical
-    _, log_sol = rc.logcal(data, sol0=rv['g_firstcal'])
+    # perform logcal (or warm-start from sol0) and omnical
+    if sol0 is None:
+        _, log_sol = rc.logcal(data, sol0=rv['g_firstcal'])
+    else:
+        log_sol = _warm_start_sol(data, filtered_reds, sol0, rv['g_firstcal'])
     make_sol_finite(log_sol)
     data_wgts = {bl: predict_noise_variance_from_autos(bl, data, dt=(np.median(np.ediff1d(times_by_bl[bl[:2]]))
                                                                      * SEC_PER_DAY))**-1 for bl in data.keys()}
     rv['omni_meta'], omni_sol = rc.omnical(data, log_sol, wgts=data_wgts, conv_crit=oc_conv_crit, maxiter=oc_maxiter,
-                                           check_every=check_every, check_after=check_after, gain=gain)
+                                           check_every=check_every, check_after=check_after, gain=gain, engine=oc_engine,
+                                           accel=oc_accel)
 
     # update omnical flags and then remove degeneracies
     rv['g_omnical'], rv['v_omnical'] = get_gains_and_vis_from_sol(omni_sol)
@@ -1576,10 +2261,194 @@ def redundantly_calibrate(data, reds, freqs=None, times_by_bl=None, fc_conv_crit
     return rv
 
 
+def _redcal_calibrate_chunk(data, nsamples, reds, all_reds, freqs, times_by_bl, redcal_kwargs, sol0=None,
+                            g_firstcal=None, fc_meta=None):
+    '''Run redundantly_calibrate() and expand_omni_sol() on a single chunk of data. See redcal_iteration().'''
+    cal = redundantly_calibrate(data, reds, freqs=freqs, times_by_bl=times_by_bl, sol0=sol0,
+                                g_firstcal=g_firstcal, fc_meta=fc_meta, **redcal_kwargs)
+    expand_omni_sol(cal, all_reds, data, nsamples)
+    return cal
+
+
+def _prev_cal_priors(prev_cal, pols, tinds, fSlice):
+    '''Get the keyword arguments for _redcal_calibrate_chunk() that restart calibration of the chunk of data
+    with polarizations pols and time indices tinds from the results of a previous redcal_iteration() (prev_cal):
+    omnical gains (with NaNs where flagged) to start omnical from, and firstcal gains and metadata to reuse.'''
+    antpols = set([antpol for pol in pols for antpol in split_pol(pol)])
+    ants = [ant for ant in prev_cal['g_omnical'] if ant[1] in antpols]
+    sol0 = {ant: np.where(prev_cal['gf_omnical'][ant][tinds, fSlice], np.nan, prev_cal['g_omnical'][ant][tinds, fSlice])
+            for ant in ants}
+    g_firstcal = {ant: prev_cal['g_firstcal'][ant][tinds, fSlice] for ant in ants}
+    fc_meta = {key: {ant: prev_cal['fc_meta'][key][ant][tinds] for ant in ants} for key in prev_cal['fc_meta']}
+    return {'sol0': sol0, 'g_firstcal': g_firstcal, 'fc_meta': fc_meta}
+
+
+def _redcal_iteration_serial(hd, tasks, filtered_reds, all_reds, ex_ants, fSlice, nInt_to_load, redcal_kwargs,
+                             warm_start=False, init_gains=None, init_chisq=None, warm_start_chisq_ratio=1.5,
+                             prev_cal=None, data_cache=None, verbose=False):
+    '''Generator that calibrates each (pols, tinds) task in tasks one after another. See redcal_iteration().
+    If warm_start, each chunk's omnical is seeded from the last integration of the previous chunk's solution
+    (or init_gains, for the first chunk) and is redone from scratch if its median chi^2 per degree of freedom
+    exceeds warm_start_chisq_ratio times that of the previous chunk (or init_chisq, for the first chunk).
+    Chunks for which either chi^2 cannot be computed (e.g. single integrations) are kept as warm-started.
+    If prev_cal is not None, each chunk is instead restarted from it (see _prev_cal_priors()). If data_cache
+    is not None, partially loaded chunks are kept in it and reused by subsequent calls.'''
+    seeds, ref_chisqs = {}, {}
+    for pols, tinds in tasks:
+        if verbose:
+            print('Now calibrating', pols, 'polarization(s) for times', hd.times[tinds[0]], 'through', hd.times[tinds[-1]], '...')
+        reds = filter_reds(filtered_reds, ex_ants=ex_ants, pols=pols)
+        if nInt_to_load is None:  # don't perform partial I/O
+            data, _, nsamples = hd.build_datacontainers()  # this may contain unused polarizations, but that's OK
+            for bl in data:
+                data[bl] = data[bl][tinds, fSlice]  # cut down size of DataContainers to match unflagged indices
+                nsamples[bl] = nsamples[bl][tinds, fSlice]
+        elif (data_cache is not None) and ((str(pols), tuple(tinds)) in data_cache):  # reuse previously loaded data
+            data, nsamples = deepcopy(data_cache[(str(pols), tuple(tinds))])
+        else:  # perform partial i/o
+            data, _, nsamples = hd.read(times=hd.times[tinds], frequencies=hd.freqs[fSlice], polarizations=pols)
+            if data_cache is not None:  # store a copy, since firstcal modifies data in place
+                data_cache[(str(pols), tuple(tinds))] = deepcopy((data, nsamples))
+        args = (data, nsamples, reds, filter_reds(all_reds, pols=pols), hd.freqs[fSlice], hd.times_by_bl, redcal_kwargs)
+        if prev_cal is not None:
+            yield _redcal_calibrate_chunk(*args, **_prev_cal_priors(prev_cal, pols, tinds, fSlice))
+            continue
+        if not warm_start:
+            yield _redcal_calibrate_chunk(*args)
+            continue
+
+        cal = None
+        seed = seeds.get(str(pols), init_gains)
+        if seed is not None:
+            sol0 = {ant: np.tile(g[fSlice], (len(tinds), 1)) for ant, g in seed.items()}
+            # firstcal applies and unapplies calibration to data in place, so use a copy in case we start over
+            cal = _redcal_calibrate_chunk(deepcopy(data), *args[1:], sol0=sol0)
+            ref_chisq = ref_chisqs.get(str(pols), init_chisq)
+            chisq = _median_chisq(cal['chisq'])
+            if (ref_chisq is not None) and (chisq is not None) and (chisq > warm_start_chisq_ratio * ref_chisq):
+                if verbose:
+                    print('Warm-started chi^2 of', chisq, 'exceeds', warm_start_chisq_ratio, 'times', ref_chisq,
+                          '. Recalibrating from scratch...')
+                cal = None
+        if cal is None:
+            cal = _redcal_calibrate_chunk(*args)
+
+        # seed the next chunk with the last integration of this one, using NaNs for flagged gains
+        seeds[str(pols)] = {}
+        for ant, g in cal['g_omnical'].items():
+            seeds[str(pols)][ant] = np.full(len(hd.freqs), np.nan, dtype=g.dtype)
+            seeds[str(pols)][ant][fSlice] = np.where(cal['gf_omnical'][ant][-1], np.nan, g[-1])
+        ref_chisqs[str(pols)] = _median_chisq(cal['chisq'])
+        yield cal
+
+
+def _to_shared_memory(dcs, pols, tinds, fSlice):
+    '''Copy the [tinds, fSlice] part of the baselines with polarizations in pols of each DataContainer in dcs
+    into a new block of shared memory. Returns the SharedMemory object (which the caller must eventually unlink)
+    and a picklable description of its contents that _from_shared_memory() can use to rebuild the DataContainers.'''
+    from multiprocessing import shared_memory  # requires python 3.8+
+    keys = [key for key in dcs[0].keys() if key[2] in pols]
+    shape = (len(keys),) + dcs[0][keys[0]][tinds, fSlice].shape
+    dtypes = [np.dtype(dc[keys[0]].dtype) for dc in dcs]
+    offsets = np.cumsum([0] + [np.prod(shape) * dtype.itemsize for dtype in dtypes])
+    shm = shared_memory.SharedMemory(create=True, size=max(int(offsets[-1]), 1))
+    for dc, dtype, offset in zip(dcs, dtypes, offsets):
+        buf = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        for i, key in enumerate(keys):
+            buf[i] = dc[key][tinds, fSlice]
+    metas = [{attr: getattr(dc, attr) for attr in ['ants', 'data_ants', 'antpos', 'data_antpos', 'freqs', 'times',
+                                                   'lsts', 'times_by_bl', 'lsts_by_bl']} for dc in dcs]
+    return shm, (shm.name, keys, shape, [dtype.str for dtype in dtypes], [int(o) for o in offsets[:-1]], metas)
+
+
+def _from_shared_memory(spec):
+    '''Attach to the shared memory described by _to_shared_memory() and wrap it (without copying) in DataContainers.
+    Returns the SharedMemory object, which the caller must close once the DataContainers are no longer used,
+    and the list of DataContainers.'''
+    from multiprocessing import shared_memory  # requires python 3.8+
+    name, keys, shape, dtypes, offsets, metas = spec
+    shm = shared_memory.SharedMemory(name=name)
+    dcs = []
+    for dtype, offset, meta in zip(dtypes, offsets, metas):
+        buf = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        dc = DataContainer({key: buf[i] for i, key in enumerate(keys)})
+        for attr, value in meta.items():
+            setattr(dc, attr, value)
+        dcs.append(dc)
+    return shm, dcs
+
+
+def _redcal_calibrate_shared_chunk(spec, reds, all_reds, freqs, times_by_bl, redcal_kwargs, **priors):
+    '''Process pool worker that calibrates data and nsamples passed through shared memory. Since each
+    task gets its own block of shared memory, the data are calibrated (and modified by firstcal) in place.'''
+    shm, (data, nsamples) = _from_shared_memory(spec)
+    cal = _redcal_calibrate_chunk(data, nsamples, reds, all_reds, freqs, times_by_bl, redcal_kwargs, **priors)
+    del data, nsamples  # release the views of shared memory before closing it
+    shm.close()
+    return cal
+
+
+def _redcal_read_and_calibrate_chunk(filepaths, filetype, times, freqs, pols, reds, all_reds, times_by_bl, redcal_kwargs,
+                                     **priors):
+    '''Process pool worker that performs its own partial i/o before calibrating.'''
+    hd = HERAData(filepaths, filetype=filetype)
+    data, _, nsamples = hd.read(times=times, frequencies=freqs, polarizations=pols)
+    return _redcal_calibrate_chunk(data, nsamples, reds, all_reds, freqs, times_by_bl, redcal_kwargs, **priors)
+
+
+def _redcal_iteration_parallel(hd, tasks, filtered_reds, all_reds, ex_ants, fSlice, nInt_to_load, redcal_kwargs,
+                               nproc=2, prev_cal=None, verbose=False):
+    '''Calibrate each (pols, tinds) task in tasks on a pool of nproc processes. When nInt_to_load is None,
+    data are loaded once and each chunk is passed to its worker through shared memory. Otherwise, each
+    worker performs its own partial i/o. At most nproc tasks (and their blocks of shared memory) are in
+    flight at once. The results are identical to _redcal_iteration_serial().'''
+    cals, pending = [], deque()  # pending holds (future, shm) pairs, with shm None for partial i/o
+
+    def collect_oldest():
+        future, shm = pending[0]
+        try:
+            cals.append(future.result())
+        finally:
+            pending.popleft()
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+    try:
+        if nInt_to_load is None:
+            data, _, nsamples = hd.build_datacontainers(copy_data=False)  # views, copied per task to shared memory
+        with ProcessPoolExecutor(max_workers=nproc) as executor:
+            for pols, tinds in tasks:
+                if len(pending) >= nproc:
+                    collect_oldest()
+                if verbose:
+                    print('Now submitting', pols, 'polarization(s) for times', hd.times[tinds[0]], 'through', hd.times[tinds[-1]], '...')
+                reds = filter_reds(filtered_reds, ex_ants=ex_ants, pols=pols)
+                args = (reds, filter_reds(all_reds, pols=pols))
+                priors = {} if prev_cal is None else _prev_cal_priors(prev_cal, pols, tinds, fSlice)
+                if nInt_to_load is None:
+                    shm, spec = _to_shared_memory([data, nsamples], pols, tinds, fSlice)
+                    pending.append((executor.submit(_redcal_calibrate_shared_chunk, spec, *args, hd.freqs[fSlice],
+                                                    hd.times_by_bl, redcal_kwargs, **priors), shm))
+                else:
+                    pending.append((executor.submit(_redcal_read_and_calibrate_chunk, hd.filepaths, hd.filetype, hd.times[tinds],
+                                                    hd.freqs[fSlice], pols, *args, hd.times_by_bl, redcal_kwargs, **priors), None))
+            while len(pending) > 0:
+                collect_oldest()
+    finally:
+        for _, shm in pending:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+    return cals
+
+
 def redcal_iteration(hd, nInt_to_load=None, pol_mode='2pol', bl_error_tol=1.0, ex_ants=[],
                      solar_horizon=0.0, flag_nchan_low=0, flag_nchan_high=0, fc_conv_crit=1e-6,
-                     fc_maxiter=50, oc_conv_crit=1e-10, oc_maxiter=500, check_every=10, check_after=50,
-                     gain=.4, max_dims=2, verbose=False, **filter_reds_kwargs):
+                     fc_maxiter=50, fc_max_pairs_per_bl=None, oc_conv_crit=1e-10, oc_maxiter=500, check_every=10,
+                     check_after=50, gain=.4, max_dims=2, oc_engine='linsolve', oc_accel=None, nproc=1, warm_start=False, init_gains=None,
+                     init_chisq=None, warm_start_chisq_ratio=1.5, prev_cal=None, data_cache=None, verbose=False,
+                     **filter_reds_kwargs):
     '''Perform redundant calibration (firstcal, logcal, and omnical) an entire HERAData object, loading only
     nInt_to_load integrations at a time and skipping and flagging times when the sun is above solar_horizon.
 
@@ -1600,6 +2469,8 @@ def redcal_iteration(hd, nInt_to_load=None, pol_mode='2pol', bl_error_tol=1.0, e
         flag_nchan_high: integer number of channels at the high frequency end of the band to always flag (default 0)
         fc_conv_crit: maximum allowed changed in firstcal phases for convergence
         fc_maxiter: maximum number of firstcal iterations allowed for finding per-antenna phases
+        fc_max_pairs_per_bl: if not None, the number of other baselines in its redundant group with which each
+            baseline is paired to find firstcal delays. Default None uses all pairs. See RedundantCalibrator.firstcal().
         oc_conv_crit: maximum allowed relative change in omnical solutions for convergence
         oc_maxiter: maximum number of omnical iterations allowed before it gives up
         check_every: compute omnical convergence every Nth iteration (saves computation).
@@ -1610,6 +2481,35 @@ def redcal_iteration(hd, nInt_to_load=None, pol_mode='2pol', bl_error_tol=1.0, e
             with remove_degen() and must be later abscaled. None is no limit. 2 is a classically
             "redundantly calibratable" planar array.  More than 2 usually arises with subarrays of
             redundant baselines. Antennas will be excluded from reds to satisfy this.
+        oc_engine: omnical solver to use, either 'linsolve' (default) or 'array'. The latter compiles
+            reds into index arrays and is faster for large arrays. See RedundantCalibrator.omnical().
+        oc_accel: optional acceleration of omnical's iterations, either 'anderson' or 'adaptive'. Default None
+            uses the fixed gain. Iteration counts are recorded in omni_meta['iter']. See RedundantCalibrator.omnical().
+        nproc: number of processes to use. If greater than 1, each polarization and chunk of nInt_to_load
+            integrations is calibrated independently on a process pool. Chunks of loaded data are passed to
+            the workers through shared memory (or, with partial i/o, read by the workers themselves).
+            Results are identical to the serial (nproc=1) calculation. Without nInt_to_load, there is
+            only one chunk per polarization group, so at most 2 (in 2pol mode) or 1 (in 4pol mode)
+            processes are used. Passing loaded data through shared memory requires python 3.8+.
+        warm_start: if True, skip logcal and seed omnical for each chunk of nInt_to_load integrations with the
+            omnical gains of the last integration of the previous chunk (or init_gains, for the first chunk).
+            If the resulting median chi^2 per degree of freedom is more than warm_start_chisq_ratio times
+            that of the previous chunk (or init_chisq, for the first chunk), the chunk is recalibrated from
+            scratch. Requires nproc=1, since each chunk depends on the one before it.
+        init_gains: optional dictionary mapping ant-pol tuples like (1,'Jnn') to 1D arrays of Nfreqs complex
+            gains used to warm-start the first chunk, e.g. from a previous file. NaNs are treated as missing.
+            Only used if warm_start is True.
+        init_chisq: optional median chi^2 per degree of freedom against which to compare the first chunk's
+            warm-started chi^2. If None, the first chunk's warm-started solution is always kept.
+        warm_start_chisq_ratio: maximum allowed increase in median chi^2 per degree of freedom from one
+            chunk to the next before abandoning a warm-started solution
+        prev_cal: optional results of a previous redcal_iteration() on the same data, e.g. before excluding more
+            antennas. If provided, firstcal and logcal are skipped: each chunk reuses the previous firstcal gains and
+            metadata and restarts omnical from the previous omnical gains (using firstcal gains where they're flagged).
+            Overrides warm_start.
+        data_cache: optional dictionary in which to keep chunks of data loaded with partial i/o, so that subsequent
+            calls with the same data_cache (e.g. reruns excluding more antennas) don't have to read them again.
+            Only used when nproc=1.
         verbose: print calibration progress updates
         filter_reds_kwargs: additional filters for the redundancies (see redcal.filter_reds for documentation)
 
@@ -1633,6 +2533,8 @@ def redcal_iteration(hd, nInt_to_load=None, pol_mode='2pol', bl_error_tol=1.0, e
         'fc_meta' : dictionary that includes delays and identifies flipped antennas
         'omni_meta': dictionary of information about the omnical convergence and chi^2 of the solution
     '''
+    if warm_start and nproc > 1 and prev_cal is None:
+        raise ValueError('warm_start requires nproc=1, since each chunk is seeded by the one before it.')
     if nInt_to_load is not None:
         assert hd.filetype == 'uvh5', 'Partial loading only available for uvh5 filetype.'
     else:
@@ -1681,56 +2583,51 @@ def redcal_iteration(hd, nInt_to_load=None, pol_mode='2pol', bl_error_tol=1.0, e
     if verbose and np.any(solar_flagged):
         print(len(hd.times[solar_flagged]), 'integrations flagged due to sun above', solar_horizon, 'degrees.')
 
-    # loop over polarizations and times, performing partial loading if desired
-    for pols in pol_load_list:
-        if verbose:
-            print('Now calibrating', pols, 'polarization(s)...')
-        reds = filter_reds(filtered_reds, ex_ants=ex_ants, pols=pols)
-        if nInt_to_load is not None:  # split up the integrations to load nInt_to_load at a time
-            tind_groups = np.split(np.arange(nTimes)[~solar_flagged],
-                                   np.arange(nInt_to_load, len(hd.times[~solar_flagged]), nInt_to_load))
-        else:
-            tind_groups = [np.arange(nTimes)[~solar_flagged]]  # just load a single group
-        for tinds in tind_groups:
-            if len(tinds) > 0:
-                if verbose:
-                    print('    Now calibrating times', hd.times[tinds[0]], 'through', hd.times[tinds[-1]], '...')
-                if nInt_to_load is None:  # don't perform partial I/O
-                    data, _, nsamples = hd.build_datacontainers()  # this may contain unused polarizations, but that's OK
-                    for bl in data:
-                        data[bl] = data[bl][tinds, fSlice]  # cut down size of DataContainers to match unflagged indices
-                        nsamples[bl] = nsamples[bl][tinds, fSlice]
-                else:  # perform partial i/o
-                    data, _, nsamples = hd.read(times=hd.times[tinds], frequencies=hd.freqs[fSlice], polarizations=pols)
-                cal = redundantly_calibrate(data, reds, freqs=hd.freqs[fSlice], times_by_bl=hd.times_by_bl,
-                                            fc_conv_crit=fc_conv_crit, fc_maxiter=fc_maxiter,
-                                            oc_conv_crit=oc_conv_crit, oc_maxiter=oc_maxiter,
-                                            check_every=check_every, check_after=check_after, max_dims=max_dims, gain=gain)
-                expand_omni_sol(cal, filter_reds(all_reds, pols=pols), data, nsamples)
-
-                # gather results
-                for ant in cal['g_omnical'].keys():
-                    rv['g_firstcal'][ant][tinds, fSlice] = cal['g_firstcal'][ant]
-                    rv['gf_firstcal'][ant][tinds, fSlice] = cal['gf_firstcal'][ant]
-                    rv['g_omnical'][ant][tinds, fSlice] = cal['g_omnical'][ant]
-                    rv['gf_omnical'][ant][tinds, fSlice] = cal['gf_omnical'][ant]
-                    rv['chisq_per_ant'][ant][tinds, fSlice] = cal['chisq_per_ant'][ant]
-                for ant in cal['fc_meta']['dlys'].keys():
-                    rv['fc_meta']['dlys'][ant][tinds] = cal['fc_meta']['dlys'][ant]
-                    rv['fc_meta']['polarity_flips'][ant][tinds] = cal['fc_meta']['polarity_flips'][ant]
-                for bl in cal['v_omnical'].keys():
-                    rv['v_omnical'][bl][tinds, fSlice] = cal['v_omnical'][bl]
-                    rv['vf_omnical'][bl][tinds, fSlice] = cal['vf_omnical'][bl]
-                    rv['vns_omnical'][bl][tinds, fSlice] = cal['vns_omnical'][bl]
-                if pol_mode in ['1pol', '2pol']:
-                    for antpol in cal['chisq'].keys():
-                        rv['chisq'][antpol][tinds, fSlice] = cal['chisq'][antpol]
-                else:  # duplicate chi^2 into both antenna polarizations
-                    for antpol in rv['chisq'].keys():
-                        rv['chisq'][antpol][tinds, fSlice] = cal['chisq']
-                rv['omni_meta']['chisq'][str(pols)][tinds, fSlice] = cal['omni_meta']['chisq']
-                rv['omni_meta']['iter'][str(pols)][tinds, fSlice] = cal['omni_meta']['iter']
-                rv['omni_meta']['conv_crit'][str(pols)][tinds, fSlice] = cal['omni_meta']['conv_crit']
+    # build up the list of polarizations and integrations to calibrate together
+    redcal_kwargs = {'fc_conv_crit': fc_conv_crit, 'fc_maxiter': fc_maxiter, 'fc_max_pairs_per_bl': fc_max_pairs_per_bl,
+                     'oc_conv_crit': oc_conv_crit,
+                     'oc_maxiter': oc_maxiter, 'check_every': check_every, 'check_after': check_after,
+                     'max_dims': max_dims, 'gain': gain, 'oc_engine': oc_engine, 'oc_accel': oc_accel}
+    if nInt_to_load is not None:  # split up the integrations to load nInt_to_load at a time
+        tind_groups = np.split(np.arange(nTimes)[~solar_flagged],
+                               np.arange(nInt_to_load, len(hd.times[~solar_flagged]), nInt_to_load))
+    else:
+        tind_groups = [np.arange(nTimes)[~solar_flagged]]  # just load a single group
+    tasks = [(pols, tinds) for pols in pol_load_list for tinds in tind_groups if len(tinds) > 0]
+
+    if nproc > 1:
+        cals = _redcal_iteration_parallel(hd, tasks, filtered_reds, all_reds, ex_ants, fSlice, nInt_to_load,
+                                          redcal_kwargs, nproc=nproc, prev_cal=prev_cal, verbose=verbose)
+    else:
+        cals = _redcal_iteration_serial(hd, tasks, filtered_reds, all_reds, ex_ants, fSlice, nInt_to_load, redcal_kwargs,
+                                        warm_start=warm_start, init_gains=init_gains, init_chisq=init_chisq,
+                                        warm_start_chisq_ratio=warm_start_chisq_ratio, prev_cal=prev_cal,
+                                        data_cache=data_cache, verbose=verbose)
+
+    # gather results
+    for (pols, tinds), cal in zip(tasks, cals):
+        for ant in cal['g_omnical'].keys():
+            rv['g_firstcal'][ant][tinds, fSlice] = cal['g_firstcal'][ant]
+            rv['gf_firstcal'][ant][tinds, fSlice] = cal['gf_firstcal'][ant]
+            rv['g_omnical'][ant][tinds, fSlice] = cal['g_omnical'][ant]
+            rv['gf_omnical'][ant][tinds, fSlice] = cal['gf_omnical'][ant]
+            rv['chisq_per_ant'][ant][tinds, fSlice] = cal['chisq_per_ant'][ant]
+        for ant in cal['fc_meta']['dlys'].keys():
+            rv['fc_meta']['dlys'][ant][tinds] = cal['fc_meta']['dlys'][ant]
+            rv['fc_meta']['polarity_flips'][ant][tinds] = cal['fc_meta']['polarity_flips'][ant]
+        for bl in cal['v_omnical'].keys():
+            rv['v_omnical'][bl][tinds, fSlice] = cal['v_omnical'][bl]
+            rv['vf_omnical'][bl][tinds, fSlice] = cal['vf_omnical'][bl]
+            rv['vns_omnical'][bl][tinds, fSlice] = cal['vns_omnical'][bl]
+        if pol_mode in ['1pol', '2pol']:
+            for antpol in cal['chisq'].keys():
+                rv['chisq'][antpol][tinds, fSlice] = cal['chisq'][antpol]
+        else:  # duplicate chi^2 into both antenna polarizations
+            for antpol in rv['chisq'].keys():
+                rv['chisq'][antpol][tinds, fSlice] = cal['chisq']
+        rv['omni_meta']['chisq'][str(pols)][tinds, fSlice] = cal['omni_meta']['chisq']
+        rv['omni_meta']['iter'][str(pols)][tinds, fSlice] = cal['omni_meta']['iter']
+        rv['omni_meta']['conv_crit'][str(pols)][tinds, fSlice] = cal['omni_meta']['conv_crit']
 
     return rv
 
@@ -1780,9 +2677,11 @@ def redcal_run(input_data, filetype='uvh5', firstcal_ext='.first.calfits', omnic
                omnivis_ext='.omni_vis.uvh5', meta_ext='.redcal_meta.hdf5', iter0_prefix='', outdir=None,
                metrics_files=[], a_priori_ex_ants_yaml=None, clobber=False, nInt_to_load=None, pol_mode='2pol',
                bl_error_tol=1.0, ex_ants=[], ant_z_thresh=4.0, max_rerun=5, solar_horizon=0.0,
-               flag_nchan_low=0, flag_nchan_high=0, fc_conv_crit=1e-6, fc_maxiter=50,
+               flag_nchan_low=0, flag_nchan_high=0, fc_conv_crit=1e-6, fc_maxiter=50, fc_max_pairs_per_bl=None,
                oc_conv_crit=1e-10, oc_maxiter=500, check_every=10, check_after=50, gain=.4, add_to_history='',
-               max_dims=2, verbose=False, **filter_reds_kwargs):
+               max_dims=2, oc_engine='linsolve', oc_accel=None, nproc=1, warm_start=False, warm_start_calfits=None,
+               warm_start_chisq_ratio=1.5, cache_dir=None, read_cache=False, write_cache=False,
+               incremental_rerun=False, verbose=False, **filter_reds_kwargs):
     '''Perform redundant calibration (firstcal, logcal, and omnical) an uvh5 data file, saving firstcal and omnical
     results to calfits and uvh5. Uses partial io if desired, performs solar flagging, and iteratively removes antennas
     with high chi^2, rerunning calibration as necessary.
@@ -1824,6 +2723,8 @@ def redcal_run(input_data, filetype='uvh5', firstcal_ext='.first.calfits', omnic
         flag_nchan_high: integer number of channels at the high frequency end of the band to always flag (default 0)
         fc_conv_crit: maximum allowed changed in firstcal phases for convergence
         fc_maxiter: maximum number of firstcal iterations allowed for finding per-antenna phases
+        fc_max_pairs_per_bl: if not None, the number of other baselines in its redundant group with which each
+            baseline is paired to find firstcal delays. Default None uses all pairs. See RedundantCalibrator.firstcal().
         oc_conv_crit: maximum allowed relative change in omnical solutions for convergence
         oc_maxiter: maximum number of omnical iterations allowed before it gives up
         check_every: compute omnical convergence every Nth iteration (saves computation).
@@ -1834,6 +2735,29 @@ def redcal_run(input_data, filetype='uvh5', firstcal_ext='.first.calfits', omnic
             with remove_degen() and must be later abscaled. None is no limit. 2 is a classically
             "redundantly calibratable" planar array.  More than 2 usually arises with subarrays of
             redundant baselines. Antennas will be excluded from reds to satisfy this.
+        oc_engine: omnical solver to use, either 'linsolve' (default) or 'array'. The latter compiles
+            reds into index arrays and is faster for large arrays. See RedundantCalibrator.omnical().
+        oc_accel: optional acceleration of omnical's iterations, either 'anderson' or 'adaptive'. Default None
+            uses the fixed gain. Iteration counts are recorded in omni_meta['iter']. See RedundantCalibrator.omnical().
+        nproc: number of processes with which to calibrate polarizations and chunks of nInt_to_load
+            integrations in parallel. Without nInt_to_load, this is capped at the number of polarization
+            groups (2 in 2pol mode, 1 in 4pol mode). See redcal_iteration() for details.
+        warm_start: if True, seed omnical for each chunk of nInt_to_load integrations from the solution of the
+            previous chunk instead of running logcal. Requires nproc=1. See redcal_iteration() for details.
+        warm_start_calfits: optional path to an omnical calfits file (e.g. from the previous file in the night)
+            whose last integration of unflagged gains seeds the first chunk and whose total quality (chi^2)
+            is the reference for falling back to a full calibration. Setting this turns on warm_start.
+        warm_start_chisq_ratio: maximum allowed increase in median chi^2 per degree of freedom from one
+            chunk to the next before abandoning a warm-started solution
+        cache_dir: path to a folder of .redcal_cache files of precompiled logcal and firstcal linear systems,
+            e.g. shared by all files of a night. Default None is the current working directory.
+        read_cache: if True, load the linear systems cached in cache_dir before calibrating
+        write_cache: if True, write the linear systems built while calibrating (but not those loaded from
+            cache_dir) to a new .redcal_cache file in cache_dir. With nproc > 1, systems are built by the
+            worker processes and so are not written.
+        incremental_rerun: if True, reruns after excluding high chi^2 antennas skip firstcal and logcal and instead
+            restart omnical from the previous run's solutions. With nInt_to_load and nproc=1, the chunks of data
+            loaded on the first run are also kept in memory rather than being re-read on every rerun.
         add_to_history: string to add to history of output firstcal and omnical files
         verbose: print calibration progress updates
         filter_reds_kwargs: additional filters for the redundancies (see redcal.filter_reds for documentation)
@@ -1874,6 +2798,23 @@ def redcal_run(input_data, filetype='uvh5', firstcal_ext='.first.calfits', omnic
         ex_ants = ex_ants.union(set(read_a_priori_ant_flags(a_priori_ex_ants_yaml, ant_indices_only=True)))
     high_z_ant_hist = ''
 
+    # load gains and chi^2 from a previous omnical calfits to seed the first chunk
+    init_gains, init_chisq = None, None
+    if warm_start_calfits is not None:
+        warm_start = True
+        hc = HERACal(warm_start_calfits)
+        gains, flags, _, total_qual = hc.read()
+        if (len(hc.freqs) != len(hd.freqs)) or not np.allclose(hc.freqs, hd.freqs):
+            raise ValueError('The frequencies in ' + warm_start_calfits + ' do not match those of the data.')
+        init_gains = {ant: np.where(flags[ant][-1], np.nan, g[-1]) for ant, g in gains.items()}
+        if total_qual is not None:
+            init_chisq = _median_chisq({antpol: tq[-1] for antpol, tq in total_qual.items()})
+
+    # load precompiled logcal and firstcal linear systems from other files
+    keys_before = []
+    if read_cache:
+        keys_before = read_solver_cache(os.getcwd() if cache_dir is None else cache_dir)
+
     # setup output
     filename_no_ext = os.path.splitext(os.path.basename(input_data))[0]
     if outdir is None:
@@ -1881,15 +2822,26 @@ def redcal_run(input_data, filetype='uvh5', firstcal_ext='.first.calfits', omnic
 
     # loop over calibration, removing bad antennas and re-running if necessary
     run_number = 0
+    cal, rerun_times = None, []
+    data_cache = ({} if (incremental_rerun and nInt_to_load is not None) else None)
     while True:
         # Run redundant calibration
         if verbose:
             print('\nNow running redundant calibration without antennas', list(ex_ants), '...')
+        start_time = time.time()
         cal = redcal_iteration(hd, nInt_to_load=nInt_to_load, pol_mode=pol_mode, bl_error_tol=bl_error_tol, ex_ants=ex_ants,
                                solar_horizon=solar_horizon, flag_nchan_low=flag_nchan_low, flag_nchan_high=flag_nchan_high,
-                               fc_conv_crit=fc_conv_crit, fc_maxiter=fc_maxiter, oc_conv_crit=oc_conv_crit, oc_maxiter=oc_maxiter,
+                               fc_conv_crit=fc_conv_crit, fc_maxiter=fc_maxiter, fc_max_pairs_per_bl=fc_max_pairs_per_bl,
+                               oc_conv_crit=oc_conv_crit, oc_maxiter=oc_maxiter,
                                check_every=check_every, check_after=check_after, max_dims=max_dims, gain=gain,
-                               verbose=verbose, **filter_reds_kwargs)
+                               oc_engine=oc_engine, oc_accel=oc_accel, nproc=nproc, warm_start=warm_start, init_gains=init_gains,
+                               init_chisq=init_chisq, warm_start_chisq_ratio=warm_start_chisq_ratio,
+                               prev_cal=(cal if incremental_rerun else None), data_cache=data_cache, verbose=verbose,
+                               **filter_reds_kwargs)
+        rerun_times.append(time.time() - start_time)
+        cal['omni_meta']['rerun_times'] = np.array(rerun_times)
+        if verbose:
+            print('Redundant calibration run', run_number, 'took', rerun_times[-1], 'seconds.')
 
         # Determine whether to add additional antennas to exclude
         z_scores = per_antenna_modified_z_scores({ant: np.nanmedian(cspa) for ant, cspa in cal['chisq_per_ant'].items()
@@ -1911,6 +2863,9 @@ def redcal_run(input_data, filetype='uvh5', firstcal_ext='.first.calfits', omnic
                                       filename_no_ext + iter0_prefix + omnivis_ext, filename_no_ext + iter0_prefix + meta_ext, outdir,
                                       clobber=clobber, verbose=verbose, add_to_history=add_to_history + '\n' + 'Iteration 0 Results.\n')
 
+    if write_cache:
+        write_solver_cache(cache_dir, skip_keys=keys_before)
+
     # output results files
     _redcal_run_write_results(cal, hd, filename_no_ext + firstcal_ext, filename_no_ext + omnical_ext,
                               filename_no_ext + omnivis_ext, filename_no_ext + meta_ext, outdir, clobber=clobber,
@@ -1941,11 +2896,14 @@ def redcal_argparser():
     redcal_opts.add_argument("--a_priori_ex_ants_yaml", type=str, default=None, help='path to YAML file containing a priori ex_ants parsable by hera_qm.metrics_io.read_a_priori_ant_flags()')
     redcal_opts.add_argument("--ant_z_thresh", type=float, default=4.0, help="Threshold of modified z-score for chi^2 per antenna above which antennas are thrown away and calibration is re-run iteratively.")
     redcal_opts.add_argument("--max_rerun", type=int, default=5, help="Maximum number of times to re-run redundant calibration.")
+    redcal_opts.add_argument("--incremental_rerun", default=False, action="store_true", help="restart reruns from the previous run's solutions (skipping firstcal and logcal) \
+                             and keep partially loaded data in memory between reruns.")
     redcal_opts.add_argument("--solar_horizon", type=float, default=0.0, help="When the Sun is above this altitude in degrees, calibration is skipped and the integrations are flagged.")
     redcal_opts.add_argument("--flag_nchan_low", type=int, default=0, help="integer number of channels at the low frequency end of the band to always flag (default 0)")
     redcal_opts.add_argument("--flag_nchan_high", type=int, default=0, help="integer number of channels at the high frequency end of the band to always flag (default 0)")
     redcal_opts.add_argument("--nInt_to_load", type=int, default=None, help="number of integrations to load and calibrate simultaneously. Lower numbers save memory, but incur a CPU overhead. \
                              Default None loads all integrations.")
+    redcal_opts.add_argument("--nproc", type=int, default=1, help="number of processes with which to calibrate polarizations and chunks of nInt_to_load integrations in parallel (default 1).")
     redcal_opts.add_argument("--pol_mode", type=str, default='2pol', help="polarization mode of redundancies. Can be '1pol', '2pol', '4pol', or '4pol_minV'. See recal.get_reds documentation.")
     redcal_opts.add_argument("--bl_error_tol", type=float, default=1.0, help="the largest allowable difference between baselines in a redundant group")
     redcal_opts.add_argument("--min_bl_cut", type=float, default=None, help="cut redundant groups with average baseline lengths shorter than this length in meters")
@@ -1956,11 +2914,23 @@ def redcal_argparser():
     omni_opts = a.add_argument_group(title='Firstcal and Omnical-Specific Options')
     omni_opts.add_argument("--fc_conv_crit", type=float, default=1e-6, help="maximum allowed changed in firstcal phases for convergence")
     omni_opts.add_argument("--fc_maxiter", type=int, default=50, help="maximum number of firstcal iterations allowed for finding per-antenna phases")
+    omni_opts.add_argument("--fc_max_pairs_per_bl", type=int, default=None, help="number of other baselines in its redundant group with which each baseline is paired \
+                           to find firstcal delays. Default None uses all pairs, which can be slow for large redundant groups.")
     omni_opts.add_argument("--oc_conv_crit", type=float, default=1e-10, help="maximum allowed relative change in omnical solutions for convergence")
     omni_opts.add_argument("--oc_maxiter", type=int, default=500, help="maximum number of omnical iterations allowed before it gives up")
     omni_opts.add_argument("--check_every", type=int, default=10, help="compute omnical convergence every Nth iteration (saves computation).")
     omni_opts.add_argument("--check_after", type=int, default=50, help="start computing omnical convergence only after N iterations (saves computation).")
     omni_opts.add_argument("--gain", type=float, default=.4, help="The fractional step made toward the new solution each omnical iteration. Values in the range 0.1 to 0.5 are generally safe.")
+    omni_opts.add_argument("--oc_engine", type=str, default='linsolve', help="omnical solver to use, either 'linsolve' (default) or 'array' (faster for large arrays).")
+    omni_opts.add_argument("--oc_accel", type=str, default=None, help="optional acceleration of omnical iterations, either 'anderson' or 'adaptive'. Default None uses a fixed gain.")
+    omni_opts.add_argument("--warm_start", default=False, action="store_true", help="seed omnical for each chunk of nInt_to_load integrations from the previous chunk's solution instead of running logcal.")
+    omni_opts.add_argument("--warm_start_calfits", type=str, default=None, help="path to an omnical calfits file (e.g. from the previous file) used to seed the first chunk. Turns on --warm_start.")
+    omni_opts.add_argument("--warm_start_chisq_ratio", type=float, default=1.5, help="maximum allowed increase in median chi^2 from one chunk to the next before recalibrating a warm-started chunk from scratch.")
+
+    cache_opts = a.add_argument_group(title='Options for caching precompiled logcal and firstcal linear systems')
+    cache_opts.add_argument("--cache_dir", type=str, default=None, help="directory of .redcal_cache files shared by the files of a night. Default is the current working directory.")
+    cache_opts.add_argument("--read_cache", default=False, action="store_true", help="load cached linear systems from cache_dir before calibrating.")
+    cache_opts.add_argument("--write_cache", default=False, action="store_true", help="write newly built linear systems to a new cache file in cache_dir.")
 
     args = a.parse_args()
     return args
@@ -265,6 +265,21 @@ class Test_HERAData(object):
             hd.select(blt_inds=[0, 1, 3, 5, 23, 48])
             hd._determine_blt_slicing()
 
+    def test_get_blt_slices(self):
+        uvd = UVData()
+        uvd.read_uvh5(self.uvh5_1)
+        # baseline-ordered blts give contiguous slices, in the order of get_antpairs()
+        uvd.reorder_blts(order='baseline')
+        blt_slices = io.get_blt_slices(uvd)
+        assert list(blt_slices.keys()) == uvd.get_antpairs()
+        for bl, s in blt_slices.items():
+            assert s.step == 1
+            np.testing.assert_array_equal(uvd.antpair2ind(*bl), np.arange(uvd.Nblts)[s])
+        # a single integration gives one-element slices
+        uvd.select(times=uvd.time_array[:1])
+        for bl, s in io.get_blt_slices(uvd).items():
+            np.testing.assert_array_equal(uvd.antpair2ind(*bl), np.arange(uvd.Nblts)[s])
+
     def test_determine_pol_indexing(self):
         hd = HERAData(self.uvh5_1)
         assert hd._polnum_indices == {-5: 0}
@@ -435,12 +450,59 @@ class Test_HERAData(object):
         with pytest.raises(NotImplementedError):
             d, f, n = hd.read(read_data=False)
 
-    def test_getitem(self):
+    def test_getitem(self, monkeypatch):
         hd = HERAData(self.uvh5_1)
         hd.read()
         for bl in hd.bls:
             np.testing.assert_array_almost_equal(hd[bl], hd.get_data(bl))
 
+        # missing keys are read from disk without replacing loaded data
+        hd = HERAData(self.uvh5_1)
+        d, f, n = hd.read(bls=hd.bls[0])
+        np.testing.assert_array_equal(hd[hd.bls[1]], HERAData(self.uvh5_1).read()[0][hd.bls[1]])
+        assert hd.get_antpairs() == [hd.bls[0][:2]]
+
+        # files that cannot be loaded lazily (e.g. whose baseline-times need reordering) are read instead
+        def raise_not_implemented(*args, **kwargs):
+            raise NotImplementedError
+        monkeypatch.setattr(io, 'LazyDataContainer', raise_not_implemented)
+        hd = HERAData(self.uvh5_1)
+        np.testing.assert_array_equal(hd[hd.bls[1]], HERAData(self.uvh5_1).read()[0][hd.bls[1]])
+        assert not hasattr(hd, '_lazy_data')
+
+    def test_lazy_datacontainers(self):
+        hd = HERAData(self.uvh5_1)
+        d, f, n = hd.read()
+        ld, lf, ln = hd.build_lazy_datacontainers()
+        for lazy, dc in zip([ld, lf, ln], [d, f, n]):
+            assert isinstance(lazy, io.LazyDataContainer)
+            assert set(lazy.keys()) == set(dc.keys())
+            for bl in dc.keys():
+                np.testing.assert_array_equal(lazy[bl], dc[bl])
+                assert lazy[bl].dtype == dc[bl].dtype
+            assert np.all(lazy.freqs == dc.freqs)
+            assert np.all(lazy.times == dc.times)
+        bl = [bl for bl in d.keys() if bl[0] != bl[1]][0]
+        np.testing.assert_array_equal(ld[(bl[1], bl[0], bl[2].upper())], np.conj(d[bl]))
+
+        # the cache keeps at most cache_bytes of waterfalls
+        lazy = io.LazyDataContainer(self.uvh5_1, cache_bytes=d[bl].nbytes)
+        for k in d.keys():
+            np.testing.assert_array_equal(lazy[k], d[k])
+            assert len(lazy._data._cache) == 1
+        lazy.clear_cache()
+        assert len(lazy._data._cache) == 0
+
+        # waterfalls from disk are read-only, but can be replaced
+        with pytest.raises(ValueError):
+            lazy[bl][0, 0] = 0
+        lazy[bl] = lazy[bl] * 2
+        np.testing.assert_array_equal(lazy[bl], 2 * d[bl])
+        with pytest.raises(KeyError):
+            lazy[(1000, 1001, 'ee')]
+        with pytest.raises(ValueError):
+            io.LazyDataContainer(self.uvh5_1, dataset='data')
+
     def test_update(self):
         hd = HERAData(self.uvh5_1)
         d, f, n = hd.read()
@@ -455,6 +517,33 @@ class Test_HERAData(object):
             np.testing.assert_array_equal(f[bl], f2[bl])
             np.testing.assert_array_equal(n[bl], n2[bl])
 
+    def test_update_views(self):
+        hd = HERAData(self.uvh5_1)
+        d, f, n = hd.read(copy_data=False)
+        bl = [bl for bl in hd.bls if bl[0] != bl[1]][0]
+        assert np.shares_memory(d[bl], hd.data_array)
+        assert np.shares_memory(f[bl], hd.flag_array)
+        assert np.shares_memory(n[bl], hd.nsample_array)
+        np.testing.assert_array_equal(d[bl], hd.get_data(bl))
+
+        # in-place modifications of views modify hd, and updating with the views leaves them unchanged
+        d[bl] *= (2.0 + 1.0j)
+        expected = hd.get_data(bl, force_copy=True)
+        hd.update(data=d, flags=f, nsamples=n)
+        np.testing.assert_array_equal(hd.get_data(bl), expected)
+        np.testing.assert_array_equal(d[bl], expected)
+
+        # arrays that replace views are still written by update()
+        d[bl] = d[bl] * 2
+        hd.update(data=d)
+        np.testing.assert_array_equal(hd.get_data(bl), 2 * expected)
+
+        # antenna-reversed keys are conjugated copies
+        rev = (bl[1], bl[0], bl[2])
+        wf = hd._get_slice(hd.data_array, rev, copy_data=False)
+        assert not np.shares_memory(wf, hd.data_array)
+        np.testing.assert_array_equal(wf, np.conj(hd.get_data(bl)))
+
     def test_partial_write(self):
         hd = HERAData(self.uvh5_1)
         assert hd._writers == {}
@@ -493,6 +582,33 @@ class Test_HERAData(object):
             np.testing.assert_array_equal(n[bl], n2[bl])
         os.remove('out.h5')
 
+        # test chunks over frequencies and times, written out of order without modifying hd
+        hd = HERAData(self.uvh5_1)
+        for freqs in [hd.freqs[512:], hd.freqs[:512]]:
+            d, f, n = hd.read(frequencies=freqs)
+            data_before = np.array(hd.data_array)
+            for bl in d:
+                d[bl] *= 2.0
+            hd.partial_write('out.h5', data=d, clobber=True)
+            np.testing.assert_array_equal(hd.data_array, data_before)
+        hd2 = HERAData('out.h5')
+        d2, f2, n2 = hd2.read()
+        d, f, n = HERAData(self.uvh5_1).read()
+        for bl in d:
+            np.testing.assert_array_almost_equal(d[bl] * 2.0, d2[bl])
+            np.testing.assert_array_equal(n[bl], n2[bl])
+        hd = HERAData(self.uvh5_1)
+        for times in [hd.times[30:], hd.times[:30]]:
+            _d, _f, _n = hd.read(times=times)
+            for bl in _f:
+                _f[bl] = ~_f[bl]
+            hd.partial_write('out.h5', flags=_f, clobber=True)
+        d2, f2, n2 = HERAData('out.h5').read()
+        for bl in d:
+            np.testing.assert_array_equal(d[bl], d2[bl])
+            np.testing.assert_array_equal(~f[bl], f2[bl])
+        os.remove('out.h5')
+
         # test errors
         hd = HERAData(self.miriad_1, filetype='miriad')
         with pytest.raises(NotImplementedError):
@@ -549,6 +665,40 @@ class Test_HERAData(object):
             hd = HERAData(self.miriad_1, filetype='miriad')
             d, f, n = next(hd.iterate_over_bls(bls=[(52, 53, 'xx')], chunk_by_redundant_group=True))
 
+    def test_iterate_prefetch(self):
+        hd = HERAData(self.uvh5_1)
+        hd_prefetch = HERAData(self.uvh5_1)
+        for iterator, kwargs in [('iterate_over_bls', dict(Nbls=1)), ('iterate_over_freqs', dict(Nchans=256)),
+                                 ('iterate_over_times', dict(Nints=20))]:
+            chunks = getattr(hd, iterator)(**kwargs)
+            prefetched = getattr(hd_prefetch, iterator)(prefetch=2, **kwargs)
+            for (d, f, n), (d2, f2, n2) in zip(chunks, prefetched):
+                for dc, dc2 in zip((d, f, n), (d2, f2, n2)):
+                    assert list(dc.keys()) == list(dc2.keys())
+                    for bl in dc.keys():
+                        np.testing.assert_array_equal(dc[bl], dc2[bl])
+                # the iterating object holds the chunk just yielded, as after read()
+                np.testing.assert_array_equal(hd.data_array, hd_prefetch.data_array)
+                assert hd.last_read_kwargs == hd_prefetch.last_read_kwargs
+                for bl in d.keys():
+                    np.testing.assert_array_equal(hd_prefetch.get_data(bl), d[bl])
+
+        # partial writing works on prefetched chunks
+        for d, f, n in hd_prefetch.iterate_over_bls(Nbls=1, prefetch=1):
+            for bl in d:
+                d[bl] *= 2.0
+            hd_prefetch.partial_write('out.h5', data=d, clobber=True, inplace=True)
+        d, f, n = HERAData('out.h5').read()
+        d_in, f_in, n_in = HERAData(self.uvh5_1).read()
+        for bl in d:
+            np.testing.assert_array_almost_equal(d[bl], 2.0 * d_in[bl])
+        os.remove('out.h5')
+
+        # read errors are raised by the generator
+        hd = HERAData(self.uvh5_1)
+        with pytest.raises(ValueError):
+            list(hd.iterate_over_bls(bls=[(1000, 1001, 'ee')], prefetch=1))
+
     def test_iterate_over_freqs(self):
         hd = HERAData(self.uvh5_1)
         for (d, f, n) in hd.iterate_over_freqs(Nchans=256):
@@ -1074,6 +1224,43 @@ def test_get_file_times():
     pytest.raises(ValueError, io.get_file_times, fp, filetype='foo')
 
 
+def test_get_file_times_index(tmpdir):
+    tmp_path = tmpdir.strpath
+    filepaths = []
+    for fp in sorted(glob.glob(os.path.join(DATA_PATH, 'zen.2458043.4*XRAA.uvh5'))):
+        filepaths.append(os.path.join(tmp_path, os.path.basename(fp)))
+        shutil.copy(fp, filepaths[-1])
+    index_file = os.path.join(tmp_path, io.FILE_TIME_INDEX)
+    expected = io.get_file_times(filepaths, filetype='uvh5')
+    assert not os.path.exists(index_file)
+
+    # first call builds the index, second call reads from it
+    for i in range(2):
+        file_times = io.get_file_times(filepaths, filetype='uvh5', use_time_index=True)
+        assert os.path.exists(index_file)
+        for ft, ex in zip(file_times, expected):
+            for ft_arr, ex_arr in zip(ft, ex):
+                np.testing.assert_array_equal(ft_arr, ex_arr)
+    index = io._read_file_time_index(index_file)
+    assert list(index.keys()) == [os.path.basename(fp) for fp in filepaths]
+
+    # modified files are reread
+    hd = io.HERAData(filepaths[0])
+    hd.read()
+    hd.time_array += 1.0
+    hd.write_uvh5(filepaths[0], clobber=True)
+    dlst, dtime, larr, tarr = io.get_file_times(filepaths[0], filetype='uvh5', use_time_index=True)
+    np.testing.assert_array_almost_equal(tarr, expected[3][0] + 1.0)
+    assert io._read_file_time_index(index_file)[os.path.basename(filepaths[0])][0][2] == os.path.getsize(filepaths[0])
+
+    # a corrupt index is ignored and overwritten
+    with open(index_file, 'w') as f:
+        f.write('not an index')
+    dlsts, dtimes, larrs, tarrs = io.get_file_times(filepaths, filetype='uvh5', use_time_index=True)
+    np.testing.assert_array_equal(larrs[1], expected[2][1])
+    assert len(io._read_file_time_index(index_file)) == len(filepaths)
+
+
 def test_baselines_from_filelist_position(tmpdir):
     tmp_path = tmpdir.strpath
     filelist = [os.path.join(DATA_PATH, "test_input/zen.2458101.46106.xx.HH.OCR_53x_54x_only.first.uvh5"),
@@ -172,10 +172,23 @@ class Test_lstbin(object):
             assert np.all(np.isclose(output[1][k], output2[1][k]))
 
     def test_lstbin_vary_nsamps(self):
-        # test execution
-        pytest.raises(NotImplementedError, lstbin.lst_bin, self.data_list, self.lst_list, flags_list=self.flgs_list,
-                      nsamples_list=self.nsmp_list, dlst=None,
-                      median=True, lst_low=0, lst_hi=np.pi, verbose=False)
+        # test median with nsamples: unit nsamples give the unweighted median
+        output = lstbin.lst_bin(self.data_list, self.lst_list, flags_list=self.flgs_list, dlst=None,
+                                median=True, lst_low=0, lst_hi=np.pi, verbose=False)
+        output2 = lstbin.lst_bin(self.data_list, self.lst_list, flags_list=self.flgs_list, nsamples_list=self.nsmp_list,
+                                 dlst=None, median=True, lst_low=0, lst_hi=np.pi, verbose=False)
+        for k in output[1]:
+            np.testing.assert_array_equal(output[1][k], output2[1][k])
+            np.testing.assert_array_equal(output[2][k], output2[2][k])
+
+        # a night with more nsamples than the other two combined sets the median
+        nsmp_list = copy.deepcopy(self.nsmp_list)
+        for k in nsmp_list[0]:
+            nsmp_list[0][k] = nsmp_list[0][k] * 3
+        output2 = lstbin.lst_bin(self.data_list, self.lst_list, nsamples_list=nsmp_list,
+                                 dlst=None, median=True, verbose=False)
+        assert np.allclose(output2[4][(24, 25, 'ee')][30], 4)
+        assert np.allclose(output2[1][(24, 25, 'ee')][30], self.data1[(24, 25, 'ee')][30])
 
         lst_output, data_output, flags_output, _, nsamples_output = lstbin.lst_bin(self.data_list, self.lst_list, flags_list=self.flgs_list, dlst=None,
                                                                                    median=False, lst_low=0, lst_hi=np.pi, verbose=False)
@@ -188,6 +201,65 @@ class Test_lstbin(object):
         assert np.allclose(output[-1][(24, 25, 'ee')].real[190, 30], 4)
         assert np.allclose(output[-1][(24, 25, 'ee')].real[220, 30], 2)
 
+    def test_lstbin_repeated_night(self):
+        # binning the same night twice doubles the counts without changing the average
+        dlst = 0.0007830490163484
+        output1 = lstbin.lst_bin(self.data_list[:1], self.lst_list[:1], flags_list=self.flgs_list[:1], dlst=dlst, verbose=False)
+        output2 = lstbin.lst_bin(self.data_list[:1] * 2, self.lst_list[:1] * 2, flags_list=self.flgs_list[:1] * 2, dlst=dlst, verbose=False)
+        np.testing.assert_array_equal(output1[0], output2[0])
+        assert list(output1[1].keys()) == list(output2[1].keys())
+        for k in output1[1]:
+            np.testing.assert_array_almost_equal(output1[1][k], output2[1][k])
+            np.testing.assert_array_equal(output1[2][k], output2[2][k])
+            np.testing.assert_array_almost_equal(2 * output1[4][k], output2[4][k])
+        # return_no_avg has both copies of each integration
+        output = lstbin.lst_bin(self.data_list[:1] * 2, self.lst_list[:1] * 2, dlst=dlst, return_no_avg=True, verbose=False)
+        for k in output[1]:
+            assert len(output[1][k]) == len(output1[0])
+            assert np.sum([len(d) for d in output[1][k]]) == 2 * len(self.lsts1)
+            for d in output[1][k]:
+                np.testing.assert_array_equal(d[:len(d) // 2], d[len(d) // 2:])
+
+    def test_bin_ranks(self):
+        ranks, unique_bins, counts = lstbin._bin_ranks(np.array([3, 1, 3, 3, 1, 0]))
+        np.testing.assert_array_equal(ranks, [0, 0, 1, 2, 1, 0])
+        np.testing.assert_array_equal(unique_bins, [3, 1, 0])
+        np.testing.assert_array_equal(counts, [3, 2, 1])
+
+    def test_lst_bin_accumulator(self):
+        # streaming one night at a time matches lst_bin
+        dlst = 0.0007830490163484
+        output = lstbin.lst_bin(self.data_list, self.lst_list, flags_list=self.flgs_list, nsamples_list=self.nsmp_list,
+                                dlst=dlst, lst_low=0.25, lst_hi=0.3, truncate_empty=False, verbose=False)
+        acc = lstbin.LSTBinAccumulator(dlst, lst_low=0.25, lst_hi=0.3, verbose=False)
+        for data, lsts, flags, nsamples in zip(self.data_list, self.lst_list, self.flgs_list, self.nsmp_list):
+            acc.add(data, lsts, flags=flags, nsamples=nsamples)
+        output2 = acc.finalize()
+        np.testing.assert_array_almost_equal(output[0], output2[0])
+        assert set(output[1].keys()) == set(output2[1].keys())
+        for k in output[1]:
+            for i in range(1, 5):
+                np.testing.assert_array_almost_equal(output[i][k], output2[i][k])
+
+        # two-pass sigma clipping removes an outlier
+        data_list = copy.deepcopy(self.data_list)
+        data_list[0][(24, 25, 'ee')][20, 30] = 1e6
+        acc = lstbin.LSTBinAccumulator(0.01, lst_low=0.25, lst_hi=0.3, verbose=False)
+        for data, lsts in zip(data_list, self.lst_list):
+            acc.add(data, lsts)
+        clipped = acc.sigma_clipped(sigma=3, min_N=5)
+        for data, lsts in zip(data_list, self.lst_list):
+            clipped.add(data, lsts)
+        output = acc.finalize()
+        output2 = clipped.finalize()
+        i = np.argmax(np.abs(output[1][(24, 25, 'ee')][:, 30]))
+        assert np.abs(output[1][(24, 25, 'ee')][i, 30]) > 1e3
+        assert np.abs(output2[1][(24, 25, 'ee')][i, 30]) < 1e3
+        assert output2[4][(24, 25, 'ee')][i, 30] < output[4][(24, 25, 'ee')][i, 30]
+
+        # rephase needs antpos and freq_array
+        pytest.raises(ValueError, lstbin.LSTBinAccumulator, dlst, rephase=True)
+
     def test_lst_align(self):
         # test basic execution
         output = lstbin.lst_align(self.data1, self.lsts1, dlst=None, flags=self.flgs1, flag_extrapolate=True, verbose=False)
@@ -362,6 +434,127 @@ class Test_lstbin(object):
         os.remove(output_lst_file)
         os.remove(output_std_file)
 
+    @pytest.mark.filterwarnings("ignore:The expected shape of the ENU array")
+    @pytest.mark.filterwarnings("ignore:antenna_diameters is not set")
+    def test_lst_bin_files_streaming(self, tmpdir):
+        tmp_path = tmpdir.strpath
+        file_ext = "{pol}.{type}.{time:7.5f}.uvh5"
+        uvds = []
+        for streaming in [False, True]:
+            outdir = os.path.join(tmp_path, str(streaming))
+            os.mkdir(outdir)
+            lstbin.lst_bin_files(self.data_files, ntimes_per_file=250, outdir=outdir, overwrite=True, sig_clip=False,
+                                 verbose=False, file_ext=file_ext, streaming=streaming)
+            for ftype in ['LST', 'STD']:
+                uvd = UVData()
+                uvd.read(os.path.join(outdir, "zen.ee.{}.0.20124.uvh5".format(ftype)))
+                uvds.append(uvd)
+        for uvd1, uvd2 in zip(uvds[:2], uvds[2:]):
+            np.testing.assert_array_almost_equal(uvd1.data_array, uvd2.data_array)
+            np.testing.assert_array_equal(uvd1.flag_array, uvd2.flag_array)
+            np.testing.assert_array_almost_equal(uvd1.nsample_array, uvd2.nsample_array)
+
+        # two-pass sigma clipping
+        outdir = os.path.join(tmp_path, 'clip')
+        os.mkdir(outdir)
+        lstbin.lst_bin_files(self.data_files, ntimes_per_file=250, outdir=outdir, overwrite=True, sig_clip=True,
+                             verbose=False, file_ext=file_ext, streaming=True)
+        assert os.path.exists(os.path.join(outdir, "zen.ee.LST.0.20124.uvh5"))
+        assert os.path.exists(os.path.join(outdir, "zen.ee.STD.0.20124.uvh5"))
+
+        # median binning needs all nights at once
+        pytest.raises(NotImplementedError, lstbin.lst_bin_files, self.data_files, outdir=outdir, streaming=True,
+                      median=True, verbose=False)
+
+    def test_lst_bin_files_median(self, tmpdir):
+        tmp_path = tmpdir.strpath
+        uvds = []
+        for median in [False, True]:
+            outdir = os.path.join(tmp_path, str(median))
+            os.mkdir(outdir)
+            lstbin.lst_bin_files(self.data_files, ntimes_per_file=250, outdir=outdir, overwrite=True, sig_clip=False,
+                                 verbose=False, median=median)
+            uvd = UVData()
+            uvd.read(os.path.join(outdir, "zen.ee.LST.0.20124.uvh5"))
+            uvds.append(uvd)
+        # the median only changes the binned data, not which data are binned
+        np.testing.assert_array_equal(uvds[0].flag_array, uvds[1].flag_array)
+        np.testing.assert_array_almost_equal(uvds[0].nsample_array, uvds[1].nsample_array)
+        assert not np.allclose(uvds[0].data_array, uvds[1].data_array)
+
+    def test_lst_bin_files_nproc(self, tmpdir):
+        tmp_path = tmpdir.strpath
+        output_files = []
+        for nproc in [1, 2]:
+            outdir = os.path.join(tmp_path, str(nproc))
+            os.mkdir(outdir)
+            lstbin.lst_bin_files(self.data_files, ntimes_per_file=80, outdir=outdir, overwrite=True, sig_clip=True,
+                                 verbose=False, Nbls_to_load=4, nproc=nproc)
+            output_files.append(sorted(glob.glob(os.path.join(outdir, 'zen.*.uvh5'))))
+        assert len(output_files[0]) > 2
+        assert [os.path.basename(f) for f in output_files[0]] == [os.path.basename(f) for f in output_files[1]]
+        for f1, f2 in zip(*output_files):
+            uvd1, uvd2 = UVData(), UVData()
+            uvd1.read(f1)
+            uvd2.read(f2)
+            np.testing.assert_array_equal(uvd1.data_array, uvd2.data_array)
+            np.testing.assert_array_equal(uvd1.flag_array, uvd2.flag_array)
+            np.testing.assert_array_equal(uvd1.nsample_array, uvd2.nsample_array)
+            np.testing.assert_array_equal(uvd1.lst_array, uvd2.lst_array)
+
+    def test_lst_bin_files_resume(self, tmpdir):
+        outdir = tmpdir.strpath
+        kwargs = dict(ntimes_per_file=80, outdir=outdir, overwrite=False, verbose=False, sig_clip=False)
+        lstbin.lst_bin_files(self.data_files, **kwargs)
+        output_files = sorted(glob.glob(os.path.join(outdir, 'zen.*.uvh5')))
+        assert len(output_files) > 2
+        assert len(glob.glob(os.path.join(outdir, '*.tmp'))) == 0
+        manifest = lstbin._read_lst_bin_manifest(os.path.join(outdir, lstbin.LST_BIN_MANIFEST))
+        assert sorted([fname for entry in manifest.values() for fname, mtime, size in entry['outputs']]) == \
+            [os.path.basename(f) for f in output_files]
+        mtimes = {f: os.path.getmtime(f) for f in output_files}
+
+        # only missing outputs are recomputed
+        os.remove(output_files[0])
+        lstbin.lst_bin_files(self.data_files, resume=True, **kwargs)
+        assert sorted(glob.glob(os.path.join(outdir, 'zen.*.uvh5'))) == output_files
+        for f in output_files:
+            if f.replace('.STD.', '.LST.') == output_files[0]:
+                assert os.path.getmtime(f) != mtimes[f]
+            else:
+                assert os.path.getmtime(f) == mtimes[f]
+
+        # changing parameters makes all outputs stale
+        lstbin.lst_bin_files(self.data_files, resume=True, **dict(kwargs, sig_clip=True))
+        for f in output_files:
+            assert os.path.getmtime(f) != mtimes[f]
+
+    def test_nightly_file_loader_cache(self):
+        lst_grid, dlst, file_lsts, begin_lst, lst_arrs, time_arrs = lstbin.config_lst_bin_files(self.data_files, ntimes_per_file=250)
+        hds = [io.HERAData(df[-1]) for df in self.data_files]
+        bl_nightly_dicts = lstbin.gen_bl_nightly_dicts(hds)
+        loader = lstbin._NightlyFileLoader(self.data_files, lst_arrs, time_arrs, verbose=False, max_cached_files=2)
+        fmin, fmax = file_lsts[0][0] - dlst, file_lsts[0][-1] + dlst
+        file_lists, loaded = [], []
+        for blgroup in [bl_nightly_dicts[:1], bl_nightly_dicts[1:2], bl_nightly_dicts[:1]]:
+            file_lists.append([])
+            loaded.append(list(loader.load(blgroup, 0, fmin, fmax, file_lists[-1])))
+            # only the most recently used handles are kept, without their data
+            assert len(loader._handles) == 2
+            assert list(loader._handles.keys()) == file_lists[-1][-2:]
+            assert np.all([hd.data_array is None for hd in loader._handles.values()])
+        assert len(file_lists[0]) > 2
+        assert file_lists[0] == file_lists[1] == file_lists[2]
+        # data loaded through cached handles is unchanged
+        for (d1, f1, n1, l1), (d2, f2, n2, l2) in zip(loaded[0], loaded[2]):
+            assert list(d1.keys()) == list(d2.keys())
+            for key in d1:
+                np.testing.assert_array_equal(d1[key], d2[key])
+                np.testing.assert_array_equal(f1[key], f2[key])
+            np.testing.assert_array_equal(l1, l2)
+        # caches are not pickled
+        assert len(copy.deepcopy(loader)._handles) == 0
+
     def test_lstbin_filess_inhomogenous_baselines(self, tmpdir):
         tmp_path = tmpdir.strpath
         # now do a test with a more complicated set of files with inhomogenous baselines.
@@ -601,6 +794,44 @@ class Test_lstbin(object):
         assert not np.any(out[0, 3])
         out = lstbin.sigma_clip(arr, flags=flg, min_N=1)
         assert np.all(out[0, 3])
+        # test 3D cube clipped along the days axis with per-slice nentries
+        cube = stats.norm.rvs(0, 1, 3 * 8 * 4).reshape(3, 8, 4)
+        cube[:, 7] = np.nan
+        cube[0, 2, 1] = 100
+        cube[2, 2, 1] = 100
+        nentries = np.array([7, 7, 3])[:, None]
+        out = lstbin.sigma_clip(cube.copy(), sigma=4.0, axis=1, min_N=4, nentries=nentries)
+        assert out.shape == cube.shape
+        assert out[0, 2, 1]
+        assert not np.any(out[2])
+        assert not np.any(out[:, 7])
+
+    def test_nanmedian(self):
+        x = stats.norm.rvs(0, 1, 4 * 6 * 5).reshape(4, 6, 5)
+        x[np.random.rand(*x.shape) < 0.3] = np.nan
+        x[1, :, 2] = np.nan
+        for axis in range(3):
+            med = lstbin._nanmedian(x, axis=axis)
+            np.testing.assert_array_equal(med, np.nanmedian(x, axis=axis, keepdims=True))
+        assert lstbin._nanmedian(np.zeros((3, 0)), axis=1).shape == (3, 1)
+
+    def test_weighted_nanmedian(self):
+        x = stats.norm.rvs(0, 1, 4 * 6 * 5).reshape(4, 6, 5)
+        x[np.random.rand(*x.shape) < 0.3] = np.nan
+        x[1, :, 2] = np.nan
+        # equal weights give the median
+        for axis in range(3):
+            med = lstbin._weighted_nanmedian(x, np.full(x.shape, 2.0), axis=axis)
+            np.testing.assert_array_equal(med, np.nanmedian(x, axis=axis, keepdims=True))
+        # integer weights are the same as repeating entries, and zero weights ignore entries
+        w = np.random.randint(0, 4, size=x.shape).astype(float)
+        med = lstbin._weighted_nanmedian(x, w, axis=1)
+        for i in range(4):
+            for j in range(5):
+                keep = np.isfinite(x[i, :, j]) & (w[i, :, j] > 0)
+                expected = np.median(np.repeat(x[i, keep, j], w[i, keep, j].astype(int))) if np.any(keep) else np.nan
+                np.testing.assert_allclose(med[i, 0, j], expected)
+        assert lstbin._weighted_nanmedian(np.zeros((3, 0)), np.zeros((3, 0)), axis=1).shape == (3, 1)
 
     def test_gen_nightly_bldicts(self):
         # Test some basic behavior for bl_nightly_dicts.
@@ -611,6 +842,13 @@ class Test_lstbin(object):
             for bldict in nightly_bldict_list:
                 assert len(bldict) == len(self.data_files)
                 assert np.all([bldict[0] == bldict[i] for i in bldict])
+            # only metadata is used
+            assert np.all([hd.data_array is None for hd in hds])
+        # baselines are matched across nights whichever way around they are stored
+        hds[1].antpairs = [ap[::-1] for ap in hds[1].antpairs]
+        for bldict in lstbin.gen_bl_nightly_dicts(hds, redundant=False):
+            assert bldict[1] == bldict[0]
+            assert len(bldict) == len(self.data_files)
 
     def tearDown(self):
         output_files = sorted(glob.glob("./zen.ee.LST*") + glob.glob("./zen.ee.STD*"))
@@ -14,7 +14,7 @@ from hera_sim.vis import sim_red_data
 from hera_sim.sigchain import gen_gains
 
 from .. import redcal as om
-from .. import io, abscal
+from .. import io, abscal, utils
 from ..utils import split_pol, conj_pol, split_bl
 from ..apply_cal import calibrate_in_place
 from ..data import DATA_PATH
@@ -88,6 +88,80 @@ class TestMethods(object):
                3: np.array([1., 0., 0.])}
         assert len(om.get_pos_reds(pos, bl_error_tol=.1)) == 4
 
+    def _get_pos_reds_double_loop(self, antpos, bl_error_tol=1.0, include_autos=False):
+        # reference implementation of get_pos_reds() that loops over all pairs of antennas
+        keys = list(antpos.keys())
+        reds = {}
+        ap = {ant: np.pad(pos, (0, 3 - len(pos)), mode='constant') for ant, pos in antpos.items()}
+        array_is_flat = np.all(np.abs(np.array(list(ap.values()))[:, 2] - np.mean(list(ap.values()), axis=0)[2]) < bl_error_tol / 4.0)
+        p_or_m = (0, -1, 1)
+        if array_is_flat:
+            epsilons = [[dx, dy, 0] for dx in p_or_m for dy in p_or_m]
+        else:
+            epsilons = [[dx, dy, dz] for dx in p_or_m for dy in p_or_m for dz in p_or_m]
+
+        def check_neighbors(delta):
+            for epsilon in epsilons:
+                newKey = (delta[0] + epsilon[0], delta[1] + epsilon[1], delta[2] + epsilon[2])
+                if newKey in reds:
+                    return newKey
+
+        for i, ant1 in enumerate(keys):
+            for ant2 in keys[(i if include_autos else i + 1):]:
+                bl_pair = (ant1, ant2)
+                delta = tuple(np.round(1.0 * (np.array(ap[ant2]) - np.array(ap[ant1])) / bl_error_tol).astype(int))
+                new_key = check_neighbors(delta)
+                if new_key is None:
+                    new_key = check_neighbors(tuple([-d for d in delta]))
+                    if new_key is not None:
+                        bl_pair = (ant2, ant1)
+                if new_key is not None:
+                    reds[new_key].append(bl_pair)
+                else:
+                    if delta[0] <= 0:
+                        delta = tuple([-d for d in delta])
+                        bl_pair = (ant2, ant1)
+                    reds[delta] = [bl_pair]
+        orderedDeltas = [delta for (length, delta) in sorted(zip([np.linalg.norm(delta) for delta in reds.keys()], reds.keys()))]
+        return [sorted(reds[delta]) if sorted(reds[delta])[0][0] == np.min(reds[delta])
+                else sorted([om.reverse_bl(bl) for bl in reds[delta]]) for delta in orderedDeltas]
+
+    def test_get_pos_reds_matches_double_loop(self):
+        np.random.seed(1)
+        om.clear_reds_cache()
+        for pos, tol, autos in [(hex_array(5, sep=14.6, split_core=True, outriggers=1), 1.0, False),
+                                (hex_array(4, sep=1, split_core=False, outriggers=0), .3, True),
+                                (hex_array(3, sep=1, split_core=False, outriggers=0), 2.0, False),
+                                (linear_array(10), 1.0, True)]:
+            for ant in pos:  # scatter positions by up to about the tolerance to exercise merging
+                pos[ant] = pos[ant] + tol * np.random.uniform(-.6, .6, size=3)
+            assert om.get_pos_reds(pos, bl_error_tol=tol, include_autos=autos) == \
+                self._get_pos_reds_double_loop(pos, bl_error_tol=tol, include_autos=autos)
+        om.clear_reds_cache()
+
+    def test_reds_cache(self):
+        om.clear_reds_cache()
+        pos = hex_array(3, sep=14.6, split_core=False, outriggers=0)
+        reds = om.get_reds(pos, pols=['ee', 'nn'], pol_mode='2pol')
+        assert len(om._REDS_CACHE) == 2  # positional and polarized reds
+        reds[0].append((100, 101, 'ee'))  # mutating the output doesn't alter the cache
+        reds2 = om.get_reds(pos, pols=['ee', 'nn'], pol_mode='2pol')
+        assert len(om._REDS_CACHE) == 2
+        assert (100, 101, 'ee') not in reds2[0]
+        assert reds2 == om.add_pol_reds(self._get_pos_reds_double_loop(pos), pols=['ee', 'nn'], pol_mode='2pol')
+
+        # changing positions, tolerance, or pols is a cache miss
+        om.get_reds(pos, pols=['ee'])
+        om.get_reds(pos, pols=['ee'], bl_error_tol=2.0)
+        pos[0] = pos[0] + 1e-3
+        om.get_reds(pos, pols=['ee'])
+        assert len(om._REDS_CACHE) == 7
+        for i in range(om.REDS_CACHE_SIZE):
+            om.get_pos_reds(linear_array(3 + i))
+        assert len(om._REDS_CACHE) == om.REDS_CACHE_SIZE
+        om.clear_reds_cache()
+        assert len(om._REDS_CACHE) == 0
+
     def test_filter_reds(self):
         antpos = linear_array(7)
         reds = om.get_reds(antpos, pols=['xx'], pol_mode='1pol')
@@ -257,18 +331,25 @@ class TestMethods(object):
         for ant in [3, 10, 11]:
             gains[ant, 'Jee'] *= -1
         _, true_vis, data = sim_red_data(reds, gains=gains, shape=(2, len(freqs)))
-        meta, g_fc = rc.firstcal(data, freqs)
-        for ant in antpos:
-            if ant in [3, 10, 11]:
-                assert np.all(meta['polarity_flips'][ant, 'Jee'])
-            else:
-                assert not np.any(meta['polarity_flips'][ant, 'Jee'])
+        for method in ['recursive', 'graph']:
+            meta, g_fc = rc.firstcal(data, freqs, method=method)
+            for ant in antpos:
+                if ant in [3, 10, 11]:
+                    assert np.all(meta['polarity_flips'][ant, 'Jee'])
+                else:
+                    assert not np.any(meta['polarity_flips'][ant, 'Jee'])
 
         # test operation where no good answer is possible, so we expect it to fail
         data[(0, 1, 'ee')] *= -1
         meta, g_fc = rc.firstcal(data, freqs)
         for ant in meta['polarity_flips']:
             assert np.all([m is None for m in meta['polarity_flips'][ant]])
+        # the graph method ignores the contradiction instead
+        meta, g_fc = rc.firstcal(data, freqs, method='graph')
+        for ant in meta['polarity_flips']:
+            assert np.all([m in [True, False] for m in meta['polarity_flips'][ant]])
+        with pytest.raises(ValueError):
+            om.find_polarity_flipped_ants(data, reds, method='other')
 
         # test errors
         with pytest.raises(ValueError):
@@ -276,6 +357,24 @@ class TestMethods(object):
         with pytest.raises(ValueError):
             om._build_polarity_baseline_groups(data, reds, max_rel_angle=np.pi)
 
+    def test_graph_polarity_flips_many_flips(self):
+        np.random.seed(4)
+        antpos = hex_array(5, split_core=False, outriggers=0)
+        reds = om.get_reds(antpos, pols=['ee'], pol_mode='1pol')
+        freqs = np.linspace(.1, .2, 100)
+        ants = [(ant, 'Jee') for ant in antpos]
+        gains = gen_gains(freqs, ants)
+        flipped = np.random.choice(list(antpos.keys()), 24, replace=False)
+        for ant in flipped:
+            gains[ant, 'Jee'] *= -1
+        _, true_vis, data = sim_red_data(reds, gains=gains, shape=(2, len(freqs)))
+        is_flipped = om.find_polarity_flipped_ants(data, reds, method='graph')
+        # polarities are only recoverable up to degeneracies, so check that each redundant group is consistent
+        for red in reds:
+            rel = [is_flipped[ant0] ^ is_flipped[ant1] ^ (ant0[0] in flipped) ^ (ant1[0] in flipped)
+                   for ant0, ant1 in [split_bl(bl) for bl in red]]
+            assert len(set(rel)) == 1
+
 
 class TestRedundantCalibrator(object):
 
@@ -379,6 +478,35 @@ class TestRedundantCalibrator(object):
             assert dly_sol[(i, 'Jxx')].shape == (1, 1)
             assert np.allclose(np.round(sol_degen[(i, 'Jxx')] - delays[(i, 'Jxx')], 0), 0)
 
+    def test_firstcal_pairs(self):
+        assert om._firstcal_pairs(4) == [(0, 1), (0, 2), (0, 3), (1, 2), (1, 3), (2, 3)]
+        assert om._firstcal_pairs(4, max_pairs_per_bl=2) == om._firstcal_pairs(4)
+        assert om._firstcal_pairs(6, max_pairs_per_bl=1) == [(0, 1), (0, 5), (1, 2), (2, 3), (3, 4), (4, 5)]
+        assert len(om._firstcal_pairs(100, max_pairs_per_bl=3)) == 300
+        with pytest.raises(ValueError):
+            om._firstcal_pairs(10, max_pairs_per_bl=0)
+
+    def test_firstcal_iteration_max_pairs_per_bl(self):
+        NANTS = 18
+        NFREQ = 64
+        antpos = linear_array(NANTS)
+        reds = om.get_reds(antpos, pols=['xx'], pol_mode='1pol')
+        info = om.RedundantCalibrator(reds)
+        fqs = np.linspace(.1, .2, NFREQ)
+        g, true_vis, d = sim_red_data(reds, shape=(1, NFREQ), gain_scatter=0)
+        delays = {k: np.random.randn() * 30 for k in g.keys()}  # in ns
+        fc_gains = {k: np.exp(2j * np.pi * v * fqs).reshape(1, NFREQ) for k, v in delays.items()}
+        delays = {k: np.array([[v]]) for k, v in delays.items()}
+        gains = {k: (v * fc_gains[k]).astype(np.complex64) for k, v in g.items()}
+        calibrate_in_place(d, gains, old_gains=g, gain_convention='multiply')
+        d = {k: v.astype(np.complex64) for k, v in d.items()}
+        for max_pairs_per_bl in [1, 2]:
+            dly_sol, off_sol = info._firstcal_iteration(d, df=fqs[1] - fqs[0], f0=fqs[0], max_pairs_per_bl=max_pairs_per_bl)
+            sol_degen = info.remove_degen_gains(dly_sol, degen_gains=delays, mode='phase')
+            for i in range(NANTS):
+                assert dly_sol[(i, 'Jxx')].shape == (1, 1)
+                assert np.allclose(np.round(sol_degen[(i, 'Jxx')] - delays[(i, 'Jxx')], 0), 0)
+
     def test_firstcal(self):
         np.random.seed(21)
         antpos = hex_array(2, split_core=False, outriggers=0)
@@ -445,6 +573,92 @@ class TestRedundantCalibrator(object):
         for ant in gains.keys():
             np.testing.assert_array_equal(sol[ant], 1.0)
 
+    def test_logcal_solver_cache(self):
+        om.clear_solver_cache()
+        antpos = linear_array(12)
+        reds = om.get_reds(antpos, pols=['xx'], pol_mode='1pol')
+        info = om.RedundantCalibrator(reds)
+        gains, true_vis, d = sim_red_data(reds, gain_scatter=.05)
+        meta, sol_ls = info.logcal(d, use_cache=False)
+        meta, sol = info.logcal(d)
+        assert len(om._SOLVER_CACHE) == 1
+        for k in sol_ls:
+            assert sol[k].dtype == sol_ls[k].dtype
+            np.testing.assert_allclose(sol[k], sol_ls[k], rtol=1e-10)
+
+        # a second call with new data of the same layout reuses the cached system
+        gains, true_vis, d = sim_red_data(reds, gain_scatter=.05)
+        meta, sol_ls = info.logcal(d, use_cache=False)
+        meta, sol = info.logcal(d)
+        assert len(om._SOLVER_CACHE) == 1
+        for k in sol_ls:
+            np.testing.assert_allclose(sol[k], sol_ls[k], rtol=1e-10)
+
+        # per-pixel weights fall back to linsolve
+        w = {bl: np.ones(d[bl].shape) for bl in d}
+        meta, sol = info.logcal(d, wgts=w)
+        assert len(om._SOLVER_CACHE) == 1
+        for k in sol_ls:
+            np.testing.assert_allclose(sol[k], sol_ls[k], rtol=1e-10)
+
+        # non-default mode or sparse are passed on to linsolve
+        om.clear_solver_cache()
+        meta, sol = info.logcal(d, mode='pinv')
+        meta, sol_sparse = info.logcal(d, sparse=True)
+        assert len(om._SOLVER_CACHE) == 0
+        for k in sol_ls:
+            np.testing.assert_allclose(sol[k], sol_ls[k], rtol=1e-6)
+            np.testing.assert_allclose(sol_sparse[k], sol_ls[k], rtol=1e-6)
+
+        # LRU eviction
+        for nants in range(4, 4 + om.SOLVER_CACHE_SIZE + 1):
+            reds = om.get_reds(linear_array(nants), pols=['xx'], pol_mode='1pol')
+            gains, true_vis, d = sim_red_data(reds, gain_scatter=.05)
+            om.RedundantCalibrator(reds).logcal(d)
+        assert len(om._SOLVER_CACHE) == om.SOLVER_CACHE_SIZE
+        om.clear_solver_cache()
+        assert len(om._SOLVER_CACHE) == 0
+
+    def test_firstcal_iteration_solver_cache(self):
+        om.clear_solver_cache()
+        NFREQ = 64
+        antpos = linear_array(12)
+        reds = om.get_reds(antpos, pols=['xx'], pol_mode='1pol')
+        info = om.RedundantCalibrator(reds)
+        fqs = np.linspace(.1, .2, NFREQ)
+        g, true_vis, d = sim_red_data(reds, shape=(3, NFREQ), gain_scatter=.1)
+        dly_ls, off_ls = info._firstcal_iteration(d, df=fqs[1] - fqs[0], f0=fqs[0], use_cache=False)
+        dly, off = info._firstcal_iteration(d, df=fqs[1] - fqs[0], f0=fqs[0])
+        assert len(om._SOLVER_CACHE) == 1
+        for ant in dly_ls:
+            assert dly[ant].shape == dly_ls[ant].shape
+            np.testing.assert_allclose(dly[ant], dly_ls[ant], atol=1e-10)
+            np.testing.assert_allclose(off[ant], off_ls[ant], atol=1e-10)
+        om.clear_solver_cache()
+
+    def test_solver_cache_io(self, tmp_path):
+        om.clear_solver_cache()
+        cache_dir = str(tmp_path)
+        with pytest.warns(UserWarning):
+            om.write_solver_cache(cache_dir)
+        reds = om.get_reds(linear_array(8), pols=['xx'], pol_mode='1pol')
+        gains, true_vis, d = sim_red_data(reds, gain_scatter=.05)
+        meta, sol = om.RedundantCalibrator(reds).logcal(d)
+        om.write_solver_cache(cache_dir)
+        assert len(os.listdir(cache_dir)) == 1
+        keys = list(om._SOLVER_CACHE.keys())
+
+        om.clear_solver_cache()
+        loaded = om.read_solver_cache(cache_dir)
+        assert loaded == keys
+        meta, sol2 = om.RedundantCalibrator(reds).logcal(d)
+        for k in sol:
+            np.testing.assert_array_equal(sol[k], sol2[k])
+        with pytest.warns(UserWarning):
+            om.write_solver_cache(cache_dir, skip_keys=loaded)
+        assert len(os.listdir(cache_dir)) == 1
+        om.clear_solver_cache()
+
     def test_omnical(self):
         NANTS = 18
         antpos = linear_array(NANTS)
@@ -508,6 +722,52 @@ class TestRedundantCalibrator(object):
                 np.testing.assert_almost_equal(np.abs(d_bl), np.abs(mdl), decimal=10)
                 np.testing.assert_almost_equal(np.angle(d_bl * mdl.conj()), 0, decimal=10)
 
+    def test_omnical_array_engine(self):
+        NANTS = 18
+        antpos = linear_array(NANTS)
+        reds = om.get_reds(antpos, pols=['xx'], pol_mode='1pol')
+        info = om.RedundantCalibrator(reds)
+        gains, true_vis, d = sim_red_data(reds, shape=(3, 4), gain_scatter=.0099999)
+        d = {k: v.astype(np.complex64) for k, v in d.items()}
+        w = {k: np.random.uniform(.5, 1.5, size=(3, 4)) for k in d.keys()}
+        sol0 = dict([(k, np.ones_like(v)) for k, v in gains.items()])
+        sol0.update(info.compute_ubls(d, sol0))
+        sol0 = {k: v.astype(np.complex64) for k, v in sol0.items()}
+        meta0, sol_ls = info.omnical(d, deepcopy(sol0), wgts=w, gain=.5, maxiter=500, check_after=30, check_every=6)
+        meta, sol = info.omnical(d, deepcopy(sol0), wgts=w, gain=.5, maxiter=500, check_after=30, check_every=6, engine='array')
+        assert set(sol.keys()) == set(sol_ls.keys())
+        for k in sol:
+            assert sol[k].dtype == np.complex64
+            assert sol[k].shape == (3, 4)
+            np.testing.assert_allclose(sol[k], sol_ls[k], atol=1e-6)
+        np.testing.assert_array_equal(meta['iter'], meta0['iter'])
+        np.testing.assert_allclose(meta['chisq'], meta0['chisq'], rtol=1e-6)
+        with pytest.raises(ValueError):
+            info.omnical(d, sol0, engine='not_an_engine')
+
+    def test_omnical_accel(self):
+        NANTS = 18
+        antpos = linear_array(NANTS)
+        reds = om.get_reds(antpos, pols=['xx'], pol_mode='1pol')
+        info = om.RedundantCalibrator(reds)
+        gains, true_vis, d = sim_red_data(reds, shape=(3, 4), gain_scatter=.0099999)
+        sol0 = dict([(k, np.ones_like(v)) for k, v in gains.items()])
+        sol0.update(info.compute_ubls(d, sol0))
+        meta0, sol_ref = info.omnical(d, deepcopy(sol0), conv_crit=1e-12, gain=.3, maxiter=500, check_after=1, check_every=4)
+        for engine in ['linsolve', 'array']:
+            for accel in ['anderson', 'adaptive']:
+                meta, sol = info.omnical(d, deepcopy(sol0), conv_crit=1e-12, gain=.3, maxiter=500, check_after=1,
+                                         check_every=4, engine=engine, accel=accel)
+                assert np.mean(meta['iter']) < np.mean(meta0['iter'])
+                np.testing.assert_allclose(meta['chisq'], meta0['chisq'], atol=1e-10)
+                for bls in reds:
+                    for bl in bls:
+                        mdl = sol[(bl[0], 'Jxx')] * sol[(bl[1], 'Jxx')].conj() * sol[bls[0]]
+                        np.testing.assert_almost_equal(np.abs(d[bl]), np.abs(mdl), decimal=8)
+                        np.testing.assert_almost_equal(np.angle(d[bl] * mdl.conj()), 0, decimal=8)
+        with pytest.raises(ValueError):
+            info.omnical(d, sol0, accel='not_an_accel')
+
     def test_lincal(self):
         NANTS = 18
         antpos = linear_array(NANTS)
@@ -618,6 +878,28 @@ class TestRedundantCalibrator(object):
         for k in dlys:
             np.testing.assert_almost_equal(dlys[k], 0, decimal=10)
 
+    def test_remove_degen_layout_cache(self):
+        antpos = hex_array(3, split_core=False, outriggers=0)
+        reds = om.get_reds(antpos, pols=['xx'], pol_mode='1pol')
+        rc = om.RedundantCalibrator(reds)
+        gains, true_vis, d = sim_red_data(reds, gain_scatter=.05)
+        om.clear_layout_cache()
+        sol1 = rc.remove_degen_gains(gains)
+        assert len(om._LAYOUT_CACHE) == 1
+        # a second call, even with a new RedundantCalibrator, reuses the cached projectors
+        sol2 = om.RedundantCalibrator(reds).remove_degen_gains(gains)
+        assert len(om._LAYOUT_CACHE) == 1
+        for k in sol1:
+            np.testing.assert_array_equal(sol1[k], sol2[k])
+        om.clear_layout_cache()
+        assert len(om._LAYOUT_CACHE) == 0
+
+        # the O(N) amplitude normalization matches the mean over all pairs of antennas
+        abs_gains = np.abs(np.array(list(gains.values())))
+        pair_mean = np.mean([abs_gains[i] * abs_gains[j] for i in range(len(abs_gains))
+                             for j in range(len(abs_gains)) if i != j], axis=0)
+        np.testing.assert_array_almost_equal(om._mean_abs_product(abs_gains), pair_mean)
+
     def test_lincal_hex_end_to_end_1pol_with_remove_degen_and_firstcal(self):
         antpos = hex_array(3, split_core=False, outriggers=0)
         reds = om.get_reds(antpos, pols=['xx'], pol_mode='1pol')
@@ -1398,6 +1680,23 @@ class TestRunMethods(object):
                 for k, flag in rv['vf_omnical'].items():
                     np.testing.assert_array_equal(rv['v_omnical'][k][flag], 0)
 
+                # the array-based omnical engine should give the same answer (up to single precision roundoff)
+                rv_array = om.redundantly_calibrate(data, all_reds, oc_engine='array')
+                np.testing.assert_allclose(rv_array['omni_meta']['chisq'], rv['omni_meta']['chisq'], rtol=1e-3)
+                for ant in rv['g_omnical']:
+                    np.testing.assert_allclose(rv_array['g_omnical'][ant], rv['g_omnical'][ant], rtol=1e-3, atol=5e-3)
+
+            if pol_mode == '2pol':
+                # accelerated omnical should find the same solution in fewer iterations
+                rv_accel = om.redundantly_calibrate(data, all_reds, oc_accel='anderson')
+                assert np.mean(rv_accel['omni_meta']['iter']) < np.mean(rv['omni_meta']['iter'])
+                np.testing.assert_allclose(np.median(rv_accel['omni_meta']['chisq']), np.median(rv['omni_meta']['chisq']), rtol=1e-3)
+
+                # warm-starting omnical from a converged solution should take fewer iterations to get there again
+                rv_ws = om.redundantly_calibrate(data, all_reds, sol0=rv['g_omnical'])
+                assert np.mean(rv_ws['omni_meta']['iter']) < np.mean(rv['omni_meta']['iter'])
+                np.testing.assert_allclose(np.median(rv_ws['omni_meta']['chisq']), np.median(rv['omni_meta']['chisq']), rtol=1e-3)
+
         if pol_mode == '4pol':
             assert rv['chisq'].shape == (nTimes, nFreqs)
         else:
@@ -1440,6 +1739,48 @@ class TestRunMethods(object):
         for ant in cal['chisq_per_ant']:
             np.testing.assert_array_less(cal['chisq_per_ant'][ant], 1e-10)
 
+    def test_stacked_chisq(self):
+        antpos = hex_array(3, split_core=False, outriggers=0)
+        reds = om.get_reds(antpos, pols=['xx', 'yy'], pol_mode='2pol')
+        gains, true_vis, d = sim_red_data(reds, shape=(3, 5), gain_scatter=.1)
+        for bl in d:
+            d[bl] += (np.random.randn(3, 5) + 1j * np.random.randn(3, 5)) * .1
+        wgts = {bl: np.random.uniform(.5, 2, size=(3, 5)) for bl in d}
+        # use a small batch size to make sure stacking across batches works
+        batch_size = om.CHISQ_BATCH_SIZE
+        om.CHISQ_BATCH_SIZE = 50
+        try:
+            for split_by_antpol in [False, True]:
+                chisq, chisq_per_ant = om._stacked_chisq(d, wgts, reds, true_vis, gains, split_by_antpol=split_by_antpol)
+                chisq2, _, chisq_per_ant2, _ = utils.chisq(d, true_vis, data_wgts=wgts, gains=gains, reds=reds,
+                                                           split_by_antpol=split_by_antpol)
+                if split_by_antpol:
+                    assert set(chisq.keys()) == set(chisq2.keys())
+                    for pol in chisq:
+                        np.testing.assert_array_almost_equal(chisq[pol], chisq2[pol])
+                else:
+                    np.testing.assert_array_almost_equal(chisq, chisq2)
+                assert set(chisq_per_ant.keys()) == set(chisq_per_ant2.keys())
+                for ant in chisq_per_ant:
+                    np.testing.assert_array_almost_equal(chisq_per_ant[ant], chisq_per_ant2[ant])
+        finally:
+            om.CHISQ_BATCH_SIZE = batch_size
+
+    def test_linear_cal_update_two_unknowns(self):
+        antpos = linear_array(4)
+        reds = om.get_reds(antpos, pols=['xx'], pol_mode='1pol')
+        gains, true_vis, d = sim_red_data(reds, shape=(2, 4))
+        for ant in antpos:
+            d[(ant, ant, 'xx')] = np.ones((2, 4), dtype=complex)
+        d = DataContainer(d)
+        d.freqs = np.linspace(100e6, 200e6, 4, endpoint=False)
+        d.times_by_bl = {bl[0:2]: np.linspace(0, 1, 2) for bl in d}
+        cal = {'g_omnical': {ant: gains[ant] for ant in gains if ant[0] != 3}, 'v_omnical': {},
+               'gf_omnical': {}, 'vf_omnical': {}, 'vns_omnical': {}}
+        # (2, 3, 'xx') is missing both g_3 and its unique baseline visibility
+        with pytest.raises(ValueError):
+            om.linear_cal_update([(2, 3, 'xx')], cal, d, reds)
+
     def test_redcal_iteration(self):
         hd = io.HERAData(os.path.join(DATA_PATH, 'zen.2458098.43124.downsample.uvh5'))
         with warnings.catch_warnings():
@@ -1498,6 +1839,139 @@ class TestRunMethods(object):
             assert not np.all(rv['chisq_per_ant'][ant] == 0.0)
             np.testing.assert_array_equal(rv['gf_omnical'][ant], True)
 
+    def test_redcal_iteration_nproc(self):
+        for nInt_to_load in [None, 1]:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                hd = io.HERAData(os.path.join(DATA_PATH, 'zen.2458098.43124.downsample.uvh5'))
+                rv = om.redcal_iteration(hd, nInt_to_load=nInt_to_load, pol_mode='2pol', ex_ants=[1, 27], flag_nchan_low=1)
+                hd = io.HERAData(os.path.join(DATA_PATH, 'zen.2458098.43124.downsample.uvh5'))
+                rv_par = om.redcal_iteration(hd, nInt_to_load=nInt_to_load, pol_mode='2pol', ex_ants=[1, 27], flag_nchan_low=1, nproc=2)
+            for key in ['g_firstcal', 'gf_firstcal', 'g_omnical', 'gf_omnical', 'chisq', 'chisq_per_ant',
+                        'v_omnical', 'vf_omnical', 'vns_omnical']:
+                assert set(rv[key].keys()) == set(rv_par[key].keys())
+                for k in rv[key].keys():
+                    np.testing.assert_array_equal(rv[key][k], rv_par[key][k])
+            for key in ['dlys', 'polarity_flips']:
+                for ant in rv['fc_meta'][key]:
+                    np.testing.assert_array_equal(rv['fc_meta'][key][ant], rv_par['fc_meta'][key][ant])
+            for key in ['chisq', 'iter', 'conv_crit']:
+                for pols in rv['omni_meta'][key]:
+                    np.testing.assert_array_equal(rv['omni_meta'][key][pols], rv_par['omni_meta'][key][pols])
+
+    def test_redcal_iteration_warm_start(self):
+        input_data = os.path.join(DATA_PATH, 'zen.2458098.43124.downsample.uvh5')
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            hd = io.HERAData(input_data)
+            rv = om.redcal_iteration(hd, nInt_to_load=1, pol_mode='2pol', ex_ants=[1, 27])
+            # warm-starting every chunk should find the same solutions in no more iterations
+            hd = io.HERAData(input_data)
+            rv_ws = om.redcal_iteration(hd, nInt_to_load=1, pol_mode='2pol', ex_ants=[1, 27], warm_start=True)
+            # with a chi^2 ratio of 0, every warm start is abandoned, so the result is identical to a cold start
+            hd = io.HERAData(input_data)
+            rv_cold = om.redcal_iteration(hd, pol_mode='2pol', ex_ants=[1, 27])
+            hd = io.HERAData(input_data)
+            init_gains = {ant: g[-1] for ant, g in rv['g_omnical'].items()}
+            rv_fb = om.redcal_iteration(hd, pol_mode='2pol', ex_ants=[1, 27], warm_start=True,
+                                        init_gains=init_gains, init_chisq=1.0, warm_start_chisq_ratio=0)
+
+        for pols in rv['omni_meta']['chisq']:
+            np.testing.assert_allclose(np.median(rv_ws['omni_meta']['chisq'][pols]), np.median(rv['omni_meta']['chisq'][pols]), rtol=1e-2)
+            # the first chunk has no seed, so it's identical
+            np.testing.assert_array_equal(rv_ws['omni_meta']['iter'][pols][0], rv['omni_meta']['iter'][pols][0])
+        for ant in rv['g_omnical']:
+            np.testing.assert_array_equal(rv_ws['gf_omnical'][ant][0], rv['gf_omnical'][ant][0])
+            np.testing.assert_array_equal(rv_fb['g_omnical'][ant], rv_cold['g_omnical'][ant])
+            np.testing.assert_array_equal(rv_fb['gf_omnical'][ant], rv_cold['gf_omnical'][ant])
+        for pols in rv['omni_meta']['iter']:
+            np.testing.assert_array_equal(rv_fb['omni_meta']['iter'][pols], rv_cold['omni_meta']['iter'][pols])
+
+        with pytest.raises(ValueError):
+            om.redcal_iteration(hd, nInt_to_load=1, warm_start=True, nproc=2)
+
+    def test_redcal_run_warm_start(self):
+        input_data = os.path.join(DATA_PATH, 'zen.2458098.43124.downsample.uvh5')
+        outdir = os.path.join(DATA_PATH, 'test_output')
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            cal = om.redcal_run(input_data, outdir=outdir, clobber=True, ex_ants=[1, 27], max_rerun=1)
+            seed_file = os.path.join(outdir, 'zen.2458098.43124.downsample.omni.calfits')
+            shutil.copy(seed_file, os.path.join(outdir, 'zen.2458098.43124.downsample.seed.omni.calfits'))
+            cal_ws = om.redcal_run(input_data, outdir=outdir, clobber=True, ex_ants=[1, 27], max_rerun=1,
+                                   warm_start_calfits=os.path.join(outdir, 'zen.2458098.43124.downsample.seed.omni.calfits'))
+
+        for antpol in cal['chisq']:
+            np.testing.assert_allclose(np.nanmedian(cal_ws['chisq'][antpol]), np.nanmedian(cal['chisq'][antpol]), rtol=1e-2)
+        for pols in cal['omni_meta']['iter']:
+            assert np.mean(cal_ws['omni_meta']['iter'][pols]) < np.mean(cal['omni_meta']['iter'][pols])
+
+        for ext in ['.first.calfits', '.omni.calfits', '.omni_vis.uvh5', '.redcal_meta.hdf5', '.seed.omni.calfits']:
+            os.remove(os.path.join(outdir, 'zen.2458098.43124.downsample' + ext))
+
+    def test_redcal_run_solver_cache(self, tmp_path):
+        input_data = os.path.join(DATA_PATH, 'zen.2458098.43124.downsample.uvh5')
+        outdir = os.path.join(DATA_PATH, 'test_output')
+        cache_dir = str(tmp_path)
+        om.clear_solver_cache()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            cal = om.redcal_run(input_data, outdir=outdir, clobber=True, ex_ants=[1, 27], max_rerun=1,
+                                cache_dir=cache_dir, write_cache=True)
+            assert len(os.listdir(cache_dir)) == 1
+            om.clear_solver_cache()
+            cal2 = om.redcal_run(input_data, outdir=outdir, clobber=True, ex_ants=[1, 27], max_rerun=1,
+                                 cache_dir=cache_dir, read_cache=True, write_cache=True)
+        assert len(os.listdir(cache_dir)) == 1  # nothing new to write
+        for ant in cal['g_omnical']:
+            np.testing.assert_array_equal(cal['g_omnical'][ant], cal2['g_omnical'][ant])
+        om.clear_solver_cache()
+
+        for ext in ['.first.calfits', '.omni.calfits', '.omni_vis.uvh5', '.redcal_meta.hdf5']:
+            os.remove(os.path.join(outdir, 'zen.2458098.43124.downsample' + ext))
+
+    def test_redcal_iteration_prev_cal(self):
+        input_data = os.path.join(DATA_PATH, 'zen.2458098.43124.downsample.uvh5')
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            hd = io.HERAData(input_data)
+            data_cache = {}
+            rv = om.redcal_iteration(hd, nInt_to_load=1, pol_mode='2pol', ex_ants=[1], data_cache=data_cache)
+            assert len(data_cache) == 2 * len(hd.times)
+            # restarting from the previous solution without another antenna reuses its firstcal and converges quickly
+            rv_inc = om.redcal_iteration(hd, nInt_to_load=1, pol_mode='2pol', ex_ants=[1, 27], prev_cal=rv, data_cache=data_cache)
+            hd = io.HERAData(input_data)
+            rv_full = om.redcal_iteration(hd, nInt_to_load=1, pol_mode='2pol', ex_ants=[1, 27])
+
+        for ant in rv_inc['g_firstcal']:
+            if ant[0] != 27:
+                np.testing.assert_array_equal(rv_inc['g_firstcal'][ant], rv['g_firstcal'][ant])
+                np.testing.assert_array_equal(rv_inc['fc_meta']['dlys'][ant], rv['fc_meta']['dlys'][ant])
+            else:
+                np.testing.assert_array_equal(rv_inc['gf_omnical'][ant], True)
+        for pols in rv['omni_meta']['chisq']:
+            np.testing.assert_allclose(np.median(rv_inc['omni_meta']['chisq'][pols]), np.median(rv_full['omni_meta']['chisq'][pols]), rtol=1e-2)
+            assert np.mean(rv_inc['omni_meta']['iter'][pols]) < np.mean(rv_full['omni_meta']['iter'][pols])
+
+    def test_redcal_run_incremental_rerun(self):
+        input_data = os.path.join(DATA_PATH, 'zen.2458098.43124.downsample.uvh5')
+        outdir = os.path.join(DATA_PATH, 'test_output')
+        for nInt_to_load in [None, 1]:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                cal = om.redcal_run(input_data, outdir=outdir, clobber=True, ex_ants=[11, 50], ant_z_thresh=1.8, max_rerun=2,
+                                    nInt_to_load=nInt_to_load, incremental_rerun=True)
+            assert len(cal['omni_meta']['rerun_times']) == 2
+            assert np.all(cal['omni_meta']['rerun_times'] > 0)
+            fc_meta, omni_meta, _, _, _, _, _ = io.read_redcal_meta(os.path.join(outdir, 'zen.2458098.43124.downsample.redcal_meta.hdf5'))
+            np.testing.assert_array_equal(omni_meta['rerun_times'], cal['omni_meta']['rerun_times'])
+            for ant, flags in cal['gf_omnical'].items():
+                if ant[0] in [11, 50, 12]:  # 12 is thrown out after the first run (see test_redcal_run)
+                    np.testing.assert_array_equal(flags, True)
+
+        for ext in ['.first.calfits', '.omni.calfits', '.omni_vis.uvh5', '.redcal_meta.hdf5']:
+            os.remove(os.path.join(outdir, 'zen.2458098.43124.downsample' + ext))
+
     def test_redcal_run(self):
         input_data = os.path.join(DATA_PATH, 'zen.2458098.43124.downsample.uvh5')
         ant_metrics_file = os.path.join(DATA_PATH, 'test_input/zen.2458098.43124.HH.uv.ant_metrics.json')
@@ -1615,6 +2089,7 @@ class TestRunMethods(object):
         os.remove(os.path.join(DATA_PATH, 'test_output/temp.first.calfits'))
         os.remove(os.path.join(DATA_PATH, 'test_output/temp.omni.calfits'))
         os.remove(os.path.join(DATA_PATH, 'test_output/temp.omni_vis.uvh5'))
+        os.remove(os.path.join(DATA_PATH, 'test_output/temp.redcal_meta.hdf5'))
 
         with pytest.raises(TypeError):
             cal = om.redcal_run({})
@@ -1626,4 +2101,6 @@ class TestRunMethods(object):
         assert a.metrics_files == ['b']
         assert a.ex_ants == [5, 6]
         assert a.gain == 0.4
+        assert a.warm_start is False
+        assert a.warm_start_calfits is None
         assert a.verbose is True
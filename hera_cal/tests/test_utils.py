@@ -182,6 +182,19 @@ class TestFftDly(object):
         dlys, offs = utils.fft_dly(data, df, medfilt=True)
         assert np.median(np.abs(dlys - true_dlys)) < 1  # median accuracy of 1 ns
 
+    def test_stacked(self):
+        true_dlys = np.random.uniform(-200, 200, size=(3, 20, 1))
+        data = np.exp(2j * np.pi * self.freqs * true_dlys + 1j * 0.123) + white_noise((3, 20, 1024))
+        df = np.median(np.diff(self.freqs))
+        for kwargs in [{}, {'edge_cut': 100}, {'medfilt': True}]:
+            dlys, offs = utils.fft_dly(data, df, f0=self.freqs[0], **kwargs)
+            assert dlys.shape == offs.shape == (3, 20, 1)
+            # stacks of waterfalls give the same results as waterfalls one at a time
+            for d, dly, off in zip(data, dlys, offs):
+                dly1, off1 = utils.fft_dly(d, df, f0=self.freqs[0], **kwargs)
+                np.testing.assert_allclose(dly, dly1, atol=1e-10)
+                np.testing.assert_allclose(off, off1, atol=1e-10)
+
     def test_rfi(self):
         true_dlys = np.random.uniform(-200, 200, size=60)
         true_dlys.shape = (60, 1)
@@ -439,6 +452,45 @@ def test_lst_rephase():
     d_phs = utils.lst_rephase(d, bls[k], freqs, dlst, lat=0.0, array=True)
     assert np.allclose(np.abs(np.angle(d_phs[50] / data[k][50])).max(), 0.0)
 
+    # complex64 data are rephased in place, in complex64
+    d64 = copy.deepcopy(data_drift)
+    for key in d64:
+        d64[key] = d64[key].astype(np.complex64)
+    utils.lst_rephase(d64, bls, freqs, dlst, lat=0.0)
+    assert d64[k].dtype == np.complex64
+    np.testing.assert_allclose(d64[k], data[k], atol=1e-4 * np.abs(data[k]).max())
+
+
+def test_lst_rephase_phasors():
+    utils.clear_phasor_cache()
+    blvecs = np.array([[14.6, 0., 0.], [0., 14.6, 0.], [-14.6, 7.3, 0.]])
+    freqs = np.linspace(100e6, 200e6, 16)
+    dlst = np.linspace(-.01, .01, 5)
+
+    # one phasor per baseline, integration and frequency, with unit amplitude
+    phs = utils.lst_rephase_phasors(blvecs, freqs, dlst)
+    assert phs.shape == (3, 5, 16)
+    assert phs.dtype == np.complex128
+    np.testing.assert_allclose(np.abs(phs), 1.0)
+    assert not phs.flags.writeable
+
+    # same as rephasing each baseline on its own
+    for i, bl in enumerate(blvecs):
+        d = utils.lst_rephase(np.ones((5, 16), dtype=complex), bl, freqs, dlst, array=True)
+        np.testing.assert_allclose(phs[i], d)
+
+    # scalar dlst gives a single phasor for all integrations
+    assert utils.lst_rephase_phasors(blvecs, freqs, .01).shape == (3, 1, 16)
+
+    # repeated calls use the cache, and complex64 phasors are cached separately
+    assert utils.lst_rephase_phasors(blvecs, freqs, dlst) is phs
+    phs64 = utils.lst_rephase_phasors(blvecs, freqs, dlst, dtype=np.complex64)
+    assert phs64.dtype == np.complex64
+    np.testing.assert_allclose(phs64, phs, atol=1e-6)
+    assert utils.lst_rephase_phasors(blvecs, freqs, -dlst) is not phs
+    utils.clear_phasor_cache()
+    assert utils.lst_rephase_phasors(blvecs, freqs, dlst) is not phs
+
 
 def test_chisq():
     # test basic case
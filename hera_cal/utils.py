@@ -5,6 +5,8 @@
 import numpy as np
 import os
 import copy
+import hashlib
+from collections import OrderedDict
 import astropy.constants as const
 from astropy.time import Time
 from astropy import coordinates as crd
@@ -208,7 +210,8 @@ def filter_bls(bls, ants=None, ex_ants=None, pols=None, antpos=None, min_bl_cut=
 def fft_dly(data, df, wgts=None, f0=0.0, medfilt=False, kernel=(1, 11), edge_cut=0):
     """Get delay of visibility across band using FFT and Quinn's Second Method to fit the delay and phase offset.
     Arguments:
-        data : ndarray of complex data (e.g. gains or visibilities) of shape (Ntimes, Nfreqs)
+        data : ndarray of complex data (e.g. gains or visibilities) of shape (Ntimes, Nfreqs). Stacks of
+            waterfalls, e.g. of shape (Nbls, Ntimes, Nfreqs), are handled with a single FFT.
         df : frequency channel width in Hz
         wgts : multiplicative wgts of the same shape as the data
         f0 : float lowest frequency channel. Optional parameter used in getting the offset correct.
@@ -216,17 +219,18 @@ def fft_dly(data, df, wgts=None, f0=0.0, medfilt=False, kernel=(1, 11), edge_cut
         kernel : size of median filter kernel along (time, freq) axes
         edge_cut : int, number of channels to exclude at each band edge of data in FFT window
     Returns:
-        dlys : (Ntimes, 1) ndarray containing delay for each integration
-        offset : (Ntimes, 1) ndarray containing estimated frequency-independent phases
+        dlys : (Ntimes, 1) ndarray containing delay for each integration (or data.shape[:-1] + (1,) for stacks)
+        offset : (Ntimes, 1) ndarray containing estimated frequency-independent phases (same shape as dlys)
     """
     # setup
-    Ntimes, Nfreqs = data.shape
+    Nfreqs = data.shape[-1]
     if wgts is None:
         wgts = np.ones_like(data, dtype=np.float32)
 
     # smooth via median filter
     if medfilt:
         data = copy.deepcopy(data)  # this prevents filtering of the original input data
+        kernel = (1,) * (data.ndim - len(kernel)) + tuple(kernel)  # don't filter across stacked waterfalls
         data.real = signal.medfilt(data.real, kernel_size=kernel)
         data.imag = signal.medfilt(data.imag, kernel_size=kernel)
 
@@ -234,26 +238,26 @@ def fft_dly(data, df, wgts=None, f0=0.0, medfilt=False, kernel=(1, 11), edge_cut
     dw = data * wgts
     if edge_cut > 0:
         assert 2 * edge_cut < Nfreqs - 1, "edge_cut cannot be >= Nfreqs/2 - 1"
-        dw = dw[:, edge_cut:(-edge_cut + 1)]
+        dw = dw[..., edge_cut:(-edge_cut + 1)]
     dw[np.isnan(dw)] = 0
-    fftfreqs = np.fft.fftfreq(dw.shape[1], df)
+    fftfreqs = np.fft.fftfreq(dw.shape[-1], df)
     dtau = fftfreqs[1] - fftfreqs[0]
-    vfft = np.fft.fft(dw, axis=1)
+    vfft = np.fft.fft(dw, axis=-1)
 
     # get interpolated peak and indices
-    inds, bin_shifts, peaks, interp_peaks = interp_peak(vfft)
-    dlys = (fftfreqs[inds] + bin_shifts * dtau).reshape(-1, 1)
+    inds, bin_shifts, peaks, interp_peaks = interp_peak(vfft.reshape(-1, vfft.shape[-1]))
+    dlys = (fftfreqs[inds] + bin_shifts * dtau).reshape(data.shape[:-1] + (1,))
 
     # Now that we know the slope, estimate the remaining phase offset
     freqs = np.arange(Nfreqs, dtype=data.dtype) * df + f0
     fSlice = slice(edge_cut, len(freqs) - edge_cut)
     offset = np.angle(
         np.sum(
-            wgts[:, fSlice] * data[:, fSlice] * np.exp(
-                -np.complex64(2j * np.pi) * dlys * freqs[fSlice].reshape(1, -1)
+            wgts[..., fSlice] * data[..., fSlice] * np.exp(
+                -np.complex64(2j * np.pi) * dlys * freqs[fSlice]
             ),
-            axis=1, keepdims=True
-        ) / np.sum(wgts[:, fSlice], axis=1, keepdims=True)
+            axis=-1, keepdims=True
+        ) / np.sum(wgts[..., fSlice], axis=-1, keepdims=True)
     )
 
     return dlys, offset
@@ -750,11 +754,84 @@ def combine_calfits(files, fname, outdir=None, overwrite=False, broadcast_flags=
     uvc.write_calfits(output_fname, clobber=True)
 
 
+# in-memory cache of lst_rephase phasors, keyed by a hash of their inputs, with LRU eviction beyond a total size
+PHASOR_CACHE_BYTES = 2**28
+_PHASOR_CACHE = OrderedDict()
+
+
+def clear_phasor_cache():
+    """Remove all phasors from the in-memory cache used by lst_rephase_phasors()."""
+    _PHASOR_CACHE.clear()
+
+
+def lst_rephase_phasors(blvecs, freqs, dlst, lat=-30.721526120689507, dtype=np.complex128):
+    """
+    Compute the phasors that lst_rephase() multiplies into the data of many baselines at once.
+    Phasors are cached (up to a total of PHASOR_CACHE_BYTES) for reuse with the same inputs,
+    e.g. when the same night is rephased to the same LST grid more than once.
+
+    Parameters:
+    -----------
+    blvecs : type=ndarray, shape=(Nbls, 3) baseline vectors in ENU frame in meters
+
+    freqs : type=ndarray, frequency array of data [Hz]
+
+    dlst : type=ndarray or float, delta-LST to rephase by [radians]. If a float, shift all integrations
+                by dlst, elif an ndarray, shift each integration by different amount w/ shape=(Ntimes)
+
+    lat : type=float, latitude of observer in degrees North
+
+    dtype : type=numpy dtype, complex dtype of the phasors. complex64 phasors are meant for rephasing
+                complex64 data in place at half the memory cost.
+
+    Returns:
+    --------
+    phasors : type=ndarray, read-only array of shape (Nbls, Ntimes, Nfreqs), where Ntimes is 1 if dlst is a float
+    """
+    blvecs = np.asarray(blvecs, dtype=float).reshape(-1, 3)
+    freqs = np.asarray(freqs, dtype=float)
+    dlst = np.asarray(dlst, dtype=float)
+    dtype = np.dtype(dtype)
+    key = hashlib.sha1()
+    for arr in [blvecs, freqs, dlst, np.array([lat], dtype=float)]:
+        key.update(repr(arr.shape).encode())
+        key.update(arr.tobytes())
+    key.update(dtype.str.encode())
+    key = key.hexdigest()
+    if key in _PHASOR_CACHE:
+        _PHASOR_CACHE.move_to_end(key)
+        return _PHASOR_CACHE[key]
+
+    # get full rotation matrix from top2eq and eq2top matrices
+    lats = np.ones_like(dlst) * lat
+    rot = np.einsum("...jk,...kl->...jl", eq2top_m(-dlst, lats * np.pi / 180), top2eq_m(np.zeros_like(dlst), lats * np.pi / 180))
+
+    # get new s-hat vectors, and dot every baseline with the difference of pointing vectors to get new u:
+    # Zhang, Y. et al. 2018 (Eqn. 22). Then get delays, with shape (Nbls, Ntimes)
+    s_diff = (rot[..., :, 2] - np.array([0., 0., 1.0])).reshape(-1, 3)
+    tau = np.einsum("bi,ti->bt", blvecs, s_diff) / const.c.value
+
+    # get phasors
+    phase = -2 * np.pi * freqs[None, None, :] * tau[:, :, None]
+    if dtype == np.complex64:
+        phase = np.mod(phase, 2 * np.pi).astype(np.float32)
+    phasors = np.exp(1j * phase).astype(dtype, copy=False)
+    phasors.flags.writeable = False
+
+    if phasors.nbytes <= PHASOR_CACHE_BYTES:
+        _PHASOR_CACHE[key] = phasors
+        while sum(phs.nbytes for phs in _PHASOR_CACHE.values()) > PHASOR_CACHE_BYTES:
+            _PHASOR_CACHE.popitem(last=False)
+    return phasors
+
+
 def lst_rephase(data, bls, freqs, dlst, lat=-30.721526120689507, inplace=True, array=False):
     """
     Shift phase center of each integration in data by amount dlst [radians] along right ascension axis.
     If inplace == True, this function directly edits the arrays in 'data' in memory, so as not to
-    make a copy of data.
+    make a copy of data. Phasors for all baselines are computed at once by lst_rephase_phasors(),
+    in complex64 if all of the data are complex64 (so that it can be rephased in place at half the
+    cost), and complex128 otherwise.
 
     Parameters:
     -----------
@@ -782,26 +859,6 @@ def lst_rephase(data, bls, freqs, dlst, lat=-30.721526120689507, inplace=True, a
 
     This method of rephasing follows Eqn. 21 & 22 of Zhang, Y. et al. 2018 "Unlocking Sensitivity..."
     """
-    # check format of dlst
-    if isinstance(dlst, list):
-        lat = np.ones_like(dlst) * lat
-        dlst = np.array(dlst)
-        zero = np.zeros_like(dlst)
-    elif isinstance(dlst, np.ndarray):
-        lat = np.ones_like(dlst) * lat
-        zero = np.zeros_like(dlst)
-    else:
-        zero = 0
-
-    # get top2eq matrix
-    top2eq = top2eq_m(zero, lat * np.pi / 180)
-
-    # get eq2top matrix
-    eq2top = eq2top_m(-dlst, lat * np.pi / 180)
-
-    # get full rotation matrix
-    rot = np.einsum("...jk,...kl->...jl", eq2top, top2eq)
-
     # make copy of data if desired
     if not inplace:
         data = copy.deepcopy(data)
@@ -812,33 +869,13 @@ def lst_rephase(data, bls, freqs, dlst, lat=-30.721526120689507, inplace=True, a
         data = {'data': data}
         bls = {'data': bls}
 
-    # iterate over data keys
-    for i, k in enumerate(data.keys()):
-
-        # get new s-hat vector
-        s_prime = np.einsum("...ij,j->...i", rot, np.array([0.0, 0.0, 1.0]))
-        s_diff = s_prime - np.array([0., 0., 1.0])
-
-        # get baseline vector
-        bl = bls[k]
-
-        # dot bl with difference of pointing vectors to get new u: Zhang, Y. et al. 2018 (Eqn. 22)
-        u = np.einsum("...i,i->...", s_diff, bl)
-
-        # get delay
-        tau = u / const.c.value
-
-        # reshape tau
-        if isinstance(tau, np.ndarray):
-            pass
-        else:
-            tau = np.array([tau])
-
-        # get phasor
-        phs = np.exp(-2j * np.pi * freqs[None, :] * tau[:, None])
-
-        # multiply into data
-        data[k] *= phs
+    # get phasors for all keys at once and multiply them into data
+    keys = list(data.keys())
+    if len(keys) > 0:
+        dtype = np.complex64 if np.all([data[k].dtype == np.complex64 for k in keys]) else np.complex128
+        phasors = lst_rephase_phasors([bls[k] for k in keys], freqs, dlst, lat=lat, dtype=dtype)
+        for k, phs in zip(keys, phasors):
+            data[k] *= phs
 
     if array:
         data = data['data']
@@ -17,4 +17,4 @@ post_redcal_abscal_run(a.data_file, a.redcal_file, a.model_files, raw_auto_file=
                        data_solar_horizon=a.data_solar_horizon, model_solar_horizon=a.model_solar_horizon, 
                        min_bl_cut=a.min_bl_cut, max_bl_cut=a.max_bl_cut, edge_cut=a.edge_cut, tol=a.tol, 
                        phs_max_iter=a.phs_max_iter, phs_conv_crit=a.phs_conv_crit, clobber=a.clobber, 
-                       add_to_history=' '.join(sys.argv), verbose=a.verbose)
+                       add_to_history=' '.join(sys.argv), use_time_index=a.use_time_index, verbose=a.verbose)
@@ -23,6 +23,7 @@ redcal_run(a.input_data,
            a_priori_ex_ants_yaml=a.a_priori_ex_ants_yaml,
            clobber=a.clobber,
            nInt_to_load=a.nInt_to_load,
+           nproc=a.nproc,
            pol_mode=a.pol_mode,
            ex_ants=a.ex_ants,
            ant_z_thresh=a.ant_z_thresh,
@@ -35,11 +36,21 @@ redcal_run(a.input_data,
            max_bl_cut=a.max_bl_cut,
            fc_conv_crit=a.fc_conv_crit,
            fc_maxiter=a.fc_maxiter,
+           fc_max_pairs_per_bl=a.fc_max_pairs_per_bl,
            oc_conv_crit=a.oc_conv_crit,
            oc_maxiter=a.oc_maxiter,
            check_every=a.check_every,
            check_after=a.check_after,
            gain=a.gain,
+           oc_engine=a.oc_engine,
+           oc_accel=a.oc_accel,
+           warm_start=a.warm_start,
+           warm_start_calfits=a.warm_start_calfits,
+           warm_start_chisq_ratio=a.warm_start_chisq_ratio,
+           cache_dir=a.cache_dir,
+           read_cache=a.read_cache,
+           write_cache=a.write_cache,
+           incremental_rerun=a.incremental_rerun,
            max_dims=a.max_dims,
            add_to_history=' '.join(sys.argv),
            verbose=a.verbose)